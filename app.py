@@ -3,17 +3,33 @@
 
 import asyncio
 import json
+import queue
 import threading
+import time
 import logging
-from flask import Flask, render_template, jsonify
+import gzip
+import hmac
+import uuid
+from flask import Flask, Response, render_template, jsonify, request, stream_with_context
 from flask_cors import CORS
 
 from src import (
-    ORACLE_SERVERS, 
+    CATALOG_CONFIG,
     FLASK_CONFIG,
-    NetworkTester,
-    get_public_ip
+    HISTORY_CONFIG,
+    ROLLUP_CONFIG,
+    COLLECTOR_CONFIG,
+    PUBLIC_IP_CONFIG,
+    NetworkTester
 )
+from src.events import EventBroadcaster, format_sse
+from src.result_store import ResultStore
+from src.history import HistoryStore, METRIC_COLUMNS
+from src.rollup import RollupEngine, ROLLUP_METRICS, RESOLUTIONS
+from src.metrics import TesterMetrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from src.catalog import COUNTRY_FLAGS, DEFAULT_FLAG, default_catalog
+from src.collector import Collector, FrameError, MATRIX_METRICS, decode_frame
+from src.utils import public_ip_cache
 
 # 配置日志
 logging.basicConfig(
@@ -28,8 +44,45 @@ CORS(app)
 
 # 全局变量
 tester = NetworkTester()
-test_results = {}
+test_results = ResultStore()
 test_thread = None
+events = EventBroadcaster()
+history = HistoryStore(
+    HISTORY_CONFIG["path"],
+    batch_size=HISTORY_CONFIG["batch_size"],
+    flush_interval=HISTORY_CONFIG["flush_interval"]
+)
+rollups = RollupEngine(max_points=ROLLUP_CONFIG["max_points"])
+rollups.load(history)
+metrics = TesterMetrics(tester)
+catalog = default_catalog()
+collector = Collector(stale_after=COLLECTOR_CONFIG["stale_after"])
+
+# SSE心跳间隔（秒），防止代理因空闲断开连接
+SSE_HEARTBEAT_INTERVAL = 15
+
+# 响应体超过该大小（字节）且客户端支持时使用gzip压缩
+GZIP_MIN_SIZE = 1024
+
+# 进程启动标识：结果版本号每次启动从0开始，ETag带上它，重启后旧的ETag不会命中
+BOOT_ID = uuid.uuid4().hex[:12]
+
+
+def cached_json_response(body: bytes, etag: str, gzipped: bytes = None) -> Response:
+    """返回带ETag的JSON响应，If-None-Match命中时返回304，按需gzip压缩"""
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+    
+    headers = {'Vary': 'Accept-Encoding'}
+    if len(body) >= GZIP_MIN_SIZE and 'gzip' in request.accept_encodings:
+        body = gzipped if gzipped is not None else gzip.compress(body, compresslevel=6)
+        headers['Content-Encoding'] = 'gzip'
+    
+    response = Response(body, mimetype='application/json', headers=headers)
+    response.set_etag(etag, weak=True)
+    return response
 
 
 @app.route('/')
@@ -40,62 +93,257 @@ def index():
 
 @app.route('/api/ip')
 def get_ip():
-    """获取公网IP"""
-    try:
-        ip_info = get_public_ip()
-        return jsonify(ip_info)
-    except Exception as e:
-        logger.error(f"Error getting IP: {e}")
-        return jsonify({"error": str(e)}), 500
+    """获取公网IP（服务刚启动、第一次检测尚未完成时最多等待一次检测的时间）"""
+    # 公网IP在后台定期刷新，直接返回内存中的结果；导入app时不发起网络请求，第一次请求时才启动
+    public_ip_cache.start()
+    ip_info = public_ip_cache.get() or public_ip_cache.wait(PUBLIC_IP_CONFIG["timeout"] + 1)
+    if ip_info is None:
+        return jsonify({"error": "公网IP检测尚未完成"}), 503
+    return jsonify(ip_info)
+
+
+def selected_servers(args):
+    """按请求参数（region/country/service/tag，均可重复）从目录中筛选服务器
+
+    未指定 service 时使用默认服务，service=all 表示全部服务。
+    """
+    services = args.getlist('service') or CATALOG_CONFIG["default_services"]
+    return catalog.select(
+        regions=args.getlist('region'),
+        countries=args.getlist('country'),
+        services=None if 'all' in services else services,
+        tags=args.getlist('tag')
+    )
 
 
 @app.route('/api/servers')
 def get_servers():
-    """获取服务器列表"""
-    return jsonify(ORACLE_SERVERS)
+    """获取服务器列表，参数: region（可用 ap-* 前缀）、country、service、tag"""
+    return jsonify({
+        name: dict(info, flag=COUNTRY_FLAGS.get(info["country"], DEFAULT_FLAG))
+        for name, info in selected_servers(request.args).items()
+    })
 
 
 @app.route('/api/test/start', methods=['POST'])
 def start_test():
-    """开始测试"""
-    global test_thread, test_results
+    """开始测试，可用与 /api/servers 相同的参数筛选服务器"""
+    global test_thread
     
     if tester.is_testing:
         return jsonify({"error": "测试正在进行中"}), 400
     
+    servers = selected_servers(request.args)
+    if not servers:
+        return jsonify({"error": "没有符合条件的服务器"}), 400
+    
     # 清空之前的结果
-    test_results = {}
+    test_results.reset()
+    # 在线程真正开始测试前就标记为测试中，避免客户端拿到上一轮的完成状态
+    tester.is_testing = True
+    tester.test_progress = 0
+    tester.total_servers = len(servers)
+    events.publish("start", {"total": len(servers)})
     
     # 在新线程中启动测试
-    test_thread = threading.Thread(target=run_async_test, daemon=True)
+    test_thread = threading.Thread(target=run_async_test, args=(servers,), daemon=True)
     test_thread.start()
     
-    return jsonify({"message": "测试已开始", "total": len(ORACLE_SERVERS)})
+    return jsonify({"message": "测试已开始", "total": len(servers)})
 
 
 @app.route('/api/test/status')
 def get_test_status():
-    """获取测试状态"""
+    """获取测试状态
+
+    带 since=<cursor> 参数时只返回该版本之后变化的结果；响应中的 version
+    作为下一次请求的cursor。full为true表示返回的是完整结果（首次请求或已开始新一轮测试）。
+    """
+    status = tester.get_status()
+    since = request.args.get('since', type=int)
+    if since is None:
+        results, version, full = test_results.values(), test_results.version, True
+    else:
+        results, version, full = test_results.changes_since(since)
+    status.update({"results": results, "version": version, "full": full})
+    
+    body = json.dumps(status, ensure_ascii=False).encode("utf-8")
+    # ETag只取决于结果版本、cursor与测试是否进行中；调度器、事件循环等实时统计不参与，
+    # 否则每次请求的ETag都不同，304永远不会命中
+    etag = f"status-{BOOT_ID}-{version}-{'' if since is None else since}-{int(status['is_testing'])}"
+    return cached_json_response(body, etag)
+
+
+@app.route('/api/test/stream')
+def stream_test_events():
+    """以Server-Sent Events推送测试结果
+
+    连接建立时先发送一次当前状态快照（snapshot），之后每完成一个服务器推送一个
+    result事件和一个progress事件，测试结束时推送complete事件。
+    """
+    subscriber = events.subscribe()
     status = tester.get_status()
     status["results"] = list(test_results.values())
-    return jsonify(status)
+    snapshot = format_sse("snapshot", status)
+    
+    def generate():
+        try:
+            yield snapshot
+            while True:
+                try:
+                    message = subscriber.get(timeout=SSE_HEARTBEAT_INTERVAL)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            events.unsubscribe(subscriber)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 
 @app.route('/api/test/results')
 def get_test_results():
     """获取测试结果"""
-    results = list(test_results.values())
-    # 按评分排序
-    results.sort(key=lambda x: x.get('score', 0), reverse=True)
-    return jsonify(results)
+    # 排序和序列化结果按版本缓存，结果未变化时直接复用
+    version, _, body, gzipped = test_results.sorted_results()
+    return cached_json_response(body, f"results-{BOOT_ID}-{version}", gzipped)
+
+
+@app.route('/api/history/regions')
+def get_history_regions():
+    """获取有历史数据的区域列表"""
+    return jsonify(history.regions())
+
+
+@app.route('/api/history/<region>')
+def get_history_summary(region):
+    """获取某区域的历史统计
+
+    参数: metric（默认latency）、days（默认7）、percentile（可选，如95）、service（可选，默认所有服务）
+    """
+    metric = request.args.get('metric', 'latency')
+    if metric not in METRIC_COLUMNS:
+        return jsonify({"error": f"未知指标: {metric}"}), 400
+    since = time.time() - request.args.get('days', 7, type=float) * 86400
+    service = request.args.get('service')
+    
+    summary = history.summary(region, metric, since=since, service=service)
+    percentile = request.args.get('percentile', type=float)
+    if percentile is not None:
+        summary["percentile"] = percentile
+        summary["value"] = history.percentile(region, metric, percentile, since=since, service=service)
+    return jsonify(summary)
+
+
+@app.route('/api/history/<region>/results')
+def get_history_results(region):
+    """获取某区域的原始历史结果，参数: hours（默认24）、limit（默认1000）、service（可选）"""
+    since = time.time() - request.args.get('hours', 24, type=float) * 3600
+    limit = min(request.args.get('limit', 1000, type=int), 10000)
+    return jsonify(history.query(region, since=since, limit=limit, service=request.args.get('service')))
+
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus指标"""
+    return Response(metrics.render(), mimetype=None, content_type=METRICS_CONTENT_TYPE)
+
+
+@app.route('/api/rollups/<region>')
+def get_rollups(region):
+    """获取某区域的时间序列汇总
+
+    参数: metric（默认latency）、hours（默认24）、resolution（1m/1h/1d，默认按范围自动选择）、
+    service（可选，默认合并该区域所有服务）
+    指定的分辨率点数过多时只返回最新的一段，响应中 truncated 为true。
+    """
+    metric = request.args.get('metric', 'latency')
+    if metric not in ROLLUP_METRICS:
+        return jsonify({"error": f"未知指标: {metric}"}), 400
+    resolution = request.args.get('resolution', 'auto')
+    if resolution != 'auto' and resolution not in RESOLUTIONS:
+        return jsonify({"error": f"未知分辨率: {resolution}"}), 400
+    end = time.time()
+    start = end - request.args.get('hours', 24, type=float) * 3600
+    return jsonify(rollups.query(region, metric, start, end, resolution, request.args.get('service')))
+
+
+def read_body(limit: int):
+    """读取请求体，超过limit字节时返回None"""
+    chunks = []
+    size = 0
+    while size <= limit:
+        chunk = request.stream.read(min(64 * 1024, limit + 1 - size))
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size += len(chunk)
+    return None if size > limit else b"".join(chunks)
+
+
+@app.route('/api/collector/frames', methods=['POST'])
+def upload_frames():
+    """接收观测点上传的压缩结果帧"""
+    token = COLLECTOR_CONFIG["token"]
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return jsonify({"error": "未授权"}), 401
+    # 压缩帧本身不应超过解压上限，先限制请求体大小
+    if (request.content_length or 0) > COLLECTOR_CONFIG["max_frame_size"]:
+        return jsonify({"error": "结果帧过大"}), 413
+    # 分块上传没有Content-Length，读取时计数，最多读取 上限+1 字节
+    data = read_body(COLLECTOR_CONFIG["max_frame_size"])
+    if data is None:
+        return jsonify({"error": "结果帧过大"}), 413
+    try:
+        frame = decode_frame(data, COLLECTOR_CONFIG["max_frame_size"])
+    except FrameError as e:
+        return jsonify({"error": str(e)}), 400
+    accepted = collector.ingest(frame)
+    return jsonify({"accepted": accepted})
+
+
+@app.route('/api/collector/matrix')
+def get_collector_matrix():
+    """获取 站点 × 区域 矩阵，参数: metric（默认latency）"""
+    metric = request.args.get('metric', 'latency')
+    if metric not in MATRIX_METRICS:
+        return jsonify({"error": f"未知指标: {metric}"}), 400
+    return jsonify(collector.matrix(metric))
 
 
 def update_result(result):
     """更新单个测试结果"""
-    test_results[result['name']] = result
+    test_results.update(result)
+    history.add(result)
+    rollups.add(result)
+    metrics.observe_result(result)
+    events.publish("result", result)
+    events.publish("progress", {"progress": tester.test_progress, "total": tester.total_servers})
 
 
-def run_async_test():
+def shutdown_loop(loop):
+    """关闭测试线程的事件循环：先释放后端的套接字，再取消并等待仍未结束的任务"""
+    try:
+        tester.backend.close()
+        pending = asyncio.all_tasks(loop)
+        for task in pending:
+            task.cancel()
+        if pending:
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        loop.run_until_complete(loop.shutdown_asyncgens())
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+def run_async_test(servers):
     """在独立线程中运行异步测试"""
     try:
         loop = asyncio.new_event_loop()
@@ -103,7 +351,7 @@ def run_async_test():
         
         # 运行测试
         results = loop.run_until_complete(
-            tester.test_all_servers(ORACLE_SERVERS, update_result)
+            tester.test_all_servers(servers, update_result)
         )
         
         logger.info(f"测试完成，共测试 {len(results)} 个服务器")
@@ -111,12 +359,17 @@ def run_async_test():
     except Exception as e:
         logger.error(f"测试过程出错: {e}")
     finally:
-        loop.close()
+        shutdown_loop(loop)
+        rollups.persist(history)
+        if tester.last_sweep_duration is not None:
+            metrics.observe_sweep(tester.last_sweep_duration)
+        events.publish("complete", {"total": len(test_results)})
 
 
 if __name__ == '__main__':
     logger.info("Starting Oracle Network Test Server...")
     logger.info(f"Server will run on http://localhost:{FLASK_CONFIG['port']}")
+    public_ip_cache.start()
     
     app.run(
         host=FLASK_CONFIG['host'],
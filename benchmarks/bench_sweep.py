@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""完整测试轮次的基准测试 - 对本地替身端点运行 NetworkTester.test_all_servers
+
+每个规模在独立子进程中运行，分别报告墙钟时间、CPU时间、峰值RSS，
+以及测得值相对注入真实值的误差（首字节时间 vs 注入延迟、HTTPS失败率 vs 注入丢弃率、
+回环ICMP的RTT本身即测量开销）。
+
+用法:
+    python benchmarks/bench_sweep.py
+    python benchmarks/bench_sweep.py --sizes 10,100 --delay 20 --spread 30 --drop 0.05
+    python benchmarks/bench_sweep.py --json bench_output.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from targets import StandInHTTPSServer, injected_delay, target_addresses  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_SIZES = (10, 100, 10000)
+REGIONS = 10
+
+
+def peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux以KB为单位，macOS以字节为单位
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def run_sweep(size: int, port: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    """在子进程中运行一轮测试并返回报告"""
+    from src.config import TEST_CONFIG
+    from src.network_tester import NetworkTester
+
+    TEST_CONFIG.update(options.get("config", {}))
+    servers = {
+        f"bench-{i:05d}": {
+            "endpoint": address,
+            "region": f"bench-region-{i % REGIONS}",
+            "location": "loopback",
+            "port": port
+        }
+        for i, address in enumerate(target_addresses(size))
+    }
+
+    tester = NetworkTester()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    results = asyncio.run(tester.test_all_servers(servers))
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    tester.executor.shutdown(wait=False)
+
+    completed = [r for r in results if r["status"] == "completed"]
+    ttfb_errors = [
+        r["ttfb"] - injected_delay(r["endpoint"], options["delay"], options["spread"], options["seed"])
+        for r in completed if r["ttfb"] < 999
+    ]
+    latencies = [r["latency"] for r in completed if r["latency"] < 999]
+    https_probes = tester.probe_counts["https"]
+    https_failures = tester.probe_errors.get("https_error", 0) + tester.probe_errors.get("https_timeout", 0)
+
+    def rounded(value):
+        return round(value, 3) if value is not None else None
+
+    return {
+        "endpoints": size,
+        "completed": len(completed),
+        "wall_time_s": round(wall, 3),
+        "cpu_time_s": round(cpu, 3),
+        "endpoints_per_s": round(size / wall, 1) if wall else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "ping_method": "icmp" if tester.backend.icmp_available else "system",
+        "icmp_rtt_mean_ms": rounded(statistics.fmean(latencies)) if latencies else None,
+        "icmp_rtt_p99_ms": rounded(percentile(latencies, 99)),
+        "ttfb_error_mean_ms": rounded(statistics.fmean(ttfb_errors)) if ttfb_errors else None,
+        "ttfb_error_p50_ms": rounded(percentile(ttfb_errors, 50)),
+        "ttfb_error_p99_ms": rounded(percentile(ttfb_errors, 99)),
+        "https_probes": https_probes,
+        "https_failure_rate": rounded(https_failures / https_probes) if https_probes else None,
+        "injected_drop_rate": options["drop"],
+        "suspect_results": sum(1 for r in results if r.get("suspect")),
+        "loop_lag_max_ms": round(tester.loop_monitor.max_lag, 3)
+    }
+
+
+def print_report(reports: List[Dict[str, Any]]) -> None:
+    columns = [
+        ("endpoints", "N"), ("wall_time_s", "wall s"), ("cpu_time_s", "cpu s"),
+        ("endpoints_per_s", "ep/s"), ("peak_rss_mb", "rss MB"), ("icmp_rtt_p99_ms", "icmp p99"),
+        ("ttfb_error_p50_ms", "ttfb err p50"), ("ttfb_error_p99_ms", "ttfb err p99"),
+        ("https_failure_rate", "fail rate"), ("suspect_results", "suspect")
+    ]
+    widths = [max(len(title), 10) for _, title in columns]
+    print("  ".join(title.rjust(w) for (_, title), w in zip(columns, widths)))
+    for report in reports:
+        print("  ".join(
+            ("-" if report[key] is None else str(report[key])).rjust(w)
+            for (key, _), w in zip(columns, widths)
+        ))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark full sweeps against local stand-in endpoints")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Comma-separated endpoint counts (default: 10,100,10000)")
+    parser.add_argument("--delay", type=float, default=20.0, help="Base injected HTTPS delay in ms")
+    parser.add_argument("--spread", type=float, default=30.0,
+                        help="Per-endpoint delay spread in ms (delay is fixed per endpoint)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Per-request jitter in ms (+/-)")
+    parser.add_argument("--drop", type=float, default=0.0, help="Fraction of HTTPS requests dropped")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for injected delays and drops")
+    parser.add_argument("--fixed-sampling", action="store_true",
+                        help="Disable adaptive sampling (fixed ping/connection counts)")
+    parser.add_argument("--json", metavar="FILE", help="Also write the reports as JSON")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    options = {
+        "delay": args.delay,
+        "spread": args.spread,
+        "drop": args.drop,
+        "seed": args.seed,
+        "config": {"adaptive_sampling": False} if args.fixed_sampling else {}
+    }
+
+    reports = []
+    with StandInHTTPSServer(args.delay, args.spread, args.jitter, args.drop, args.seed) as server:
+        for size in sizes:
+            # 每个规模一个新进程，峰值RSS和CPU时间互不累加
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                report = pool.submit(run_sweep, size, server.port, options).result()
+            reports.append(report)
+            print(f"finished {size} endpoints in {report['wall_time_s']}s", file=sys.stderr)
+
+    print_report(reports)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""基准测试用的本地替身目标 - 回环地址上可注入延迟与丢弃的HTTPS服务器
+
+ICMP由内核直接应答127.0.0.0/8上的任意地址，无需额外的响应进程；
+HTTPS服务器监听所有地址但只接受来自回环地址的连接，按连接的目标地址
+查出该端点注入的延迟（真实值），因此一个服务器进程即可代替上万个端点。
+"""
+
+import asyncio
+import hashlib
+import ipaddress
+import multiprocessing
+import os
+import random
+import shutil
+import ssl
+import subprocess
+import tempfile
+from typing import List, Optional, Tuple
+
+RESPONSE = b"HTTP/1.1 200 OK\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+
+FIRST_ADDRESS = ipaddress.IPv4Address("127.1.0.1")
+
+
+def target_addresses(count: int) -> List[str]:
+    """生成 count 个互不相同的回环地址（127.1.0.1 起）"""
+    if count > 0xFFFFFF - int(FIRST_ADDRESS) % 0x1000000:
+        raise ValueError("too many loopback targets")
+    return [str(FIRST_ADDRESS + i) for i in range(count)]
+
+
+def injected_delay(address: str, base_ms: float, spread_ms: float, seed: int) -> float:
+    """某端点注入的固定延迟（毫秒），由地址和种子确定，测试端与服务端各自计算"""
+    digest = hashlib.blake2b(f"{seed}:{address}".encode(), digest_size=8).digest()
+    fraction = int.from_bytes(digest, "big") / 2 ** 64
+    return base_ms + spread_ms * fraction
+
+
+def make_self_signed_cert(directory: str) -> Tuple[str, str]:
+    """用openssl生成临时自签名证书（EC P-256，握手开销比RSA小）"""
+    if shutil.which("openssl") is None:
+        raise RuntimeError("openssl is required to create the benchmark certificate")
+    certfile = os.path.join(directory, "cert.pem")
+    keyfile = os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "ec", "-pkeyopt", "ec_paramgen_curve:prime256v1",
+         "-nodes", "-days", "1", "-subj", "/CN=localhost",
+         "-keyout", keyfile, "-out", certfile],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    return certfile, keyfile
+
+
+async def _serve(certfile: str, keyfile: str, base_ms: float, spread_ms: float,
+                 jitter_ms: float, drop_rate: float, seed: int, ready) -> None:
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(certfile, keyfile)
+    rng = random.Random(seed)
+    delays = {}
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        peer = writer.get_extra_info("peername")
+        if not peer or not ipaddress.ip_address(peer[0]).is_loopback:
+            writer.transport.abort()
+            return
+        address = writer.get_extra_info("sockname")[0]
+        try:
+            await reader.readuntil(b"\r\n\r\n")
+            if rng.random() < drop_rate:
+                # 丢弃：不应答直接断开，客户端立即得到错误而不是等待超时
+                writer.transport.abort()
+                return
+            delay = delays.get(address)
+            if delay is None:
+                delay = delays[address] = injected_delay(address, base_ms, spread_ms, seed)
+            if jitter_ms:
+                delay = max(0.0, delay + rng.uniform(-jitter_ms, jitter_ms))
+            await asyncio.sleep(delay / 1000)
+            writer.write(RESPONSE)
+            await writer.drain()
+            writer.close()
+        except (OSError, asyncio.IncompleteReadError, ssl.SSLError):
+            writer.transport.abort()
+
+    server = await asyncio.start_server(handle, "0.0.0.0", 0, ssl=context, backlog=4096)
+    ready.send(server.sockets[0].getsockname()[1])
+    ready.close()
+    async with server:
+        await server.serve_forever()
+
+
+def _server_main(*args) -> None:
+    try:
+        asyncio.run(_serve(*args))
+    except KeyboardInterrupt:
+        pass
+
+
+class StandInHTTPSServer:
+    """在独立进程中运行的替身HTTPS服务器，避免其CPU与内存计入被测进程"""
+
+    def __init__(self, base_ms: float = 20.0, spread_ms: float = 30.0, jitter_ms: float = 0.0,
+                 drop_rate: float = 0.0, seed: int = 1):
+        self.base_ms = base_ms
+        self.spread_ms = spread_ms
+        self.jitter_ms = jitter_ms
+        self.drop_rate = drop_rate
+        self.seed = seed
+        self.port: Optional[int] = None
+        self._process: Optional[multiprocessing.Process] = None
+        self._tmpdir: Optional[tempfile.TemporaryDirectory] = None
+
+    def expected_delay(self, address: str) -> float:
+        return injected_delay(address, self.base_ms, self.spread_ms, self.seed)
+
+    def start(self) -> int:
+        self._tmpdir = tempfile.TemporaryDirectory(prefix="oracle-bench-")
+        certfile, keyfile = make_self_signed_cert(self._tmpdir.name)
+        parent, child = multiprocessing.Pipe(duplex=False)
+        self._process = multiprocessing.Process(
+            target=_server_main,
+            args=(certfile, keyfile, self.base_ms, self.spread_ms, self.jitter_ms,
+                  self.drop_rate, self.seed, child),
+            daemon=True
+        )
+        self._process.start()
+        if not parent.poll(30):
+            self.stop()
+            raise RuntimeError("stand-in HTTPS server did not start")
+        self.port = parent.recv()
+        return self.port
+
+    def stop(self) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join(5)
+            self._process = None
+        if self._tmpdir is not None:
+            self._tmpdir.cleanup()
+            self._tmpdir = None
+
+    def __enter__(self) -> "StandInHTTPSServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -3,11 +3,13 @@
 
 import asyncio
 import json
+import os
+import signal
+import socket
 import sys
 import argparse
 from typing import Optional, List, Dict, Any
 from datetime import datetime
-import csv
 from rich.console import Console
 from rich.table import Table
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
@@ -15,7 +17,20 @@ from rich.live import Live
 from rich.panel import Panel
 from rich import box
 
-from src import ORACLE_SERVERS, NetworkTester, get_public_ip
+from src import (
+    TEST_CONFIG, SCORE_WEIGHTS, HISTORY_CONFIG, AGENT_CONFIG, CATALOG_CONFIG, EXPORT_CONFIG,
+    NetworkTester
+)
+from src.catalog import EndpointCatalog, CatalogError, default_catalog
+from src.monitor import Monitor
+from src.agent import Agent
+from src.history import HistoryStore, METRIC_COLUMNS
+from src.rollup import RollupEngine
+from src.scoring import SCORED_STATUSES, rescore_history
+from src.resultset import ResultSet
+from src.exporters import EXPORTERS, Exporter, ExportError, open_exporter
+from src.backends import SimulatedBackend
+from src.utils import public_ip_cache
 
 console = Console()
 
@@ -23,36 +38,35 @@ console = Console()
 class CLITester:
     """CLI测试器"""
     
-    def __init__(self):
-        self.tester = NetworkTester()
+    def __init__(self, history: Optional[HistoryStore] = None, simulate_seed: Optional[int] = None,
+                 catalog: Optional[EndpointCatalog] = None, services: Optional[List[str]] = None,
+                 countries: Optional[List[str]] = None, tags: Optional[List[str]] = None):
+        self.catalog = catalog or default_catalog()
+        # 端点筛选条件：未指定服务时只测试默认服务，'all' 表示全部服务
+        if not services:
+            services = CATALOG_CONFIG['default_services']
+        self.services = None if 'all' in services else services
+        self.countries = countries
+        self.tags = tags
+        # 指定种子时使用确定性的模拟网络，完全离线运行
+        backend = None
+        if simulate_seed is not None:
+            backend = SimulatedBackend(self.catalog.select(), seed=simulate_seed)
+        self.tester = NetworkTester(backend)
         self.results = []
-        self.country_map = {
-            '美国': '🇺🇸',
-            '加拿大': '🇨🇦', 
-            '巴西': '🇧🇷',
-            '智利': '🇨🇱',
-            '英国': '🇬🇧',
-            '德国': '🇩🇪',
-            '瑞士': '🇨🇭',
-            '荷兰': '🇳🇱',
-            '法国': '🇫🇷',
-            '沙特阿拉伯': '🇸🇦',
-            '阿联酋': '🇦🇪',
-            '以色列': '🇮🇱',
-            '南非': '🇿🇦',
-            '印度': '🇮🇳',
-            '新加坡': '🇸🇬',
-            '澳大利亚': '🇦🇺',
-            '日本': '🇯🇵',
-            '韩国': '🇰🇷'
-        }
+        # 设置后每个结果都会写入历史库
+        self.history = history
+        # 设置后每个结果完成时都会追加到导出文件
+        self.exporter: Optional[Exporter] = None
     
     def get_country_emoji(self, server_name: str) -> str:
         """获取国家emoji"""
-        for country in self.country_map:
-            if country in server_name:
-                return self.country_map[country]
-        return '🌍'
+        return self.catalog.country_flag(server_name)
+    
+    def select_servers(self, regions: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """按区域代码（可用 ap-* 前缀）、名称、国家、服务和标签筛选要测试的服务器"""
+        return self.catalog.select(regions=regions, countries=self.countries,
+                                   services=self.services, tags=self.tags)
     
     def create_banner_panel(self):
         """创建横幅面板"""
@@ -70,6 +84,10 @@ class CLITester:
         """创建IP信息面板"""
         if ip_info is None:
             ip_info = {}
+        if not ip_info:
+            ip_info = {key: "检测中..." for key in ("ipv4", "ipv6", "city", "region", "country", "isp")}
+        elif ip_info.get("error"):
+            ip_info = {"isp": f"获取失败: {ip_info['error']}"}
         
         # IPv4和IPv6显示
         ipv4_text = f"🌐 IPv4: {ip_info.get('ipv4', '未检测到')}"
@@ -87,36 +105,23 @@ class CLITester:
             width=console.size.width
         )
     
-    async def run_full_test_with_live_display(self, regions: Optional[List[str]] = None, show_banner: bool = True, show_ip: bool = True):
-        """完整的测试流程，在Live中显示所有内容"""
-        servers_to_test = {}
-        
-        # 筛选要测试的服务器
-        if regions:
-            for name, info in ORACLE_SERVERS.items():
-                if info['region'] in regions or name in regions:
-                    servers_to_test[name] = info
-        else:
-            servers_to_test = ORACLE_SERVERS
+    async def run_full_test_with_live_display(self, regions: Optional[List[str]] = None, show_banner: bool = True, show_ip: bool = True,
+                                              top_k: Optional[int] = None):
+        """完整的测试流程，在Live中显示所有内容
+
+        top_k不为空时使用快速模式，只完整测量最快的K个区域。
+        """
+        servers_to_test = self.select_servers(regions)
         
         if not servers_to_test:
-            console.print("[red]No servers match the specified regions[/red]")
-            return []
+            console.print("[red]No servers match the specified selection[/red]")
+            return ResultSet()
         
-        # 预先获取IP信息，避免在Live更新中重复请求
+        # IP信息与测试同时获取，不推迟测试开始；获取完成前面板显示"检测中"。
+        # 查询结果缓存在文件中，ttl内重复运行时不发请求（见 PUBLIC_IP_CONFIG）
         ip_info = {}
-        if show_ip:
-            console.print("[dim]正在获取网络信息...[/dim]")
-            try:
-                ip_info = get_public_ip()
-                # 临时调试输出
-                if all(v == "Unknown" for k, v in ip_info.items() if k in ["city", "region", "country", "isp"]):
-                    console.print(f"[yellow]调试信息: 网络信息获取失败，IP: {ip_info.get('ipv4', 'Unknown')}[/yellow]")
-            except Exception as e:
-                console.print(f"[red]网络信息获取出错: {e}[/red]")
-                ip_info = {}
         
-        results = []
+        results = ResultSet()
         
         # 创建实时更新的表格
         def create_live_table():
@@ -138,8 +143,8 @@ class CLITester:
             table.add_column("Jitter", justify="right")
             table.add_column("Score", justify="right")
             
-            # 按评分排序
-            sorted_results = sorted(results, key=lambda x: x.get('score', 0), reverse=True)
+            # 按评分排序（只排序行号，不复制结果）
+            sorted_results = results.sort_by('score', reverse=True)
             
             for idx, result in enumerate(sorted_results, 1):
                 # 根据评分设置颜色
@@ -167,7 +172,8 @@ class CLITester:
                     str(idx),
                     f"{country_emoji} {result['name']}",
                     result['region'],
-                    f"[{latency_color}]{result['latency']:.1f} ms[/{latency_color}]",
+                    f"[{latency_color}]{result['latency']:.1f} ms[/{latency_color}]"
+                    + (" [yellow]⚠[/yellow]" if result.get('suspect') else ""),
                     f"{result['packet_loss']:.1f}%",
                     f"{result['connection_time']:.1f} ms",
                     f"{result['jitter']:.1f} ms",
@@ -264,28 +270,48 @@ class CLITester:
         # 使用Live显示完整界面，降低刷新频率避免卡顿
         with Live(create_full_display(), console=console, refresh_per_second=1) as live:
             
+            async def load_ip_info():
+                try:
+                    ip_info.update(await public_ip_cache.fetch())
+                except Exception as e:
+                    ip_info["error"] = str(e)
+                live.update(create_full_display())
+            
+            ip_task = asyncio.ensure_future(load_ip_info()) if show_ip else None
+            
             async def update_display(result):
-                results.append(result)
+                results.add(result)
+                if self.history:
+                    self.history.add(result)
+                if self.exporter:
+                    self.exporter.write(result)
                 # 进一步减少更新频率：每5个结果或完成时才更新
                 if len(results) % 5 == 0 or len(results) == len(servers_to_test) or len(results) == 1:
                     live.update(create_full_display())
             
             # 运行测试
-            await self.tester.test_all_servers(servers_to_test, update_display)
+            try:
+                await self.tester.test_all_servers(servers_to_test, update_display, top_k=top_k)
+                if ip_task:
+                    # 测试比IP检测先结束时（最多等一次检测的超时时间）显示完整的IP信息
+                    await ip_task
+            finally:
+                if ip_task:
+                    ip_task.cancel()
         
         return results
     
-    async def test_with_progress(self, regions: Optional[List[str]] = None):
+    async def test_with_progress(self, regions: Optional[List[str]] = None, top_k: Optional[int] = None):
         """保持兼容性的测试方法"""
-        return await self.run_full_test_with_live_display(regions, show_banner=False, show_ip=False)
+        return await self.run_full_test_with_live_display(regions, show_banner=False, show_ip=False, top_k=top_k)
     
-    def display_results_table(self, results: List[Dict[str, Any]], top_n: Optional[int] = None):
+    def display_results_table(self, results: ResultSet, top_n: Optional[int] = None):
         """显示结果表格"""
         # 按评分排序
-        results.sort(key=lambda x: x.get('score', 0), reverse=True)
+        results = results.sort_by('score', reverse=True)
         
         if top_n:
-            results = results[:top_n]
+            results = results.top(top_n)
         
         table = Table(
             title="Test Results",
@@ -330,7 +356,8 @@ class CLITester:
                 str(idx),
                 f"{country_emoji} {result['name']}",
                 result['region'],
-                f"[{latency_color}]{result['latency']:.1f} ms[/{latency_color}]",
+                f"[{latency_color}]{result['latency']:.1f} ms[/{latency_color}]"
+                + (" [yellow]⚠[/yellow]" if result.get('suspect') else ""),
                 f"{result['packet_loss']:.1f}%",
                 f"{result['connection_time']:.1f} ms",
                 f"{result['jitter']:.1f} ms",
@@ -339,20 +366,20 @@ class CLITester:
         
         console.print(table, justify="center")
     
-    def export_results(self, results: List[Dict[str, Any]], format: str, output: str):
+    def export_results(self, results: ResultSet, format: str, output: str):
         """导出测试结果"""
-        results.sort(key=lambda x: x.get('score', 0), reverse=True)
+        ranked = results.sort_by('score', reverse=True)
         
         if format == 'json':
             with open(output, 'w', encoding='utf-8') as f:
-                json.dump(results, f, indent=2, ensure_ascii=False)
+                json.dump(ranked.to_dicts(), f, indent=2, ensure_ascii=False)
         
-        elif format == 'csv':
-            with open(output, 'w', newline='', encoding='utf-8') as f:
-                if results:
-                    writer = csv.DictWriter(f, fieldnames=results[0].keys())
-                    writer.writeheader()
-                    writer.writerows(results)
+        elif format in EXPORTERS:
+            # 固定列的格式与流式导出共用同一写出器，按评分顺序一次写完
+            with open_exporter(format, output, buffer_size=len(ranked) or 1,
+                               flush_interval=EXPORT_CONFIG['flush_interval']) as exporter:
+                for r in ranked:
+                    exporter.write(r)
         
         elif format == 'markdown':
             with open(output, 'w', encoding='utf-8') as f:
@@ -360,22 +387,205 @@ class CLITester:
                 f.write(f"Test Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
                 
                 f.write("## Summary\n\n")
-                f.write(f"- Total Servers Tested: {len(results)}\n")
-                f.write(f"- Best Server: {results[0]['name']} (Score: {results[0]['score']})\n")
-                f.write(f"- Worst Server: {results[-1]['name']} (Score: {results[-1]['score']})\n\n")
+                f.write(f"- Total Servers Tested: {len(ranked)}\n")
+                f.write(f"- Best Server: {ranked[0]['name']} (Score: {ranked[0]['score']})\n")
+                f.write(f"- Worst Server: {ranked[-1]['name']} (Score: {ranked[-1]['score']})\n\n")
                 
                 f.write("## Detailed Results\n\n")
                 f.write("| Rank | Location | Region | Latency (ms) | Packet Loss | Connection (ms) | Score |\n")
                 f.write("|------|----------|--------|-------------|-------------|-----------------|-------|\n")
                 
-                for idx, r in enumerate(results, 1):
+                for idx, r in enumerate(ranked, 1):
                     f.write(f"| {idx} | {r['name']} | {r['region']} | "
                            f"{r['latency']:.1f} | {r['packet_loss']:.1f}% | "
                            f"{r['connection_time']:.1f} | {r['score']:.1f} |\n")
         
         console.print(f"[green]Results exported to {output}[/green]")
     
-    def recommend_best_region(self, results: List[Dict[str, Any]], use_case: str) -> Dict[str, Any]:
+    def close_exporter(self):
+        """写出缓冲的结果并关闭流式导出文件"""
+        if self.exporter:
+            exporter, self.exporter = self.exporter, None
+            exporter.close()
+            console.print(f"[green]Results exported to {exporter.path} ({exporter.rows_written} rows)[/green]")
+    
+    async def run_monitor(self, regions: Optional[List[str]], interval: float,
+                          history_size: int, rounds: Optional[int] = None):
+        """持续监控模式：按固定间隔循环测试，实时显示窗口统计"""
+        servers = self.select_servers(regions)
+        if not servers:
+            console.print("[red]No servers match the specified selection[/red]")
+            return
+        
+        monitor = Monitor(servers, interval, history_size, tester=self.tester)
+        # 保存历史时同时维护长周期汇总，每轮结束后写入有变化的桶
+        rollups = None
+        if self.history:
+            rollups = RollupEngine()
+            rollups.load(self.history)
+        
+        def create_monitor_table():
+            table = Table(
+                title=f"📡 Oracle Cloud Monitor (round {monitor.rounds_completed}, every {interval:g}s, "
+                      f"window {history_size} rounds)",
+                box=box.SIMPLE_HEAD,
+                show_header=True,
+                header_style="bold cyan",
+                width=console.size.width
+            )
+            table.add_column("Rank", style="cyan")
+            table.add_column("Location", style="white")
+            table.add_column("Region", style="dim")
+            table.add_column("Last", justify="right")
+            table.add_column("Avg Latency", justify="right")
+            table.add_column("p99", justify="right")
+            table.add_column("Avg Loss", justify="right")
+            table.add_column("Avg Score", justify="right")
+            
+            for idx, summary in enumerate(monitor.summaries(), 1):
+                series = monitor.series[summary["name"]]
+                last = series.last_result
+                table.add_row(
+                    str(idx),
+                    f"{self.get_country_emoji(summary['name'])} {summary['name']}",
+                    summary["region"],
+                    f"{last['latency']:.1f} ms" if last else "[dim]---[/dim]",
+                    f"{summary['latency_avg']:.1f} ms",
+                    f"{last.get('latency_p99', 999):.1f} ms" if last else "[dim]---[/dim]",
+                    f"{summary['packet_loss_avg']:.1f}%",
+                    f"{summary['score_avg']:.1f}"
+                )
+            return table
+        
+        with Live(create_monitor_table(), console=console, refresh_per_second=1) as live:
+            def on_result(result):
+                if self.history:
+                    self.history.add(result)
+                    rollups.add(result)
+                if self.exporter:
+                    self.exporter.write(result)
+                live.update(create_monitor_table())
+            
+            def on_round(_):
+                if rollups:
+                    rollups.persist(self.history)
+            
+            await monitor.run(rounds=rounds, callback=on_result, on_round=on_round)
+    
+    async def run_agent(self, regions: Optional[List[str]], collector_url: str, site: str,
+                        interval: float, rounds: Optional[int] = None, token: str = ""):
+        """观测点模式：循环测试并把结果上传到汇总端"""
+        servers = self.select_servers(regions)
+        if not servers:
+            console.print("[red]No servers match the specified selection[/red]")
+            return
+        
+        agent = Agent(
+            collector_url, site, servers, interval, tester=self.tester, token=token,
+            batch_size=AGENT_CONFIG['batch_size'],
+            upload_timeout=AGENT_CONFIG['upload_timeout'],
+            max_pending_frames=AGENT_CONFIG['max_pending_frames']
+        )
+        console.print(f"[cyan]Agent '{site}' testing {len(servers)} endpoints every {interval:g}s, "
+                      f"uploading to {agent.collector_url}[/cyan]")
+        
+        def on_result(result):
+            if self.history:
+                self.history.add(result)
+        
+        def on_round(results):
+            completed = sum(1 for r in results if r['status'] == 'completed')
+            status = agent.get_status()
+            line = (f"[{datetime.now().strftime('%H:%M:%S')}] round {status['rounds']}: "
+                    f"{completed}/{len(results)} completed, {status['frames_sent']} frame(s) sent")
+            if status['last_error']:
+                line += f", [yellow]{status['frames_pending']} pending ({status['last_error']})[/yellow]"
+            console.print(line)
+        
+        await agent.run(rounds=rounds, callback=on_result, on_round=on_round)
+        status = agent.get_status()
+        if status['frames_pending'] or status['frames_dropped']:
+            console.print(f"[yellow]{status['frames_pending']} frame(s) not delivered, "
+                          f"{status['frames_dropped']} dropped[/yellow]")
+    
+    def display_history(self, regions: Optional[List[str]], metric: str, days: float):
+        """显示历史统计（各区域的分位数与丢包率）"""
+        since = datetime.now().timestamp() - days * 86400
+        regions = regions or self.history.regions()
+        
+        table = Table(
+            title=f"History: {metric} over the last {days:g} days",
+            box=box.SIMPLE_HEAD,
+            show_header=True,
+            header_style="bold cyan"
+        )
+        table.add_column("Region", style="white")
+        table.add_column("Samples", justify="right")
+        table.add_column("Avg", justify="right")
+        table.add_column("p50", justify="right")
+        table.add_column("p95", justify="right")
+        table.add_column("p99", justify="right")
+        table.add_column("Max", justify="right")
+        table.add_column("Avg Loss", justify="right")
+        
+        def fmt(value):
+            return "---" if value is None else f"{value:.1f}"
+        
+        for region in regions:
+            s = self.history.summary(region, metric, since=since)
+            table.add_row(
+                region,
+                str(s["count"]),
+                fmt(s["avg"]),
+                fmt(s["p50"]),
+                fmt(s["p95"]),
+                fmt(s["p99"]),
+                fmt(s["max"]),
+                f"{fmt(s['packet_loss_avg'])}%"
+            )
+        
+        console.print(table, justify="center")
+    
+    def display_rescored_history(self, regions: Optional[List[str]], weights: Dict[str, float], days: float):
+        """按新权重重新计算历史评分，与原评分对比各区域的平均分和排名"""
+        since = datetime.now().timestamp() - days * 86400
+        model = self.tester.scoring.with_weights(**weights)
+        totals = rescore_history(self.history, model, since=since)
+        if regions:
+            totals = {region: t for region, t in totals.items() if region in regions}
+        
+        old_rank = {region: i for i, region in enumerate(
+            sorted(totals, key=lambda r: totals[r]["old_score"], reverse=True), 1)}
+        weights_text = ", ".join(f"{k}={v:g}" for k, v in model.weights.items())
+        table = Table(
+            title=f"History re-scored over the last {days:g} days ({weights_text})",
+            box=box.SIMPLE_HEAD,
+            show_header=True,
+            header_style="bold cyan"
+        )
+        table.add_column("Rank", style="cyan")
+        table.add_column("Region", style="white")
+        table.add_column("Results", justify="right")
+        table.add_column("Old Score", justify="right")
+        table.add_column("New Score", justify="right")
+        table.add_column("Old Rank", justify="right")
+        
+        ranked = sorted(totals.items(), key=lambda item: item[1]["new_score"], reverse=True)
+        for idx, (region, t) in enumerate(ranked, 1):
+            change = old_rank[region] - idx
+            marker = f" [green]↑{change}[/green]" if change > 0 else (f" [red]↓{-change}[/red]" if change < 0 else "")
+            table.add_row(
+                str(idx),
+                region,
+                str(t["count"]),
+                f"{t['old_score']:.1f}",
+                f"{t['new_score']:.1f}",
+                f"{old_rank[region]}{marker}"
+            )
+        
+        console.print(table, justify="center")
+    
+    def recommend_best_region(self, results: ResultSet, use_case: str) -> Dict[str, Any]:
         """根据使用场景推荐最佳区域"""
         recommendations = {
             "general": lambda r: r['score'],  # 综合评分
@@ -388,7 +598,13 @@ class CLITester:
             use_case = "general"
         
         scorer = recommendations[use_case]
-        best = max(results, key=scorer)
+        # 只在完整测量的结果中推荐：快速模式中提前出局的区域只有少量ping数据，
+        # 出局依据是平均延迟，不能按丢包/抖动等其他指标与入围者比较
+        candidates = results.view().where('status', SCORED_STATUSES)
+        if not len(candidates):
+            console.print("[yellow]No fully measured region to recommend[/yellow]")
+            return {}
+        best = max(candidates, key=scorer).to_dict()
         
         panel = Panel(
             f"[bold]Best Region for {use_case.upper()}:[/bold]\n"
@@ -406,6 +622,43 @@ class CLITester:
         return best
 
 
+def parse_interval(value: str) -> float:
+    """解析时间间隔，支持 30、30s、5m、1h"""
+    units = {'s': 1, 'm': 60, 'h': 3600}
+    value = value.strip().lower()
+    try:
+        if value and value[-1] in units:
+            seconds = float(value[:-1]) * units[value[-1]]
+        else:
+            seconds = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid interval: {value}")
+    if seconds <= 0:
+        raise argparse.ArgumentTypeError("interval must be positive")
+    return seconds
+
+
+def parse_weights(value: str) -> Dict[str, float]:
+    """解析评分权重，如 latency=0.6,jitter=0.2（未给出的指标保持原权重）"""
+    weights = {}
+    for part in value.split(','):
+        key, sep, number = part.partition('=')
+        key = key.strip()
+        if not sep or key not in SCORE_WEIGHTS:
+            raise argparse.ArgumentTypeError(
+                f"invalid weight {part!r}, expected one of {', '.join(SCORE_WEIGHTS)} as name=value")
+        try:
+            weights[key] = float(number)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid weight value: {number!r}")
+    return weights
+
+
+def raise_interrupt(signum, frame):
+    """把终止信号当作Ctrl+C处理，退出前照常写出缓冲的结果、关闭历史库"""
+    raise KeyboardInterrupt
+
+
 def main():
     """主函数"""
     parser = argparse.ArgumentParser(
@@ -415,16 +668,60 @@ def main():
 Examples:
   %(prog)s                           # Test all regions
   %(prog)s --regions us-ashburn-1    # Test specific region
+  %(prog)s -r ap-* --services all    # Every service endpoint in Asia-Pacific regions
   %(prog)s --top 5                   # Show top 5 results
   %(prog)s --export json -o results.json   # Export as JSON
+  %(prog)s monitor --export ndjson -o results.ndjson   # Append every result as it completes
   %(prog)s --recommend gaming        # Get recommendation for gaming
+  %(prog)s --top 3 --fast            # Quickly find the 3 fastest regions
+  %(prog)s monitor --interval 30s --save-history   # Monitor and keep history
+  %(prog)s history -r ap-tokyo-1 --days 7          # Latency percentiles from history
+  %(prog)s history --weights latency=0.6,jitter=0.2 --days 90   # Re-rank history under new weights
+  %(prog)s agent --collector http://hub:5001 --site tokyo-office   # Upload results to a collector
         """
     )
     
+    parser.add_argument(
+        'command',
+        nargs='?',
+        choices=['test', 'monitor', 'history', 'agent'],
+        default='test',
+        help='test: one-shot sweep (default); monitor: long-running periodic sweeps; '
+             'history: query stored results; agent: periodic sweeps uploaded to a collector'
+    )
+    
     parser.add_argument(
         '--regions', '-r',
         nargs='+',
-        help='Specific regions to test (e.g., us-ashburn-1 ap-tokyo-1)'
+        help='Specific regions to test (e.g., us-ashburn-1 ap-tokyo-1, or a prefix such as ap-*)'
+    )
+    
+    parser.add_argument(
+        '--services',
+        nargs='+',
+        metavar='SERVICE',
+        help=f"Services to test, or 'all' (default: {' '.join(CATALOG_CONFIG['default_services'])})"
+    )
+    
+    parser.add_argument(
+        '--countries',
+        nargs='+',
+        metavar='COUNTRY',
+        help='Only test endpoints in these countries (e.g., 日本 韩国)'
+    )
+    
+    parser.add_argument(
+        '--tags',
+        nargs='+',
+        metavar='TAG',
+        help='Only test endpoints with any of these tags (e.g., asia-pacific)'
+    )
+    
+    parser.add_argument(
+        '--catalog',
+        metavar='FILE',
+        default=CATALOG_CONFIG['path'] or None,
+        help='Endpoint catalog file (.json or .csv) instead of the built-in catalog'
     )
     
     parser.add_argument(
@@ -435,8 +732,9 @@ Examples:
     
     parser.add_argument(
         '--export', '-e',
-        choices=['json', 'csv', 'markdown'],
-        help='Export format'
+        choices=['json', 'csv', 'markdown'] + [f for f in EXPORTERS if f != 'csv'],
+        help='Export format; csv, ndjson, arrow and parquet are written incrementally as results '
+             'complete (arrow/parquet need pyarrow)'
     )
     
     parser.add_argument(
@@ -450,6 +748,98 @@ Examples:
         help='Get recommendation for specific use case'
     )
     
+    parser.add_argument(
+        '--shards',
+        type=int,
+        metavar='N',
+        help='Split large sweeps across N worker processes (default: 1)'
+    )
+    
+    parser.add_argument(
+        '--simulate',
+        type=int,
+        metavar='SEED',
+        help='Run offline against a deterministic simulated network with the given seed'
+    )
+    
+    parser.add_argument(
+        '--fast',
+        action='store_true',
+        help='Fast mode with --top/--recommend: prune clearly slower regions early '
+             'and only fully measure the top candidates'
+    )
+    
+    parser.add_argument(
+        '--interval',
+        type=parse_interval,
+        default=parse_interval('30s'),
+        help='Monitor/agent mode: time between rounds, e.g. 30s, 5m (default: 30s)'
+    )
+    
+    parser.add_argument(
+        '--rounds',
+        type=int,
+        help='Monitor/agent mode: stop after N rounds (default: run until interrupted)'
+    )
+    
+    parser.add_argument(
+        '--history-size',
+        type=int,
+        default=120,
+        help='Monitor mode: rounds kept per endpoint in memory (default: 120)'
+    )
+    
+    parser.add_argument(
+        '--save-history',
+        action='store_true',
+        help='Store every result in the history database'
+    )
+    
+    parser.add_argument(
+        '--history-db',
+        default=HISTORY_CONFIG['path'],
+        help=f"History database path (default: {HISTORY_CONFIG['path']})"
+    )
+    
+    parser.add_argument(
+        '--collector',
+        metavar='URL',
+        help='Agent mode: collector base URL, e.g. http://localhost:5001'
+    )
+    
+    parser.add_argument(
+        '--site',
+        help='Agent mode: name of this vantage point (default: hostname)'
+    )
+    
+    parser.add_argument(
+        '--token',
+        default=os.environ.get('COLLECTOR_TOKEN', ''),
+        help='Agent mode: collector bearer token (default: $COLLECTOR_TOKEN)'
+    )
+    
+    parser.add_argument(
+        '--days',
+        type=float,
+        default=7,
+        help='History mode: time range in days (default: 7)'
+    )
+    
+    parser.add_argument(
+        '--metric',
+        choices=METRIC_COLUMNS,
+        default='latency',
+        help='History mode: metric to summarize (default: latency)'
+    )
+    
+    parser.add_argument(
+        '--weights',
+        type=parse_weights,
+        metavar='NAME=VALUE,...',
+        help='History mode: re-score stored results with new weights, e.g. latency=0.6,jitter=0.2 '
+             f"(defaults: {', '.join(f'{k}={v:g}' for k, v in SCORE_WEIGHTS.items())})"
+    )
+    
     parser.add_argument(
         '--no-ip',
         action='store_true',
@@ -468,20 +858,101 @@ Examples:
     if args.export and not args.output:
         console.print("[red]Error: --output is required when using --export[/red]")
         sys.exit(1)
+    if args.export and args.command in ('history', 'agent'):
+        console.print(f"[red]Error: --export is not supported in {args.command} mode[/red]")
+        sys.exit(1)
+    if args.command == 'monitor' and args.export and args.export not in EXPORTERS:
+        console.print(f"[red]Error: monitor mode can only export {', '.join(EXPORTERS)}[/red]")
+        sys.exit(1)
+    if args.command == 'agent' and not args.collector:
+        console.print("[red]Error: --collector is required in agent mode[/red]")
+        sys.exit(1)
+    
+    # 快速模式只需要保证前K名准确：--top N 取N，--recommend 保留前3名供场景打分
+    top_k = None
+    if args.fast:
+        if args.top:
+            top_k = args.top
+        elif args.recommend:
+            top_k = 3
+        else:
+            console.print("[yellow]--fast has no effect without --top or --recommend[/yellow]")
+    
+    if args.shards:
+        TEST_CONFIG['shards'] = args.shards
+    
+    history = None
+    if args.save_history or args.command == 'history':
+        history = HistoryStore(
+            args.history_db,
+            batch_size=HISTORY_CONFIG['batch_size'],
+            flush_interval=HISTORY_CONFIG['flush_interval']
+        )
     
     # 创建测试器
-    cli = CLITester()
+    catalog = EndpointCatalog(args.catalog) if args.catalog else None
+    try:
+        cli = CLITester(history, args.simulate, catalog, args.services, args.countries, args.tags)
+        # 提前加载目录，文件格式错误时在测试开始前报告
+        len(cli.catalog)
+    except (CatalogError, OSError) as e:
+        console.print(f"[red]Error loading catalog: {e}[/red]")
+        sys.exit(1)
+    
+    # 流式导出在测试开始前打开，每个结果完成时追加写入
+    if args.export in EXPORTERS and args.command in ('test', 'monitor'):
+        try:
+            cli.exporter = open_exporter(args.export, args.output,
+                                         buffer_size=EXPORT_CONFIG['buffer_size'],
+                                         flush_interval=EXPORT_CONFIG['flush_interval'])
+        except ExportError as e:
+            console.print(f"[red]Error: {e}[/red]")
+            sys.exit(1)
+        for name in ('SIGTERM', 'SIGHUP'):
+            if hasattr(signal, name):
+                signal.signal(getattr(signal, name), raise_interrupt)
+    
+    if args.command == 'history':
+        if args.weights:
+            cli.display_rescored_history(args.regions, args.weights, args.days)
+        else:
+            cli.display_history(args.regions, args.metric, args.days)
+        history.close()
+        return
+    
+    if args.command == 'agent':
+        try:
+            asyncio.run(cli.run_agent(args.regions, args.collector, args.site or socket.gethostname(),
+                                      args.interval, args.rounds, args.token))
+        except KeyboardInterrupt:
+            console.print("\n[yellow]Agent stopped by user[/yellow]")
+        finally:
+            if history:
+                history.close()
+        return
+    
+    if args.command == 'monitor':
+        try:
+            asyncio.run(cli.run_monitor(args.regions, args.interval, args.history_size, args.rounds))
+        except KeyboardInterrupt:
+            console.print("\n[yellow]Monitor stopped by user[/yellow]")
+        finally:
+            cli.close_exporter()
+            if history:
+                history.close()
+        return
     
     # 运行测试
     try:
         # 使用完整的Live显示模式，或者简化模式
         if args.quiet:
-            results = asyncio.run(cli.test_with_progress(args.regions))
+            results = asyncio.run(cli.test_with_progress(args.regions, top_k=top_k))
         else:
             results = asyncio.run(cli.run_full_test_with_live_display(
                 regions=args.regions,
                 show_banner=True,
-                show_ip=not args.no_ip
+                show_ip=not args.no_ip and args.simulate is None,
+                top_k=top_k
             ))
         
         if not results:
@@ -494,8 +965,15 @@ Examples:
             console.print(f"[bold cyan]Top {args.top} Results:[/bold cyan]", justify="center")
             cli.display_results_table(results, args.top)
         
-        # 导出结果
-        if args.export:
+        suspect = sum(1 for r in results if r.get('suspect'))
+        if suspect:
+            console.print(f"[yellow]⚠ {suspect} result(s) were measured while the local event loop was stalled "
+                          f"and may overstate latency[/yellow]")
+        
+        # 导出结果（流式格式已在测试过程中写入）
+        if cli.exporter:
+            cli.close_exporter()
+        elif args.export:
             cli.export_results(results, args.export, args.output)
         
         # 推荐
@@ -509,6 +987,10 @@ Examples:
     except Exception as e:
         console.print(f"[red]Error: {e}[/red]")
         sys.exit(1)
+    finally:
+        cli.close_exporter()
+        if history:
+            history.close()
 
 
 if __name__ == '__main__':
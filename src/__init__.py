@@ -1,8 +1,14 @@
 """Oracle Network Test Package"""
 
-from .config import ORACLE_SERVERS, TEST_CONFIG, SCORE_WEIGHTS, FLASK_CONFIG
+from .config import (
+    ORACLE_SERVERS, TEST_CONFIG, SCORE_WEIGHTS, FLASK_CONFIG, HISTORY_CONFIG, ROLLUP_CONFIG,
+    COLLECTOR_CONFIG, AGENT_CONFIG, CATALOG_CONFIG, EXPORT_CONFIG,
+    PUBLIC_IP_CONFIG
+)
+from .catalog import EndpointCatalog
 from .network_tester import NetworkTester
-from .utils import get_public_ip, format_latency, format_percentage
+from .resultset import ResultSet
+from .utils import get_public_ip, fetch_public_ip, format_latency, format_percentage
 
 __version__ = "2.1.0"
 __author__ = "Oracle Network Test Contributors"
@@ -12,8 +18,18 @@ __all__ = [
     "TEST_CONFIG", 
     "SCORE_WEIGHTS",
     "FLASK_CONFIG",
+    "HISTORY_CONFIG",
+    "ROLLUP_CONFIG",
+    "COLLECTOR_CONFIG",
+    "AGENT_CONFIG",
+    "CATALOG_CONFIG",
+    "EXPORT_CONFIG",
+    "PUBLIC_IP_CONFIG",
+    "EndpointCatalog",
     "NetworkTester",
+    "ResultSet",
     "get_public_ip",
+    "fetch_public_ip",
     "format_latency",
     "format_percentage"
 ]
\ No newline at end of file
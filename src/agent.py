@@ -0,0 +1,140 @@
+"""观测点模块 - 按固定间隔运行测试，把结果攒批压缩后上传到汇总端
+
+每个观测点（站点）运行一个 Agent，汇总端（Flask应用的 /api/collector/frames）
+把所有站点的结果合并为 (站点, 区域) 矩阵。汇总端暂时不可达时，结果帧缓存在
+有界队列中，下次上传时按顺序补发。
+"""
+
+import asyncio
+import logging
+import socket
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+import aiohttp
+
+from .collector import encode_frame
+from .monitor import Monitor
+from .network_tester import NetworkTester
+
+logger = logging.getLogger(__name__)
+
+FRAME_CONTENT_TYPE = "application/x-oracle-frame+zlib"
+
+
+class Agent:
+    """观测点：复用 Monitor 循环测试，结果满一批或每轮结束时上传"""
+
+    def __init__(self, collector_url: str, site: str, servers: Dict[str, Dict[str, Any]],
+                 interval: float, tester: Optional[NetworkTester] = None, token: str = "",
+                 batch_size: int = 200, upload_timeout: float = 10, max_pending_frames: int = 100):
+        self.collector_url = collector_url.rstrip("/") + "/api/collector/frames"
+        self.site = site
+        self.agent_id = f"{socket.gethostname()}:{site}"
+        self.token = token
+        self.batch_size = batch_size
+        self.upload_timeout = upload_timeout
+        self.monitor = Monitor(servers, interval, history_size=1, tester=tester)
+        self._batch: List[Dict[str, Any]] = []
+        self._pending: Deque[bytes] = deque(maxlen=max_pending_frames)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._uploading = asyncio.Lock()
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def tester(self) -> NetworkTester:
+        return self.monitor.tester
+
+    def _seal(self) -> None:
+        """把当前批次编码为结果帧放入待上传队列"""
+        if not self._batch:
+            return
+        if len(self._pending) == self._pending.maxlen:
+            self.frames_dropped += 1
+        self._pending.append(encode_frame(self.site, self._batch, agent=self.agent_id))
+        self._batch = []
+
+    async def flush(self) -> bool:
+        """上传所有待发送的结果帧，全部成功时返回True"""
+        self._seal()
+        async with self._uploading:
+            headers = {"Content-Type": FRAME_CONTENT_TYPE}
+            if self.token:
+                headers["Authorization"] = f"Bearer {self.token}"
+            while self._pending:
+                frame = self._pending[0]
+                try:
+                    async with self._session.post(self.collector_url, data=frame, headers=headers) as resp:
+                        if resp.status == 400:
+                            # 汇总端拒绝的帧重发也不会成功，直接丢弃
+                            logger.error(f"Collector rejected frame: {await resp.text()}")
+                            self._pending.popleft()
+                            self.frames_dropped += 1
+                            continue
+                        resp.raise_for_status()
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    self.last_error = str(e) or type(e).__name__
+                    logger.warning(f"Upload to {self.collector_url} failed, "
+                                   f"{len(self._pending)} frame(s) pending: {self.last_error}")
+                    return False
+                self._pending.popleft()
+                self.frames_sent += 1
+            self.last_error = None
+            return True
+
+    async def run(self, rounds: Optional[int] = None,
+                  callback: Optional[callable] = None,
+                  on_round: Optional[callable] = None) -> None:
+        """运行观测点，rounds为None时一直运行直到 stop()
+
+        callback在每个结果完成时调用，on_round在每轮结束并上传后以该轮结果列表调用。
+        """
+        tasks = set()
+
+        def upload() -> None:
+            # 上传在后台进行，不阻塞本轮剩余的探测
+            task = asyncio.ensure_future(self.flush())
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        def on_result(result: Dict[str, Any]) -> None:
+            self._batch.append(dict(result, ts=time.time()))
+            if len(self._batch) >= self.batch_size:
+                self._seal()
+                upload()
+            if callback:
+                callback(result)
+
+        def round_done(results: List[Dict[str, Any]]) -> None:
+            upload()
+            if on_round:
+                on_round(results)
+
+        timeout = aiohttp.ClientTimeout(total=self.upload_timeout)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            self._session = session
+            try:
+                await self.monitor.run(rounds=rounds, callback=on_result, on_round=round_done)
+            finally:
+                if tasks:
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                await self.flush()
+                self._session = None
+
+    def stop(self) -> None:
+        """当前轮结束后停止"""
+        self.monitor.stop()
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "site": self.site,
+            "collector": self.collector_url,
+            "rounds": self.monitor.rounds_completed,
+            "frames_sent": self.frames_sent,
+            "frames_pending": len(self._pending),
+            "frames_dropped": self.frames_dropped,
+            "last_error": self.last_error
+        }
@@ -0,0 +1,405 @@
+"""探测后端模块 - NetworkTester 的全部网络访问（DNS、ping、HTTPS）经由可替换的后端完成
+
+LiveBackend 是默认后端，访问真实网络；SimulatedBackend 按每个区域的延迟、抖动、丢包模型
+和固定随机种子生成结果，可以完全离线、可重复地运行任意规模的测试，
+用于单独分析和优化调度、采样、评分等编排逻辑。
+"""
+
+import asyncio
+import hashlib
+import ipaddress
+import platform
+import random
+import re
+import subprocess
+import threading
+import time
+import logging
+from concurrent.futures import Executor
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from .config import TEST_CONFIG
+from .icmp import PingEngine, ICMPUnavailableError, build_ping_result
+from .https_probe import HTTPSProber
+from .resolver import DNSResolver
+from .stats import SampleBuffer
+
+logger = logging.getLogger(__name__)
+
+
+class ProbeBackend:
+    """探测后端接口
+
+    - resolver: 具有 resolve / resolve_all / get_cached 的解析器（DNSResolver 或其子类）
+    - ping(): 返回 build_ping_result 结构的结果
+    - connect(): 一次HTTPS探测，返回 HTTPSProber.probe 结构的结果
+    """
+
+    name = "base"
+    resolver: DNSResolver
+    # 等待线程池执行的探测数（只有使用线程池的后端会改变）
+    executor_waiting = 0
+
+    def prepare(self) -> None:
+        """一轮测试开始前调用，做好耗时的初始化，避免在测量过程中阻塞事件循环"""
+
+    async def sleep(self, seconds: float) -> None:
+        """探测之间的间隔等待（模拟后端按 time_scale 缩放）"""
+        await asyncio.sleep(seconds)
+
+    def worker_spec(self) -> Optional[Tuple[type, Dict[str, Any]]]:
+        """分片测试时在工作进程中重建后端所需的 (类, 关键字参数)，None表示使用默认的 LiveBackend
+
+        工作进程以 类(该分片的服务器, **关键字参数) 创建后端。
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support sharded sweeps")
+
+    async def ping(self, host: str, count: int, timeout: float,
+                   address: Optional[str] = None) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    async def connect(self, host: str, port: int = 443,
+                      address: Optional[str] = None) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """释放后端持有的套接字等资源"""
+
+
+class LiveBackend(ProbeBackend):
+    """真实网络后端：原生ICMP（不可用时回退到系统ping命令）与分阶段计时的HTTPS探测"""
+
+    name = "live"
+
+    def __init__(self, executor: Executor):
+        # 系统ping回退在线程池中执行
+        self.executor = executor
+        self.executor_waiting = 0
+        self._waiting_lock = threading.Lock()
+        # None表示尚未探测，False表示原生ICMP不可用、已回退到系统ping
+        self.icmp_available: Optional[bool] = None
+        # 所有ping共享一个ICMP套接字，按事件循环惰性创建
+        self._ping_engine: Optional[PingEngine] = None
+        self._https_prober: Optional[HTTPSProber] = None
+        # ping和HTTPS探测共用的DNS缓存，每个主机每轮只解析一次
+        self.resolver = DNSResolver(
+            timeout=TEST_CONFIG["dns_timeout"],
+            max_entries=TEST_CONFIG["dns_cache_size"],
+            min_ttl=TEST_CONFIG["dns_min_ttl"],
+            max_ttl=TEST_CONFIG["dns_max_ttl"]
+        )
+
+    def prepare(self) -> None:
+        self._get_https_prober()
+
+    def worker_spec(self) -> None:
+        return None
+
+    def _get_ping_engine(self) -> PingEngine:
+        """获取绑定到当前事件循环的共享ping引擎"""
+        loop = asyncio.get_running_loop()
+        if self._ping_engine is None or self._ping_engine.loop is not loop:
+            if self._ping_engine is not None:
+                self._ping_engine.close()
+            self._ping_engine = PingEngine(send_gap=TEST_CONFIG["ping_send_gap"])
+            self._ping_engine.open()
+        return self._ping_engine
+
+    def _get_https_prober(self) -> HTTPSProber:
+        """获取整次测试共享的HTTPS探测器"""
+        if self._https_prober is None:
+            self._https_prober = HTTPSProber(TEST_CONFIG["connection_timeout"])
+        return self._https_prober
+
+    async def ping(self, host: str, count: int, timeout: float,
+                   address: Optional[str] = None) -> Dict[str, Any]:
+        """优先使用原生ICMP，不可用时回退到系统ping命令"""
+        if TEST_CONFIG["ping_method"] == "auto" and self.icmp_available is not False:
+            try:
+                engine = self._get_ping_engine()
+                result = await engine.ping(host, count, timeout, TEST_CONFIG["ping_interval"], address)
+                self.icmp_available = True
+                return result
+            except ICMPUnavailableError as e:
+                self.icmp_available = False
+                self._ping_engine = None
+                logger.warning(f"ICMP socket unavailable ({e}), falling back to system ping")
+
+        submitted = time.perf_counter()
+        with self._waiting_lock:
+            self.executor_waiting += 1
+
+        started = False
+
+        def dequeued():
+            nonlocal started
+            with self._waiting_lock:
+                if not started:
+                    started = True
+                    self.executor_waiting -= 1
+
+        def run():
+            # 线程池排队时间：系统ping回退时线程数不足会在这里体现
+            wait = (time.perf_counter() - submitted) * 1000
+            dequeued()
+            r = self.ping_host(address or host, count, timeout)
+            r["executor_wait"] = wait
+            return r
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, run)
+        finally:
+            # 排队期间被取消时任务不会再执行
+            dequeued()
+
+    async def connect(self, host: str, port: int = 443,
+                      address: Optional[str] = None) -> Dict[str, Any]:
+        return await self._get_https_prober().probe(host, port=port, address=address)
+
+    def close(self) -> None:
+        if self._ping_engine is not None:
+            self._ping_engine.close()
+            self._ping_engine = None
+
+    def ping_host(self, host: str, count: int = None, timeout: int = None) -> Dict[str, Any]:
+        """执行ping测试"""
+        count = count or TEST_CONFIG["ping_count"]
+        timeout = timeout or TEST_CONFIG["ping_timeout"]
+        
+        system = platform.system().lower()
+        
+        if system == "windows":
+            cmd = ["ping", "-n", str(count), "-w", str(timeout * 1000), host]
+        elif system == "darwin":
+            cmd = ["ping", "-c", str(count), "-W", str(timeout * 1000), host]
+        else:
+            cmd = ["ping", "-c", str(count), "-W", str(timeout), host]
+        
+        try:
+            result = subprocess.run(
+                cmd,
+                capture_output=True,
+                text=True,
+                timeout=timeout * count + 5
+            )
+            
+            output = result.stdout
+            
+            # 优先解析每个包的RTT（Linux/macOS/Windows均逐行输出 time=）
+            time_pattern = r'(?:time|时间)[=<]\s*([\d.]+)\s*ms'
+            time_matches = re.findall(time_pattern, output)
+            
+            if time_matches:
+                samples = SampleBuffer(float(t) for t in time_matches)
+                return {
+                    "min": min(samples),
+                    "avg": samples.mean(),
+                    "max": max(samples),
+                    "jitter": samples.stdev(),
+                    "packet_loss": self._parse_packet_loss(output),
+                    "success": True,
+                    "samples": samples
+                }
+            
+            # 只有统计行时无法得到逐包RTT，samples留空而不是伪造
+            stats_pattern = r'(?:round-trip|rtt) min/avg/max/(?:stddev|mdev) = ([\d.]+)/([\d.]+)/([\d.]+)/([\d.]+)'
+            stats_match = re.search(stats_pattern, output)
+            
+            if stats_match:
+                return {
+                    "min": float(stats_match.group(1)),
+                    "avg": float(stats_match.group(2)),
+                    "max": float(stats_match.group(3)),
+                    "jitter": float(stats_match.group(4)),
+                    "packet_loss": self._parse_packet_loss(output),
+                    "success": True,
+                    "samples": SampleBuffer()
+                }
+            
+            # 如果没有解析到延迟，检查是否全部丢包
+            packet_loss = self._parse_packet_loss(output)
+            if packet_loss == 100:
+                return {
+                    "min": 999,
+                    "avg": 999,
+                    "max": 999,
+                    "jitter": 0,
+                    "packet_loss": 100,
+                    "success": False,
+                    "error": "100% packet loss",
+                    "samples": SampleBuffer()
+                }
+            
+            return {
+                "min": 999,
+                "avg": 999,
+                "max": 999,
+                "jitter": 0,
+                "packet_loss": 100,
+                "success": False,
+                "error": "Failed to parse ping output",
+                "samples": SampleBuffer()
+            }
+            
+        except subprocess.TimeoutExpired:
+            return {
+                "min": 999,
+                "avg": 999,
+                "max": 999,
+                "jitter": 0,
+                "packet_loss": 100,
+                "success": False,
+                "error": "Ping timeout",
+                "samples": SampleBuffer()
+            }
+        except Exception as e:
+            logger.error(f"Ping error for {host}: {str(e)}")
+            return {
+                "min": 999,
+                "avg": 999,
+                "max": 999,
+                "jitter": 0,
+                "packet_loss": 100,
+                "success": False,
+                "error": str(e),
+                "samples": SampleBuffer()
+            }
+    
+    def _parse_packet_loss(self, output: str) -> float:
+        """解析丢包率"""
+        loss_patterns = [
+            r'(\d+(?:\.\d+)?)\s*%\s*(?:packet\s*)?loss',
+            r'(\d+(?:\.\d+)?)\s*%\s*丢失',
+            r'丢包率\s*=\s*(\d+(?:\.\d+)?)\s*%'
+        ]
+        
+        for pattern in loss_patterns:
+            match = re.search(pattern, output, re.IGNORECASE)
+            if match:
+                return float(match.group(1))
+        
+        return 0.0
+
+
+class RegionModel:
+    """一个区域的网络模型（毫秒 / 比例）"""
+
+    __slots__ = ("latency", "jitter", "loss", "server_time")
+
+    def __init__(self, latency: float, jitter: float = 0.0, loss: float = 0.0, server_time: float = 5.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.server_time = server_time
+
+    def __repr__(self) -> str:
+        return (f"RegionModel(latency={self.latency!r}, jitter={self.jitter!r}, "
+                f"loss={self.loss!r}, server_time={self.server_time!r})")
+
+
+class SimulatedResolver(DNSResolver):
+    """模拟DNS：每个主机得到固定的基准测试网段地址（198.18.0.0/15）和确定的解析耗时"""
+
+    def __init__(self, backend: "SimulatedBackend"):
+        super().__init__(max_entries=TEST_CONFIG["dns_cache_size"], nameservers=[])
+        self._backend = backend
+
+    async def _resolve_uncached(self, host: str):
+        rng = random.Random(f"{self._backend.seed}:dns:{host}")
+        try:
+            ipaddress.ip_address(host)
+            address = host
+        except ValueError:
+            digest = hashlib.blake2b(host.encode(), digest_size=4).digest()
+            address = str(ipaddress.IPv4Address("198.18.0.0") + int.from_bytes(digest, "big") % (1 << 17))
+        resolve_time = round(rng.uniform(1.0, 30.0), 3)
+        await self._backend.wait(resolve_time)
+        return self._store(host, [address], self.max_ttl, resolve_time)
+
+
+class SimulatedBackend(ProbeBackend):
+    """确定性的模拟网络后端
+
+    每个主机使用由 (seed, 主机名) 确定的独立随机数序列，因此结果与并发调度顺序无关：
+    相同的种子、服务器列表和配置总是得到相同的结果。
+    servers 用于把主机映射到区域；models 未给出的区域按种子生成一个模型。
+    time_scale 为0时不等待（只测编排开销），为1时按模拟的耗时真实等待。
+    """
+
+    name = "simulated"
+
+    def __init__(self, servers: Optional[Mapping[str, Mapping[str, Any]]] = None, seed: int = 0,
+                 models: Optional[Mapping[str, RegionModel]] = None, time_scale: float = 0.0):
+        self.seed = seed
+        self.time_scale = time_scale
+        self.models: Dict[str, RegionModel] = dict(models or {})
+        self._regions: Dict[str, str] = {}
+        self._rngs: Dict[str, random.Random] = {}
+        self.resolver = SimulatedResolver(self)
+        if servers:
+            self.add_servers(servers)
+
+    def worker_spec(self) -> Tuple[type, Dict[str, Any]]:
+        # 每个主机的随机数序列只由 (seed, 主机名) 决定，分片后结果与单进程完全相同
+        return SimulatedBackend, {"seed": self.seed, "models": self.models, "time_scale": self.time_scale}
+
+    def add_servers(self, servers: Mapping[str, Mapping[str, Any]]) -> None:
+        """登记服务器（endpoint -> region）"""
+        for info in servers.values():
+            self._regions[info["endpoint"]] = info["region"]
+
+    def model_for(self, host: str) -> RegionModel:
+        region = self._regions.get(host, host)
+        model = self.models.get(region)
+        if model is None:
+            rng = random.Random(f"{self.seed}:region:{region}")
+            latency = rng.uniform(5.0, 300.0)
+            model = self.models[region] = RegionModel(
+                latency=round(latency, 3),
+                jitter=round(latency * rng.uniform(0.01, 0.1), 3),
+                loss=round(rng.choice((0.0, 0.0, 0.0, 0.005, 0.01, 0.03)), 3),
+                server_time=round(rng.uniform(2.0, 20.0), 3)
+            )
+        return model
+
+    def _rng(self, host: str) -> random.Random:
+        rng = self._rngs.get(host)
+        if rng is None:
+            rng = self._rngs[host] = random.Random(f"{self.seed}:{host}")
+        return rng
+
+    def _rtt(self, rng: random.Random, model: RegionModel) -> float:
+        return max(0.05, rng.gauss(model.latency, model.jitter))
+
+    async def wait(self, ms: float) -> None:
+        # 始终让出一次事件循环，保持与真实探测相同的调度交错
+        await asyncio.sleep(ms * self.time_scale / 1000 if self.time_scale else 0)
+
+    async def sleep(self, seconds: float) -> None:
+        await self.wait(seconds * 1000)
+
+    async def ping(self, host: str, count: int, timeout: float,
+                   address: Optional[str] = None) -> Dict[str, Any]:
+        model = self.model_for(host)
+        rng = self._rng(host)
+        rtts = []
+        for _ in range(count):
+            rtt = self._rtt(rng, model)
+            if rng.random() >= model.loss and rtt <= timeout * 1000:
+                rtts.append(rtt)
+        await self.wait((count - 1) * TEST_CONFIG["ping_interval"] * 1000 + (max(rtts) if rtts else timeout * 1000))
+        return build_ping_result(rtts, count)
+
+    async def connect(self, host: str, port: int = 443,
+                      address: Optional[str] = None) -> Dict[str, Any]:
+        model = self.model_for(host)
+        rng = self._rng(host)
+        # 握手的任一往返丢包且重传超时即视为失败
+        if rng.random() < 1 - (1 - model.loss) ** 3:
+            await self.wait(TEST_CONFIG["connection_timeout"] * 1000)
+            return {"success": False, "error": "timeout"}
+        tcp = self._rtt(rng, model)
+        tls = self._rtt(rng, model) + rng.uniform(0.5, 2.0)
+        ttfb = self._rtt(rng, model) + model.server_time
+        await self.wait(tcp + tls + ttfb)
+        return {"dns": 0.0, "tcp": tcp, "tls": tls, "ttfb": ttfb, "success": True}
@@ -0,0 +1,300 @@
+"""端点目录模块 - 从JSON/CSV文件按需加载端点，并按区域、国家、服务、标签建立索引
+
+目录中的每个端点与 ORACLE_SERVERS 的条目格式兼容（endpoint/region/location，可选port），
+另有 country、service、tags 字段。未指定目录文件时，由 ORACLE_SERVERS 的区域
+与 SERVICE_HOSTS 中的服务模板生成内置目录（每个区域若干个服务端点）。
+
+JSON 文件可以是 {名称: 端点} 字典或带 name 字段的端点列表；
+CSV 文件的列为 name,endpoint,region,location,country,service,tags,port，
+tags 以分号分隔，空列使用默认值。
+"""
+
+import bisect
+import csv
+import json
+import os
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
+
+from .config import ORACLE_SERVERS, CATALOG_CONFIG
+
+# 内置目录中每个区域的服务端点：服务 -> (主机名模板, 显示名称)
+SERVICE_HOSTS = {
+    "iaas": ("iaas.{region}.oraclecloud.com", ""),
+    "objectstorage": ("objectstorage.{region}.oraclecloud.com", "对象存储"),
+    "identity": ("identity.{region}.oci.oraclecloud.com", "身份认证"),
+    "containerregistry": ("{region}.ocir.io", "容器镜像仓库"),
+    "database": ("database.{region}.oraclecloud.com", "数据库"),
+}
+
+# 区域代码前缀 -> 地理分区标签
+AREA_TAGS = {
+    "us": "americas", "ca": "americas", "sa": "americas", "mx": "americas",
+    "uk": "europe", "eu": "europe",
+    "me": "middle-east-africa", "il": "middle-east-africa", "af": "middle-east-africa",
+    "ap": "asia-pacific",
+}
+
+COUNTRY_FLAGS = {
+    "美国": "🇺🇸",
+    "加拿大": "🇨🇦",
+    "巴西": "🇧🇷",
+    "智利": "🇨🇱",
+    "英国": "🇬🇧",
+    "德国": "🇩🇪",
+    "瑞士": "🇨🇭",
+    "荷兰": "🇳🇱",
+    "法国": "🇫🇷",
+    "沙特阿拉伯": "🇸🇦",
+    "阿联酋": "🇦🇪",
+    "以色列": "🇮🇱",
+    "南非": "🇿🇦",
+    "印度": "🇮🇳",
+    "新加坡": "🇸🇬",
+    "澳大利亚": "🇦🇺",
+    "日本": "🇯🇵",
+    "韩国": "🇰🇷",
+}
+
+DEFAULT_FLAG = "🌍"
+
+class CatalogError(ValueError):
+    """目录文件格式错误"""
+
+
+def guess_country(*texts: str) -> str:
+    """从名称或位置文本中找出已知国家（只在建立目录时调用一次）"""
+    for text in texts:
+        for country in COUNTRY_FLAGS:
+            if text and country in text:
+                return country
+    return ""
+
+
+def _normalize(name: str, info: Mapping[str, Any]) -> Dict[str, Any]:
+    """校验并补全一个端点条目"""
+    if not name:
+        raise CatalogError("catalog entry is missing a name")
+    endpoint = info.get("endpoint")
+    region = info.get("region")
+    if not endpoint or not region:
+        raise CatalogError(f"catalog entry {name!r} needs endpoint and region")
+    location = info.get("location") or ""
+    tags = info.get("tags") or []
+    if isinstance(tags, str):
+        tags = [t.strip() for t in tags.split(";") if t.strip()]
+    entry = {
+        "endpoint": endpoint,
+        "region": region,
+        "location": location,
+        "country": info.get("country") or guess_country(location, name),
+        "service": info.get("service") or "iaas",
+        "tags": list(tags)
+    }
+    port = info.get("port")
+    if port not in (None, ""):
+        try:
+            entry["port"] = int(port)
+        except (TypeError, ValueError):
+            raise CatalogError(f"catalog entry {name!r} has an invalid port: {port!r}")
+    return entry
+
+
+def builtin_entries() -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """由 ORACLE_SERVERS 的区域与 SERVICE_HOSTS 生成内置目录"""
+    for service, (template, label) in SERVICE_HOSTS.items():
+        for name, info in ORACLE_SERVERS.items():
+            region = info["region"]
+            area = AREA_TAGS.get(region.split("-", 1)[0])
+            yield (f"{name} · {label}" if label else name), {
+                "endpoint": template.format(region=region),
+                "region": region,
+                "location": info["location"],
+                "service": service,
+                "tags": [area] if area else []
+            }
+
+
+def read_catalog_file(path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """读取JSON或CSV目录文件，逐条产出 (名称, 条目)"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                yield (row.get("name") or "").strip(), {k: (v or "").strip() for k, v in row.items() if k}
+    elif ext == ".json":
+        with open(path, encoding="utf-8") as f:
+            try:
+                data = json.load(f)
+            except ValueError as e:
+                raise CatalogError(f"invalid catalog JSON {path}: {e}")
+        if isinstance(data, dict):
+            yield from data.items()
+        elif isinstance(data, list):
+            for item in data:
+                if not isinstance(item, dict):
+                    raise CatalogError(f"catalog list items must be objects: {path}")
+                yield item.get("name", ""), item
+        else:
+            raise CatalogError(f"catalog JSON must be an object or a list: {path}")
+    else:
+        raise CatalogError(f"unsupported catalog format (use .json or .csv): {path}")
+
+
+class EndpointCatalog:
+    """端点目录
+
+    条目在首次访问时才加载并建立索引（大目录不拖慢启动）；之后按区域、国家、
+    服务、标签筛选只需查索引，区域前缀（如 ap-*）在有序区域列表上二分查找。
+    """
+
+    def __init__(self, path: Optional[str] = None,
+                 entries: Optional[Iterable[Tuple[str, Mapping[str, Any]]]] = None):
+        self.path = path
+        self._source = entries
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._indexes: Dict[str, Dict[str, List[str]]] = {}
+        self._sorted_regions: List[str] = []
+        # 名称 -> 目录中的序号，用于按目录顺序输出筛选结果
+        self._position: Dict[str, int] = {}
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is not None:
+            return self._entries
+        with self._lock:
+            if self._entries is not None:
+                return self._entries
+            if self._source is not None:
+                source = self._source
+            elif self.path:
+                source = read_catalog_file(self.path)
+            else:
+                source = builtin_entries()
+            entries: Dict[str, Dict[str, Any]] = {}
+            indexes: Dict[str, Dict[str, List[str]]] = {
+                "region": {}, "country": {}, "service": {}, "tag": {}
+            }
+            for name, info in source:
+                if name in entries:
+                    raise CatalogError(f"duplicate catalog entry: {name!r}")
+                entry = entries[name] = _normalize(name, info)
+                self._position[name] = len(self._position)
+                indexes["region"].setdefault(entry["region"], []).append(name)
+                indexes["service"].setdefault(entry["service"], []).append(name)
+                if entry["country"]:
+                    indexes["country"].setdefault(entry["country"], []).append(name)
+                for tag in entry["tags"]:
+                    indexes["tag"].setdefault(tag, []).append(name)
+            self._indexes = indexes
+            self._sorted_regions = sorted(indexes["region"])
+            self._entries = entries
+            return entries
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._load()
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        return self._load().get(name)
+
+    def values(self, key: str) -> List[str]:
+        """某个索引的所有取值（region/country/service/tag）"""
+        self._load()
+        return sorted(self._indexes[key])
+
+    def country_flag(self, name: str) -> str:
+        """端点所在国家的旗帜emoji"""
+        entry = self._load().get(name)
+        return COUNTRY_FLAGS.get(entry["country"], DEFAULT_FLAG) if entry else DEFAULT_FLAG
+
+    def _regions_matching(self, token: str) -> List[str]:
+        if not token.endswith("*"):
+            return [token]
+        prefix = token[:-1]
+        regions = self._sorted_regions
+        i = bisect.bisect_left(regions, prefix)
+        matched = []
+        while i < len(regions) and regions[i].startswith(prefix):
+            matched.append(regions[i])
+            i += 1
+        return matched
+
+    def select(self, regions: Optional[Iterable[str]] = None,
+               countries: Optional[Iterable[str]] = None,
+               services: Optional[Iterable[str]] = None,
+               tags: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """按条件筛选端点，返回 {名称: 条目}（保持目录顺序）
+
+        同一条件内的多个值取并集，不同条件之间取交集；条件为None或空时不限制。
+        regions 中的值可以是区域代码、区域前缀（ap-*）或端点名称。
+        """
+        entries = self._load()
+        names: Set[str] = set()
+        conditions: Dict[str, Set[str]] = {}
+        if regions:
+            region_set: Set[str] = set()
+            for token in regions:
+                if token in entries:
+                    names.add(token)
+                else:
+                    region_set.update(self._regions_matching(token))
+            conditions["region"] = region_set
+        for key, values in (("country", countries), ("service", services), ("tag", tags)):
+            if values:
+                conditions[key] = set(values)
+        if not conditions:
+            return dict(entries)
+
+        def matching(candidates: Iterable[str], skip: str) -> List[str]:
+            # 遍历的条件已由索引保证，其余条件直接检查条目字段
+            region_set, country_set, service_set, tag_set = (
+                None if key == skip else conditions.get(key)
+                for key in ("region", "country", "service", "tag")
+            )
+            selected = []
+            for name in candidates:
+                entry = entries[name]
+                if region_set is not None and entry["region"] not in region_set:
+                    continue
+                if country_set is not None and entry["country"] not in country_set:
+                    continue
+                if service_set is not None and entry["service"] not in service_set:
+                    continue
+                if tag_set is not None and tag_set.isdisjoint(entry["tags"]):
+                    continue
+                selected.append(name)
+            return selected
+
+        if names:
+            # 按名称指定的端点与按区域代码选中的端点取并集，再应用其他条件
+            index = self._indexes["region"]
+            names.update(n for region in conditions["region"] for n in index.get(region, ()))
+            selected = matching(names, "region")
+        else:
+            # 只遍历候选最少的条件在索引中的名单
+            key = min(conditions, key=lambda k: sum(len(self._indexes[k].get(v, ())) for v in conditions[k]))
+            index = self._indexes[key]
+            candidates = [name for value in conditions[key] for name in index.get(value, ())]
+            if key == "tag" and len(conditions["tag"]) > 1:
+                # 一个端点可能同时带有多个所选标签
+                candidates = set(candidates)
+            selected = matching(candidates, key)
+        selected.sort(key=self._position.__getitem__)
+        return {name: entries[name] for name in selected}
+
+
+_default_catalog: Optional[EndpointCatalog] = None
+_default_lock = threading.Lock()
+
+
+def default_catalog() -> EndpointCatalog:
+    """按 CATALOG_CONFIG 创建的全局目录（首次调用时创建，条目仍按需加载）"""
+    global _default_catalog
+    if _default_catalog is None:
+        with _default_lock:
+            if _default_catalog is None:
+                _default_catalog = EndpointCatalog(CATALOG_CONFIG["path"] or None)
+    return _default_catalog
@@ -0,0 +1,197 @@
+"""汇总模块 - 接收各观测点（agent）上传的结果帧，合并为 (站点, 区域) 矩阵
+
+结果帧是 zlib 压缩的 JSON：
+    {"v": 1, "site": "...", "agent": "...", "sent_at": 时间戳,
+     "fields": [字段名...], "rows": [[字段值...], ...]}
+每行按 fields 的顺序给出一个结果，比逐条重复字段名的对象数组小得多。
+"""
+
+import json
+import math
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, Optional
+
+from .stats import QuantileSketch
+
+FRAME_VERSION = 1
+
+# 结果帧中每个结果携带的字段（ts 为该结果的测量时间）
+FRAME_FIELDS = (
+    "ts", "name", "region", "status", "latency", "jitter", "packet_loss",
+    "connection_time", "ttfb", "score"
+)
+
+# 矩阵单元格中维护分位数的指标
+MATRIX_METRICS = ("latency", "jitter", "packet_loss", "connection_time", "ttfb", "score")
+
+
+class FrameError(ValueError):
+    """结果帧格式错误或超出大小限制"""
+
+
+def result_time(value: Any, now: float) -> float:
+    """结果的测量时间：缺失或不是有效数字时使用接收时间，晚于接收时间的（时钟超前）截断为接收时间"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value < 0:
+        return now
+    return min(float(value), now)
+
+
+def encode_frame(site: str, results: Iterable[Dict[str, Any]], agent: str = "",
+                 sent_at: Optional[float] = None) -> bytes:
+    """把一批结果编码为压缩的结果帧"""
+    now = time.time()
+    rows = [
+        [result.get("ts", now) if field == "ts" else result.get(field) for field in FRAME_FIELDS]
+        for result in results
+    ]
+    payload = {
+        "v": FRAME_VERSION,
+        "site": site,
+        "agent": agent,
+        "sent_at": sent_at or now,
+        "fields": list(FRAME_FIELDS),
+        "rows": rows
+    }
+    return zlib.compress(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 6)
+
+
+def decode_frame(data: bytes, max_size: int = 16 * 1024 * 1024) -> Dict[str, Any]:
+    """解压并解析结果帧，返回 {"site", "agent", "sent_at", "results": [...]}"""
+    decompressor = zlib.decompressobj()
+    try:
+        raw = decompressor.decompress(data, max_size)
+    except zlib.error as e:
+        raise FrameError(f"invalid frame compression: {e}")
+    if decompressor.unconsumed_tail:
+        raise FrameError("frame exceeds the maximum decompressed size")
+    try:
+        payload = json.loads(raw)
+    except ValueError as e:
+        raise FrameError(f"invalid frame JSON: {e}")
+    if not isinstance(payload, dict) or payload.get("v") != FRAME_VERSION:
+        raise FrameError("unsupported frame version")
+    site = payload.get("site")
+    fields = payload.get("fields")
+    rows = payload.get("rows")
+    if not site or not isinstance(site, str) or not isinstance(fields, list) or not isinstance(rows, list):
+        raise FrameError("frame is missing site, fields or rows")
+    results = []
+    for row in rows:
+        if not isinstance(row, list) or len(row) != len(fields):
+            raise FrameError("frame row does not match fields")
+        results.append(dict(zip(fields, row)))
+    return {
+        "site": site,
+        "agent": payload.get("agent", ""),
+        "sent_at": payload.get("sent_at"),
+        "results": results
+    }
+
+
+class MatrixCell:
+    """一个 (站点, 区域) 单元格：最新结果、结果数与各指标的分位数sketch"""
+
+    __slots__ = ("latest", "updated_at", "count", "failures", "sketches")
+
+    def __init__(self):
+        self.latest: Dict[str, Any] = {}
+        self.updated_at = 0.0
+        self.count = 0
+        self.failures = 0
+        self.sketches = {metric: QuantileSketch() for metric in MATRIX_METRICS}
+
+    def add(self, result: Dict[str, Any]) -> None:
+        self.count += 1
+        ts = result.get("ts") or time.time()
+        if ts >= self.updated_at:
+            self.updated_at = ts
+            self.latest = result
+        if result.get("status") not in ("completed", "pruned"):
+            self.failures += 1
+            return
+        for metric, sketch in self.sketches.items():
+            if metric == "score" and result.get("status") == "pruned":
+                # 提前出局的结果没有评分
+                continue
+            value = result.get(metric)
+            if isinstance(value, (int, float)) and value < 999:
+                sketch.add(value)
+
+    def to_dict(self, metric: str) -> Dict[str, Any]:
+        sketch = self.sketches[metric]
+
+        def q(p):
+            value = sketch.quantile(p)
+            return round(value, 3) if value is not None else None
+        return {
+            "value": self.latest.get(metric),
+            "status": self.latest.get("status"),
+            "updated_at": self.updated_at,
+            "count": self.count,
+            "failures": self.failures,
+            "p50": q(0.5),
+            "p95": q(0.95),
+            "mean": round(sketch.mean, 3) if sketch.count else None
+        }
+
+
+class Collector:
+    """线程安全的多观测点结果汇总"""
+
+    def __init__(self, stale_after: float = 300):
+        self.stale_after = stale_after
+        self._lock = threading.Lock()
+        self._cells: Dict[str, Dict[str, MatrixCell]] = {}
+        # 站点 -> {"agent", "last_seen", "frames", "results"}，matrix() 中另附 stale 标记
+        self.sites: Dict[str, Dict[str, Any]] = {}
+        self.frames_received = 0
+
+    def ingest(self, frame: Dict[str, Any]) -> int:
+        """合并一个已解码的结果帧，返回合并的结果数"""
+        site = frame["site"]
+        now = time.time()
+        with self._lock:
+            row = self._cells.setdefault(site, {})
+            for result in frame["results"]:
+                region = result.get("region")
+                if not region or not isinstance(region, str):
+                    continue
+                result["ts"] = result_time(result.get("ts"), now)
+                cell = row.get(region)
+                if cell is None:
+                    cell = row[region] = MatrixCell()
+                cell.add(result)
+            info = self.sites.setdefault(site, {"frames": 0, "results": 0})
+            info["agent"] = frame.get("agent", "")
+            info["last_seen"] = now
+            info["frames"] += 1
+            info["results"] += len(frame["results"])
+            self.frames_received += 1
+        return len(frame["results"])
+
+    def matrix(self, metric: str = "latency") -> Dict[str, Any]:
+        """返回 站点 × 区域 矩阵：cells[站点][区域] 为该单元格的最新值与分位数"""
+        if metric not in MATRIX_METRICS:
+            raise ValueError(f"unknown metric: {metric}")
+        now = time.time()
+        with self._lock:
+            regions = sorted({region for row in self._cells.values() for region in row})
+            return {
+                "metric": metric,
+                "sites": sorted(self._cells),
+                "regions": regions,
+                "cells": {
+                    site: {region: cell.to_dict(metric) for region, cell in row.items()}
+                    for site, row in self._cells.items()
+                },
+                "agents": {
+                    site: dict(info, stale=now - info["last_seen"] > self.stale_after)
+                    for site, info in self.sites.items()
+                }
+            }
+
+    def site_names(self) -> List[str]:
+        with self._lock:
+            return sorted(self._cells)
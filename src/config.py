@@ -1,5 +1,6 @@
 """配置模块 - Oracle Cloud服务器配置和测试参数"""
 
+import os
 from typing import Dict, Any
 
 # Oracle Cloud免费VPS服务器列表
@@ -126,20 +127,56 @@ ORACLE_SERVERS: Dict[str, Dict[str, Any]] = {
     }
 }
 
+# 端点目录配置（目录格式见 src/catalog.py）
+CATALOG_CONFIG = {
+    "path": os.environ.get("ORACLE_CATALOG", ""),  # JSON/CSV目录文件，为空时使用内置目录
+    "default_services": ["iaas"],  # 未指定服务时测试的服务
+}
+
 # 测试配置
 TEST_CONFIG = {
-    "ping_count": 5,            # ping测试次数 (减少到5次，加快速度)
+    "ping_count": 5,            # 固定采样时的ping次数（adaptive_sampling为False时使用）
     "ping_timeout": 2,          # ping超时时间（秒）(减少到2秒)
-    "connection_tests": 3,      # HTTPS连接测试次数 (减少到3次)
+    "ping_interval": 0.2,       # 原生ICMP对同一目标的发包间隔（秒）
+    "ping_send_gap": 0.001,     # 共享ICMP套接字上相邻两个包的最小间隔（秒）
+    "ping_method": "auto",      # auto: 优先原生ICMP套接字，不可用时回退系统ping；subprocess: 始终使用系统ping
+    "connection_tests": 3,      # 固定采样时的HTTPS连接测试次数
     "connection_timeout": 3,    # HTTPS连接超时时间（秒）(减少到3秒)
-    "max_workers": 15,          # 最大并发线程数 (增加并发数)
+    "dns_timeout": 2,           # 单次DNS查询超时时间（秒）
+    "dns_cache_size": 4096,     # DNS缓存最大条目数（LRU淘汰）
+    "dns_min_ttl": 30,          # DNS缓存TTL下限（秒）
+    "dns_max_ttl": 3600,        # DNS缓存TTL上限（秒）
+    "max_concurrent_servers": 64,   # 同时测试的服务器数上限（有界队列，满时背压）
+    "max_concurrency": 64,      # 全局同时进行的探测数上限
+    "max_ping_concurrency": 64, # 同时进行的ping探测数上限
+    "max_https_concurrency": 32,    # 同时进行的HTTPS探测数上限
+    "per_destination_interval": 0,  # 同一目标两次探测开始的最小间隔（秒），0为不限速
+    # 自适应采样：每个端点持续采样直到估计值的置信区间足够窄，或达到采样上限
+    "adaptive_sampling": True,  # 是否启用自适应采样
+    "ping_min_count": 3,        # 自适应ping最少次数
+    "ping_max_count": 20,       # 自适应ping最多次数
+    "connection_min_tests": 2,  # 自适应HTTPS测试最少次数
+    "connection_max_tests": 6,  # 自适应HTTPS测试最多次数
+    "adaptive_batch": 2,        # 未收敛时每次追加的样本数
+    "latency_ci_abs": 2.0,      # 延迟均值置信半宽目标（毫秒），与相对目标取较大者
+    "latency_ci_rel": 0.05,     # 延迟均值置信半宽目标（相对均值）
+    "loss_upper_limit": 0.3,    # 出现丢包时，丢包率Wilson上界（0-1）不超过该值才停止；无丢包时只看延迟
+    "confidence_z": 1.96,       # 置信区间z值（95%），自适应采样与top-K淘汰共用
+    "top_k_round_pings": 2,     # top-K快速模式每轮每个服务器的ping次数
+    "top_k_max_pings": 20,      # top-K快速模式单个服务器最多ping次数
+    "max_workers": 15,          # 系统ping回退时的最大并发线程数
+    "loop_lag_interval": 0.05,  # 事件循环延迟采样间隔（秒）
+    "loop_lag_threshold": 50,   # ping/HTTPS计时期间事件循环最大停顿超过该值（毫秒）时标记结果可疑
+    "shards": 1,                # 完整测试使用的工作进程数，1为单进程
+    "shard_min_servers": 64,    # 每个工作进程至少分到的服务器数，服务器较少时减少进程数
 }
 
 # 评分权重配置
 SCORE_WEIGHTS = {
     "latency": 0.4,        # 延迟权重 40%
     "packet_loss": 0.3,    # 丢包率权重 30%
-    "connection": 0.2,     # 连接时间权重 20%
+    "connection": 0.15,    # 连接握手时间（TCP+TLS）权重 15%
+    "ttfb": 0.05,          # 首字节时间（服务端响应）权重 5%
     "jitter": 0.1,         # 抖动权重 10%
 }
 
@@ -149,4 +186,45 @@ FLASK_CONFIG = {
     "port": 5001,
     "debug": False,
     "threaded": True
-}
\ No newline at end of file
+}
+
+# 历史数据配置
+HISTORY_CONFIG = {
+    "path": "data/history.db",  # SQLite数据库路径
+    "batch_size": 500,          # 后台写入线程每批最多写入的行数
+    "flush_interval": 1.0,      # 攒批最长等待时间（秒）
+}
+
+# 公网IP检测配置（见 src/utils.py）
+PUBLIC_IP_CONFIG = {
+    "ttl": 600,                 # 缓存的IP信息在该时间（秒）内直接使用
+    "refresh_interval": 300,    # Web服务后台刷新间隔（秒）
+    "timeout": 5,               # 单次检测的总超时时间（秒），三组API并行查询
+    "hedge_delay": 0.5,         # 同组API对冲间隔：该时间（秒）内未返回时加发下一个API
+    "cache_path": "data/public_ip.json",  # 查询结果的缓存文件，ttl内重复运行CLI时直接使用；空字符串为不缓存
+}
+
+# 流式导出配置（ndjson/csv/arrow/parquet，见 src/exporters.py）
+EXPORT_CONFIG = {
+    "buffer_size": 500,         # 缓冲满该数量的结果即写入文件
+    "flush_interval": 5.0,      # 距上次写入超过该时间（秒）时，下一条结果到达即写入
+}
+
+# 时间序列汇总配置（各分辨率的桶宽与保留期见 src/rollup.py 中的 RESOLUTIONS）
+ROLLUP_CONFIG = {
+    "max_points": 500,          # 单次区间查询最多返回的数据点数
+}
+
+# 汇总端配置（接收各观测点上传的结果帧）
+COLLECTOR_CONFIG = {
+    "token": os.environ.get("COLLECTOR_TOKEN", ""),  # 非空时要求上传请求携带 Authorization: Bearer <token>
+    "max_frame_size": 16 * 1024 * 1024,  # 单个结果帧解压后的最大字节数
+    "stale_after": 300,         # 观测点超过该时间（秒）未上传则标记为过期
+}
+
+# 观测点（agent）配置
+AGENT_CONFIG = {
+    "batch_size": 200,          # 攒满该数量的结果即上传一帧（每轮结束时也会上传）
+    "upload_timeout": 10,       # 单次上传超时时间（秒）
+    "max_pending_frames": 100,  # 汇总端不可达时最多缓存的结果帧数，超出后丢弃最旧的帧
+}
@@ -0,0 +1,67 @@
+"""事件推送模块 - 线程安全的Server-Sent Events广播"""
+
+import json
+import queue
+import threading
+import logging
+from typing import Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def format_sse(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    """格式化为一条SSE消息"""
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {payload}")
+    return "\n".join(lines) + "\n\n"
+
+
+class EventBroadcaster:
+    """把事件推送给所有订阅者
+
+    每个事件只序列化一次，再放入各订阅者的队列；订阅者消费过慢导致队列满时
+    直接断开该订阅者，而不是阻塞测试线程。
+    """
+
+    def __init__(self, max_queue: int = 1000):
+        self.max_queue = max_queue
+        self._subscribers: List[queue.Queue] = []
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def subscribe(self) -> queue.Queue:
+        """注册一个订阅者，返回其消息队列"""
+        q: queue.Queue = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers.append(q)
+        return q
+
+    def unsubscribe(self, q: queue.Queue) -> None:
+        with self._lock:
+            if q in self._subscribers:
+                self._subscribers.remove(q)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event: str, data: Any) -> None:
+        """广播一个事件"""
+        with self._lock:
+            if not self._subscribers:
+                return
+            self._next_id += 1
+            message = format_sse(event, data, self._next_id)
+            for q in list(self._subscribers):
+                try:
+                    q.put_nowait(message)
+                except queue.Full:
+                    logger.warning("SSE subscriber too slow, dropping connection")
+                    self._subscribers.remove(q)
+                    # 清空积压的消息并放入None，通知该连接结束
+                    with q.mutex:
+                        q.queue.clear()
+                    q.put_nowait(None)
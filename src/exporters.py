@@ -0,0 +1,219 @@
+"""流式导出模块 - 每个结果完成时追加写入，适合长时间运行与分析任务
+
+所有格式使用同一固定列（EXPORT_FIELDS），与结果中实际出现哪些字段无关，
+失败结果与成功结果的列一致，缺失值为空（CSV）或null。
+结果先放入缓冲区，满 buffer_size 条、距上次写出超过 flush_interval 秒、
+或 flush()/close() 时才写入文件，运行中途文件里已有写出的部分结果。
+
+- ndjson: 每行一个JSON对象
+- csv: 表头固定，逐行追加
+- arrow: Arrow IPC流，每次写出为一个record batch，未正常关闭时已写出的批次仍可读取
+- parquet: 每次写出为一个row group，文件尾在 close() 时写入（需正常关闭或收到信号后关闭）
+
+arrow/parquet 需要安装 pyarrow（可选依赖）。
+"""
+
+import csv
+import json
+import threading
+import time
+from typing import Any, Dict, List, Mapping, Tuple, Type
+
+from .resultset import FIELDS, FLOAT_FIELDS, INT_FIELDS, BOOL_FIELDS
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # pyarrow为可选依赖，只有arrow/parquet格式需要
+    pa = None
+
+# 导出列：写出时间戳 + 结果字段 + 错误信息
+EXPORT_FIELDS = ("ts",) + FIELDS + ("error",)
+
+
+class ExportError(RuntimeError):
+    """导出格式不可用或导出文件无法写入"""
+
+
+class Exporter:
+    """流式导出基类，子类实现 _open/_write_rows/_close"""
+
+    format = ""
+
+    def __init__(self, path: str, buffer_size: int = 500, flush_interval: float = 5.0):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.rows_written = 0
+        self._buffer: List[Tuple[Any, ...]] = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._closed = False
+        self._open()
+
+    def write(self, result: Mapping[str, Any]) -> None:
+        """追加一条结果（字典或ResultRow），缺少ts时使用当前时间"""
+        row = tuple(result.get(field) for field in EXPORT_FIELDS)
+        if row[0] is None:
+            row = (time.time(),) + row[1:]
+        with self._lock:
+            if self._closed:
+                raise ExportError(f"exporter for {self.path} is closed")
+            self._buffer.append(row)
+            if (len(self._buffer) >= self.buffer_size
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush()
+
+    def flush(self) -> None:
+        """把缓冲区中的结果写入文件"""
+        with self._lock:
+            if not self._closed:
+                self._flush()
+
+    def _flush(self) -> None:
+        if self._buffer:
+            rows, self._buffer = self._buffer, []
+            self._write_rows(rows)
+            self.rows_written += len(rows)
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        """写出剩余结果并关闭文件（可重复调用）"""
+        with self._lock:
+            if self._closed:
+                return
+            try:
+                self._flush()
+            finally:
+                self._closed = True
+                self._close()
+
+    def __enter__(self) -> "Exporter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _open(self) -> None:
+        raise NotImplementedError
+
+    def _write_rows(self, rows: List[Tuple[Any, ...]]) -> None:
+        raise NotImplementedError
+
+    def _close(self) -> None:
+        raise NotImplementedError
+
+
+class NDJSONExporter(Exporter):
+    format = "ndjson"
+
+    def _open(self) -> None:
+        self._file = open(self.path, "w", encoding="utf-8")
+
+    def _write_rows(self, rows: List[Tuple[Any, ...]]) -> None:
+        self._file.write("".join(
+            json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False) + "\n" for row in rows
+        ))
+        self._file.flush()
+
+    def _close(self) -> None:
+        self._file.close()
+
+
+class CSVExporter(Exporter):
+    format = "csv"
+
+    def _open(self) -> None:
+        self._file = open(self.path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(EXPORT_FIELDS)
+        self._file.flush()
+
+    def _write_rows(self, rows: List[Tuple[Any, ...]]) -> None:
+        self._writer.writerows(
+            tuple("" if value is None else value for value in row) for row in rows
+        )
+        self._file.flush()
+
+    def _close(self) -> None:
+        self._file.close()
+
+
+def arrow_schema():
+    """导出列对应的Arrow类型"""
+    def field_type(field):
+        if field == "ts" or field in FLOAT_FIELDS:
+            return pa.float64()
+        if field in INT_FIELDS:
+            return pa.int64()
+        if field in BOOL_FIELDS:
+            return pa.bool_()
+        return pa.string()
+    return pa.schema([(field, field_type(field)) for field in EXPORT_FIELDS])
+
+
+class _ArrowExporter(Exporter):
+    """按列写出的二进制格式：每次写出把缓冲的行转置为列，构成一个record batch"""
+
+    def _open(self) -> None:
+        if pa is None:
+            raise ExportError(f"{self.format} export requires pyarrow (pip install pyarrow)")
+        self._schema = arrow_schema()
+        self._writer = self._new_writer()
+
+    def _new_writer(self):
+        raise NotImplementedError
+
+    def _write_rows(self, rows: List[Tuple[Any, ...]]) -> None:
+        columns = [
+            pa.array(values, type=self._schema.field(i).type)
+            for i, values in enumerate(zip(*rows))
+        ]
+        self._write_batch(pa.RecordBatch.from_arrays(columns, schema=self._schema))
+
+    def _write_batch(self, batch) -> None:
+        self._writer.write_batch(batch)
+
+    def _close(self) -> None:
+        self._writer.close()
+
+
+class ArrowExporter(_ArrowExporter):
+    format = "arrow"
+
+    def _new_writer(self):
+        self._sink = pa.OSFile(self.path, "wb")
+        return pa.ipc.new_stream(self._sink, self._schema)
+
+    def _write_batch(self, batch) -> None:
+        self._writer.write_batch(batch)
+        self._sink.flush()
+
+    def _close(self) -> None:
+        self._writer.close()
+        self._sink.close()
+
+
+class ParquetExporter(_ArrowExporter):
+    format = "parquet"
+
+    def _new_writer(self):
+        return pa.parquet.ParquetWriter(self.path, self._schema, compression="zstd")
+
+
+EXPORTERS: Dict[str, Type[Exporter]] = {
+    cls.format: cls for cls in (NDJSONExporter, CSVExporter, ArrowExporter, ParquetExporter)
+}
+
+
+def open_exporter(format: str, path: str, buffer_size: int = 500,
+                  flush_interval: float = 5.0) -> Exporter:
+    """按格式名创建流式导出器"""
+    cls = EXPORTERS.get(format)
+    if cls is None:
+        raise ExportError(f"unsupported streaming export format: {format}")
+    try:
+        return cls(path, buffer_size=buffer_size, flush_interval=flush_interval)
+    except OSError as e:
+        raise ExportError(f"cannot open {path}: {e}")
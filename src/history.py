@@ -0,0 +1,296 @@
+"""历史数据模块 - SQLite（WAL模式）持久化测试结果，后台批量写入并提供查询接口"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+import logging
+from typing import Dict, Any, Iterator, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# 持久化的指标列（也是查询接口允许的metric取值）
+METRIC_COLUMNS = (
+    "latency", "min_latency", "max_latency", "jitter", "packet_loss",
+    "connection_time", "dns_time", "tcp_time", "tls_time", "ttfb", "score"
+)
+
+COLUMNS = ("ts", "name", "region", "service", "endpoint", "status") + METRIC_COLUMNS
+
+# 旧版本的库没有service列，其中的结果都来自默认服务
+DEFAULT_SERVICE = "iaas"
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    name TEXT NOT NULL,
+    region TEXT NOT NULL,
+    service TEXT NOT NULL DEFAULT '{DEFAULT_SERVICE}',
+    endpoint TEXT,
+    status TEXT,
+    {", ".join(f"{c} REAL" for c in METRIC_COLUMNS)}
+);
+CREATE TABLE IF NOT EXISTS rollups (
+    resolution TEXT NOT NULL,
+    region TEXT NOT NULL,
+    service TEXT NOT NULL DEFAULT '{DEFAULT_SERVICE}',
+    metric TEXT NOT NULL,
+    bucket REAL NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (resolution, region, service, metric, bucket)
+) WITHOUT ROWID;
+"""
+
+# 在升级旧表之后创建（索引引用了service列）
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_results_region_ts ON results (region, ts);
+CREATE INDEX IF NOT EXISTS idx_results_region_service_ts ON results (region, service, ts);
+CREATE INDEX IF NOT EXISTS idx_results_ts ON results (ts);
+"""
+
+ROLLUP_COLUMNS = ("resolution", "region", "service", "metric", "bucket", "data")
+
+INSERT_SQL = {
+    "results": f"INSERT INTO results ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+    "rollups": f"INSERT OR REPLACE INTO rollups ({', '.join(ROLLUP_COLUMNS)}) "
+               f"VALUES ({', '.join('?' * len(ROLLUP_COLUMNS))})"
+}
+
+_STOP = object()
+
+
+class HistoryStore:
+    """测试结果历史库
+
+    add() 只把结果放入内存队列，立即返回，可以在事件循环或回调中直接调用；
+    后台线程按 batch_size 条或 flush_interval 秒攒批，在一个事务里 executemany 写入。
+    查询使用每线程独立的只读连接，WAL模式下不会被写入阻塞。
+    """
+
+    def __init__(self, path: str, batch_size: int = 500, flush_interval: float = 1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        self._migrate(conn)
+        conn.executescript(INDEXES)
+        conn.close()
+
+        self._queue: queue.Queue = queue.Queue()
+        self._local = threading.local()
+        self._closed = False
+        self.rows_written = 0
+        self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self._writer.start()
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        """给旧版本的库加上service列（结果表直接加列；汇总表的主键变了，需要重建）"""
+        def columns(table):
+            return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+        with conn:
+            if "service" not in columns("results"):
+                conn.execute(f"ALTER TABLE results ADD COLUMN service TEXT NOT NULL DEFAULT '{DEFAULT_SERVICE}'")
+            if "service" not in columns("rollups"):
+                conn.execute("ALTER TABLE rollups RENAME TO rollups_old")
+                conn.executescript(SCHEMA)
+                conn.execute(
+                    "INSERT INTO rollups (resolution, region, metric, bucket, data) "
+                    "SELECT resolution, region, metric, bucket, data FROM rollups_old"
+                )
+                conn.execute("DROP TABLE rollups_old")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def add(self, result: Dict[str, Any], timestamp: Optional[float] = None) -> None:
+        """记录一条测试结果（非阻塞）"""
+        if self._closed:
+            raise RuntimeError("history store is closed")
+        row = (timestamp or time.time(), result.get("name"), result.get("region"),
+               result.get("service") or DEFAULT_SERVICE, result.get("endpoint"), result.get("status")) + tuple(
+            result.get(c) for c in METRIC_COLUMNS)
+        self._queue.put(("results", row))
+
+    def save_rollups(self, rows: List[tuple]) -> None:
+        """写入（覆盖）汇总桶，rows 为 (resolution, region, service, metric, bucket, data) 元组（非阻塞）"""
+        if self._closed:
+            raise RuntimeError("history store is closed")
+        for row in rows:
+            self._queue.put(("rollups", row))
+
+    def load_rollups(self, resolution: str, since: float) -> List[tuple]:
+        """读取某分辨率下 since 之后的汇总桶（按时间升序）"""
+        return [tuple(row) for row in self._reader().execute(
+            f"SELECT {', '.join(ROLLUP_COLUMNS)} FROM rollups "
+            "WHERE resolution = ? AND bucket >= ? ORDER BY bucket",
+            (resolution, since)
+        )]
+
+    def flush(self) -> None:
+        """阻塞直到已提交的结果全部写入"""
+        self._queue.join()
+
+    def close(self) -> None:
+        """写完剩余结果并停止后台线程"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._writer.join()
+
+    def _write_loop(self) -> None:
+        conn = self._connect()
+        stop = False
+        while not stop:
+            batch = []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stop = True
+                    self._queue.task_done()
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch:
+                grouped: Dict[str, List[tuple]] = {}
+                for kind, row in batch:
+                    grouped.setdefault(kind, []).append(row)
+                try:
+                    with conn:
+                        for kind, rows in grouped.items():
+                            conn.executemany(INSERT_SQL[kind], rows)
+                    self.rows_written += len(grouped.get("results", ()))
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to write {len(batch)} history rows: {e}")
+                for _ in batch:
+                    self._queue.task_done()
+        conn.close()
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _where(region: Optional[str], since: Optional[float], until: Optional[float],
+               service: Optional[str] = None):
+        clauses, params = [], []
+        if region:
+            clauses.append("region = ?")
+            params.append(region)
+        if service:
+            clauses.append("service = ?")
+            params.append(service)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, region: Optional[str] = None, since: Optional[float] = None,
+              until: Optional[float] = None, limit: Optional[int] = None,
+              service: Optional[str] = None) -> List[Dict[str, Any]]:
+        """按区域（及服务）和时间范围查询原始结果（按时间升序）"""
+        where, params = self._where(region, since, until, service)
+        sql = f"SELECT {', '.join(COLUMNS)} FROM results{where} ORDER BY ts"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [dict(row) for row in self._reader().execute(sql, params)]
+
+    def iter_columns(self, columns: Sequence[str], region: Optional[str] = None,
+                     since: Optional[float] = None, until: Optional[float] = None,
+                     chunk_size: int = 50000, service: Optional[str] = None) -> Iterator[Dict[str, tuple]]:
+        """按时间顺序分块读取原始结果，每块为 {列名: 该列的值}，用于批量计算"""
+        unknown = set(columns) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"unknown columns: {', '.join(sorted(unknown))}")
+        where, params = self._where(region, since, until, service)
+        # 独立游标，不受 sqlite3.Row 行工厂影响，逐块取出后按列转置
+        cursor = self._reader().cursor()
+        cursor.row_factory = None
+        cursor.execute(f"SELECT {', '.join(columns)} FROM results{where} ORDER BY ts", params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield dict(zip(columns, zip(*rows)))
+
+    def regions(self) -> List[str]:
+        return [row[0] for row in self._reader().execute("SELECT DISTINCT region FROM results ORDER BY region")]
+
+    def services(self, region: Optional[str] = None) -> List[str]:
+        where, params = self._where(region, None, None)
+        return [row[0] for row in self._reader().execute(
+            f"SELECT DISTINCT service FROM results{where} ORDER BY service", params)]
+
+    def percentile(self, region: str, metric: str, q: float,
+                   since: Optional[float] = None, until: Optional[float] = None,
+                   service: Optional[str] = None) -> Optional[float]:
+        """某区域（及服务）某指标在时间范围内的q分位数（0-100），忽略超时值999"""
+        if metric not in METRIC_COLUMNS:
+            raise ValueError(f"unknown metric: {metric}")
+        where, params = self._where(region, since, until, service)
+        where += (" AND " if where else " WHERE ") + f"{metric} IS NOT NULL AND {metric} < 999"
+        conn = self._reader()
+        count = conn.execute(f"SELECT COUNT(*) FROM results{where}", params).fetchone()[0]
+        if not count:
+            return None
+        offset = int(round(q / 100 * (count - 1)))
+        row = conn.execute(
+            f"SELECT {metric} FROM results{where} ORDER BY {metric} LIMIT 1 OFFSET ?",
+            params + [offset]
+        ).fetchone()
+        return row[0]
+
+    def summary(self, region: str, metric: str = "latency",
+                since: Optional[float] = None, until: Optional[float] = None,
+                service: Optional[str] = None) -> Dict[str, Any]:
+        """某区域（service为None时包括所有服务）某指标的汇总：样本数、均值、最值、p50/p95/p99 与平均丢包率"""
+        if metric not in METRIC_COLUMNS:
+            raise ValueError(f"unknown metric: {metric}")
+        where, params = self._where(region, since, until, service)
+        valid = (" AND " if where else " WHERE ") + f"{metric} IS NOT NULL AND {metric} < 999"
+        conn = self._reader()
+        count, avg, minimum, maximum = conn.execute(
+            f"SELECT COUNT(*), AVG({metric}), MIN({metric}), MAX({metric}) FROM results{where}{valid}",
+            params
+        ).fetchone()
+        total, loss = conn.execute(
+            f"SELECT COUNT(*), AVG(packet_loss) FROM results{where}", params
+        ).fetchone()
+        return {
+            "region": region,
+            "service": service,
+            "metric": metric,
+            "count": count,
+            "total": total,
+            "avg": avg,
+            "min": minimum,
+            "max": maximum,
+            "p50": self.percentile(region, metric, 50, since, until, service),
+            "p95": self.percentile(region, metric, 95, since, until, service),
+            "p99": self.percentile(region, metric, 99, since, until, service),
+            "packet_loss_avg": loss
+        }
@@ -0,0 +1,98 @@
+"""HTTPS分阶段计时模块 - 分别测量DNS、TCP握手、TLS握手和首字节时间"""
+
+import asyncio
+import socket
+import ssl
+import time
+import logging
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+PHASES = ("dns", "tcp", "tls", "ttfb")
+
+
+class _FirstByteProtocol(asyncio.Protocol):
+    """只关心第一个响应字节到达时间的协议"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.first_byte: asyncio.Future = loop.create_future()
+
+    def data_received(self, data: bytes) -> None:
+        if not self.first_byte.done():
+            self.first_byte.set_result(time.perf_counter_ns())
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        if not self.first_byte.done():
+            self.first_byte.set_exception(exc or ConnectionResetError("connection closed before response"))
+
+
+class HTTPSProber:
+    """分阶段计时的HTTPS探测器
+
+    一个实例在整次测试中共享：SSLContext只创建一次，每个样本都新建TCP连接，
+    这样TCP/TLS握手时间不会被连接复用掩盖。
+    """
+
+    def __init__(self, timeout: float, verify: bool = False):
+        self.timeout = timeout
+        if verify:
+            self.ssl_context = ssl.create_default_context()
+        else:
+            # 不校验证书时无需加载系统CA（加载一次要几十毫秒，会阻塞事件循环）
+            self.ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+            self.ssl_context.check_hostname = False
+            self.ssl_context.verify_mode = ssl.CERT_NONE
+
+    async def probe(self, host: str, port: int = 443, path: str = "/",
+                    address: Optional[str] = None) -> Dict[str, Any]:
+        """执行一次HEAD请求，返回各阶段耗时（毫秒）
+
+        传入预先解析的 address 时跳过DNS阶段（dns记为0）。
+        """
+        try:
+            return await asyncio.wait_for(self._probe(host, port, path, address), self.timeout)
+        except asyncio.TimeoutError:
+            return {"success": False, "error": "timeout"}
+        except (OSError, ssl.SSLError) as e:
+            return {"success": False, "error": str(e) or type(e).__name__}
+
+    async def _probe(self, host: str, port: int, path: str,
+                     address: Optional[str]) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        transport = None
+
+        t_start = time.perf_counter_ns()
+        if address is None:
+            infos = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+            address = infos[0][4][0]
+        t_dns = time.perf_counter_ns()
+
+        try:
+            transport, protocol = await loop.create_connection(
+                lambda: _FirstByteProtocol(loop), host=address, port=port
+            )
+            t_tcp = time.perf_counter_ns()
+
+            transport = await loop.start_tls(
+                transport, protocol, self.ssl_context, server_hostname=host
+            )
+            t_tls = time.perf_counter_ns()
+
+            transport.write(
+                f"HEAD {path} HTTP/1.1\r\nHost: {host}\r\n"
+                f"User-Agent: oracle-network-test\r\nConnection: close\r\n\r\n".encode()
+            )
+            t_request = time.perf_counter_ns()
+            t_first_byte = await protocol.first_byte
+        finally:
+            if transport is not None:
+                transport.abort()
+
+        return {
+            "dns": (t_dns - t_start) / 1_000_000,
+            "tcp": (t_tcp - t_dns) / 1_000_000,
+            "tls": (t_tls - t_tcp) / 1_000_000,
+            "ttfb": (t_first_byte - t_request) / 1_000_000,
+            "success": True
+        }
@@ -0,0 +1,367 @@
+"""ICMP探测模块 - 基于asyncio的原生ICMP Echo实现"""
+
+import asyncio
+import heapq
+import random
+import socket
+import struct
+import time
+import logging
+from typing import Dict, List, Optional, Tuple, Any
+
+from .stats import SampleBuffer
+
+logger = logging.getLogger(__name__)
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+DEFAULT_PAYLOAD_SIZE = 56
+
+
+class ICMPUnavailableError(OSError):
+    """当前平台或权限下无法创建ICMP套接字"""
+
+
+def checksum(data: bytes) -> int:
+    """计算ICMP校验和（RFC 1071）"""
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def build_echo_request(ident: int, seq: int, payload_size: int = DEFAULT_PAYLOAD_SIZE) -> bytes:
+    """构造ICMP Echo Request报文"""
+    payload = bytes((i & 0xFF) for i in range(payload_size))
+    header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    csum = checksum(header + payload)
+    return struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, csum, ident, seq) + payload
+
+
+def parse_echo_reply(packet: bytes) -> Optional[Tuple[int, int]]:
+    """解析Echo Reply报文，返回 (identifier, sequence)
+
+    RAW套接字（以及macOS上的DGRAM套接字）收到的数据包含IPv4头部，需要先剥离。
+    """
+    if len(packet) >= 20 and packet[0] >> 4 == 4:
+        packet = packet[(packet[0] & 0x0F) * 4:]
+    if len(packet) < 8:
+        return None
+    icmp_type, _code, _csum, ident, seq = struct.unpack("!BBHHH", packet[:8])
+    if icmp_type != ICMP_ECHO_REPLY:
+        return None
+    return ident, seq
+
+
+def open_icmp_socket() -> Tuple[socket.socket, bool]:
+    """创建非阻塞ICMP套接字，返回 (socket, 是否为DGRAM套接字)
+
+    优先使用非特权的 SOCK_DGRAM ICMP 套接字（Linux需 net.ipv4.ping_group_range 允许，
+    macOS默认允许），其次尝试 SOCK_RAW（需要root或CAP_NET_RAW）。
+    """
+    errors = []
+    for sock_type in (socket.SOCK_DGRAM, socket.SOCK_RAW):
+        try:
+            sock = socket.socket(socket.AF_INET, sock_type, socket.IPPROTO_ICMP)
+        except OSError as e:
+            errors.append(f"{'DGRAM' if sock_type == socket.SOCK_DGRAM else 'RAW'}: {e}")
+            continue
+        sock.setblocking(False)
+        return sock, sock_type == socket.SOCK_DGRAM
+    raise ICMPUnavailableError("; ".join(errors))
+
+
+def build_ping_result(rtts: List[float], sent: int, error: Optional[str] = None) -> Dict[str, Any]:
+    """根据每个包的RTT（毫秒）生成与 ping_host 相同结构的结果，原始RTT保存在 samples 中"""
+    if sent <= 0:
+        packet_loss = 100.0
+    else:
+        packet_loss = round((sent - len(rtts)) / sent * 100, 1)
+
+    if not rtts:
+        return {
+            "min": 999,
+            "avg": 999,
+            "max": 999,
+            "jitter": 0,
+            "packet_loss": 100,
+            "success": False,
+            "error": error or "100% packet loss",
+            "samples": SampleBuffer(),
+            "sent": sent
+        }
+
+    samples = SampleBuffer(rtts)
+    return {
+        "min": min(samples),
+        "avg": samples.mean(),
+        "max": max(samples),
+        "jitter": samples.stdev(),
+        "packet_loss": packet_loss,
+        "success": True,
+        "samples": samples,
+        "sent": sent
+    }
+
+
+async def resolve_ipv4(host: str) -> str:
+    """异步解析IPv4地址"""
+    loop = asyncio.get_running_loop()
+    infos = await loop.getaddrinfo(host, None, family=socket.AF_INET, type=socket.SOCK_DGRAM)
+    return infos[0][4][0]
+
+
+class _HostProbe:
+    """单个目标的一次ping任务"""
+
+    __slots__ = ("host", "address", "count", "timeout_ns", "interval_ns",
+                 "sent", "seqs", "rtts", "error", "future", "timer")
+
+    def __init__(self, host: str, address: str, count: int, timeout: float,
+                 interval: float, future: asyncio.Future):
+        self.host = host
+        self.address = address
+        self.count = count
+        self.timeout_ns = int(timeout * 1_000_000_000)
+        self.interval_ns = int(interval * 1_000_000_000)
+        self.sent = 0
+        self.seqs: List[int] = []
+        self.rtts: List[float] = []
+        self.error: Optional[str] = None
+        self.future = future
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class PingEngine:
+    """单套接字多路复用的ICMP探测引擎（fping风格）
+
+    所有目标共用一个ICMP套接字，由一个发送协程按时间表交错发送Echo请求，
+    收到的回复按 (identifier, sequence) 匹配到对应目标。并发调用 ping() 的
+    目标会被自动交错到同一个发送队列中。
+    """
+
+    def __init__(self, send_gap: float = 0.001,
+                 payload_size: int = DEFAULT_PAYLOAD_SIZE,
+                 recv_buffer: int = 1 << 20):
+        self.send_gap_ns = int(send_gap * 1_000_000_000)
+        self.payload_size = payload_size
+        self.recv_buffer = recv_buffer
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sock: Optional[socket.socket] = None
+        self._is_dgram = False
+        self._ident = random.getrandbits(16)
+        self._next_seq = 0
+        # seq -> (目标, 发送时间ns)
+        self._pending: Dict[int, Tuple[_HostProbe, int]] = {}
+        # 发送时间表: (计划发送时间ns, 插入序号, 目标)
+        self._schedule: List[Tuple[int, int, _HostProbe]] = []
+        self._schedule_counter = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._sender: Optional[asyncio.Task] = None
+        self.packets_sent = 0
+        self.packets_received = 0
+
+    async def __aenter__(self) -> "PingEngine":
+        self.open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+    def open(self) -> None:
+        """创建共享套接字并注册到当前事件循环"""
+        if self._sock is not None:
+            return
+        loop = asyncio.get_running_loop()
+        sock, is_dgram = open_icmp_socket()
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.recv_buffer)
+        except OSError:
+            pass
+        try:
+            loop.add_reader(sock.fileno(), self._on_readable)
+        except NotImplementedError as e:
+            sock.close()
+            raise ICMPUnavailableError(f"event loop does not support add_reader: {e}")
+        self.loop = loop
+        self._sock = sock
+        self._is_dgram = is_dgram
+        self._wakeup = asyncio.Event()
+        self._sender = loop.create_task(self._send_loop())
+
+    def close(self) -> None:
+        """关闭套接字并结束所有未完成的探测"""
+        if self._sock is None:
+            return
+        if not self.loop.is_closed():
+            self._sender.cancel()
+            self.loop.remove_reader(self._sock.fileno())
+            for probe, _ in list(self._pending.values()):
+                self._finish(probe)
+            for _, _, probe in self._schedule:
+                self._finish(probe)
+        self._sock.close()
+        self._sock = None
+        self._pending.clear()
+        self._schedule.clear()
+
+    async def ping(self, host: str, count: int, timeout: float,
+                   interval: float = 0.2, address: Optional[str] = None) -> Dict[str, Any]:
+        """对单个目标发送 count 个Echo请求，返回与 ping_host 相同结构的结果
+
+        已预先解析时通过 address 传入IPv4地址，避免重复解析。
+        """
+        self.open()
+        if address is None:
+            try:
+                address = await resolve_ipv4(host)
+            except (socket.gaierror, OSError) as e:
+                return build_ping_result([], count, f"DNS resolution failed: {e}")
+
+        probe = _HostProbe(host, address, count, timeout, interval, self.loop.create_future())
+        # 调用方被取消（top-K淘汰、超时、监控停止）时future随之取消，同样要释放已占用的seq
+        probe.future.add_done_callback(lambda _: self._release(probe))
+        self._enqueue(probe, time.monotonic_ns())
+        return await probe.future
+
+    async def ping_many(self, hosts: List[str], count: int, timeout: float,
+                        interval: float = 0.2,
+                        callback: Optional[callable] = None) -> Dict[str, Dict[str, Any]]:
+        """交错探测多个目标，每个目标完成时立即调用 callback(host, result)"""
+        results: Dict[str, Dict[str, Any]] = {}
+
+        async def run(host):
+            result = await self.ping(host, count, timeout, interval)
+            results[host] = result
+            if callback:
+                if asyncio.iscoroutinefunction(callback):
+                    await callback(host, result)
+                else:
+                    callback(host, result)
+
+        await asyncio.gather(*(run(host) for host in hosts))
+        return results
+
+    def _enqueue(self, probe: _HostProbe, due_ns: int) -> None:
+        self._schedule_counter += 1
+        heapq.heappush(self._schedule, (due_ns, self._schedule_counter, probe))
+        self._wakeup.set()
+
+    def _allocate_seq(self) -> int:
+        for _ in range(0x10000):
+            seq = self._next_seq
+            self._next_seq = (self._next_seq + 1) & 0xFFFF
+            if seq not in self._pending:
+                return seq
+        raise RuntimeError("too many ICMP echo requests in flight")
+
+    async def _send_loop(self) -> None:
+        while True:
+            if not self._schedule:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            now = time.monotonic_ns()
+            due_ns = self._schedule[0][0]
+            if due_ns > now:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), (due_ns - now) / 1_000_000_000)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, probe = heapq.heappop(self._schedule)
+            if probe.future.done():
+                continue
+            self._send_one(probe)
+
+            if probe.sent < probe.count:
+                self._enqueue(probe, time.monotonic_ns() + probe.interval_ns)
+            else:
+                # 最后一个包发出后，超时未回复的视为丢失
+                probe.timer = self.loop.call_later(
+                    probe.timeout_ns / 1_000_000_000, self._finish, probe
+                )
+                self._maybe_finish(probe)
+
+            if self.send_gap_ns:
+                await asyncio.sleep(self.send_gap_ns / 1_000_000_000)
+
+    def _send_one(self, probe: _HostProbe) -> None:
+        seq = self._allocate_seq()
+        packet = build_echo_request(self._ident, seq, self.payload_size)
+        probe.sent += 1
+        self._pending[seq] = (probe, time.monotonic_ns())
+        try:
+            self._sock.sendto(packet, (probe.address, 0))
+        except OSError as e:
+            self._pending.pop(seq, None)
+            probe.error = str(e)
+            return
+        probe.seqs.append(seq)
+        self.packets_sent += 1
+
+    def _on_readable(self) -> None:
+        while True:
+            try:
+                packet, addr = self._sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                logger.debug(f"ICMP recv error: {e}")
+                return
+            recv_ns = time.monotonic_ns()
+            reply = parse_echo_reply(packet)
+            if reply is None:
+                continue
+            reply_ident, seq = reply
+            # DGRAM套接字的identifier由内核改写并按套接字过滤，RAW套接字需要自行匹配
+            if not self._is_dgram and reply_ident != self._ident:
+                continue
+            entry = self._pending.get(seq)
+            if entry is None or entry[0].address != addr[0]:
+                continue
+            del self._pending[seq]
+            probe, sent_ns = entry
+            rtt_ns = recv_ns - sent_ns
+            if rtt_ns <= probe.timeout_ns:
+                probe.rtts.append(rtt_ns / 1_000_000)
+            self.packets_received += 1
+            self._maybe_finish(probe)
+
+    def _maybe_finish(self, probe: _HostProbe) -> None:
+        if probe.sent >= probe.count and not any(seq in self._pending and
+                                                 self._pending[seq][0] is probe
+                                                 for seq in probe.seqs):
+            self._finish(probe)
+
+    def _release(self, probe: _HostProbe) -> None:
+        """取消超时计时器并移除该目标仍在等待回复的seq"""
+        if probe.timer is not None:
+            probe.timer.cancel()
+            probe.timer = None
+        for seq in probe.seqs:
+            entry = self._pending.get(seq)
+            if entry is not None and entry[0] is probe:
+                del self._pending[seq]
+
+    def _finish(self, probe: _HostProbe) -> None:
+        self._release(probe)
+        if not probe.future.done():
+            probe.future.set_result(build_ping_result(probe.rtts, probe.count, probe.error))
+
+
+async def icmp_ping(host: str, count: int, timeout: float,
+                    interval: float = 0.2,
+                    payload_size: int = DEFAULT_PAYLOAD_SIZE) -> Dict[str, Any]:
+    """使用临时引擎对单个目标执行ICMP ping
+
+    RTT使用 time.monotonic_ns() 计时；无法创建ICMP套接字时抛出 ICMPUnavailableError，
+    由调用方决定回退方式。
+    """
+    async with PingEngine(payload_size=payload_size) as engine:
+        return await engine.ping(host, count, timeout, interval)
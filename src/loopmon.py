@@ -0,0 +1,136 @@
+"""事件循环监控模块 - 采样事件循环延迟，判断测量结果是否受测试机自身繁忙影响"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from .stats import RingBuffer
+
+
+class LagWindow:
+    """一个结果的测量窗口：由若干计时区间组成（ping、每次HTTPS连接），
+    只有与这些区间重叠的停顿才会影响该结果"""
+
+    __slots__ = ("sections",)
+
+    def __init__(self):
+        # (开始, 结束, 结束时正在发生的停顿毫秒数)
+        self.sections: List[Tuple[float, float, float]] = []
+
+
+class LoopLagMonitor:
+    """事件循环延迟采样器
+
+    后台任务每 interval 秒sleep一次，实际醒来时间比预期晚的部分就是事件循环延迟：
+    这段时间里循环被同步代码（如界面刷新、回调）占用，期间到达的网络响应
+    只能晚一些被处理，测得的RTT/连接时间会被相应放大。
+    每轮测试只启动一次采样；每个结果用 begin() 创建窗口，把计时的探测包在
+    section() 中，最后用 end() 得到与这些区间重叠的累计停顿和最大单次停顿。
+    排队、DNS、两次探测之间的等待期间发生的停顿不影响测量，不计入。
+    """
+
+    def __init__(self, interval: float = 0.05, history: int = 1000, stall_threshold: float = 1.0):
+        self.interval = interval
+        # 最近的延迟样本（毫秒）
+        self.samples = RingBuffer(history)
+        # 超过 stall_threshold 毫秒的停顿：(开始时刻, 醒来时刻, 延迟毫秒)
+        self.stall_threshold = stall_threshold
+        self._stalls: Deque[Tuple[float, float, float]] = deque(maxlen=history)
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self.ticks = 0
+        self._expected: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self) -> None:
+        """在当前事件循环中启动采样（已在运行时不重复启动）"""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._expected = None
+        self._task = loop.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._expected = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def _run(self) -> None:
+        while True:
+            self._expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            lag = max(0.0, now - self._expected) * 1000
+            self.samples.append(lag)
+            self.total_lag += lag
+            self.ticks += 1
+            if lag > self.max_lag:
+                self.max_lag = lag
+            if lag >= self.stall_threshold:
+                self._stalls.append((now - lag / 1000, now, lag))
+
+    def _pending(self, now: float) -> float:
+        # 采样任务本应已醒来但尚未被调度：这段停顿正在发生，还没有被记录
+        if self._expected is None or now <= self._expected:
+            return 0.0
+        return (now - self._expected) * 1000
+
+    def begin(self) -> LagWindow:
+        """开始一个结果的测量窗口"""
+        return LagWindow()
+
+    @contextmanager
+    def section(self, window: LagWindow) -> Iterator[None]:
+        """一段计时的探测，期间的停顿计入窗口"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            window.sections.append((start, now, self._pending(now)))
+
+    def end(self, window: LagWindow) -> Dict[str, float]:
+        """结束测量窗口，返回落在计时区间内的累计停顿与最大单次停顿（毫秒）"""
+        total = 0.0
+        worst = 0.0
+        if not window.sections:
+            return {"loop_lag": 0.0, "loop_lag_max": 0.0}
+        earliest = min(start for start, _, _ in window.sections)
+        stalls = []
+        for stall in reversed(self._stalls):
+            if stall[1] <= earliest:
+                break
+            stalls.append(stall)
+        for start, end, pending in window.sections:
+            covered = False
+            for stall_start, stall_end, _ in stalls:
+                overlap = min(end, stall_end) - max(start, stall_start)
+                if overlap > 0:
+                    # 只有落在计时区间内的部分会放大测得的时间
+                    total += overlap * 1000
+                    worst = max(worst, overlap * 1000)
+                    covered = covered or stall_end >= end
+            # 区间结束时正在发生、之后也未被记录的停顿
+            if pending and not covered:
+                total += pending
+                worst = max(worst, pending)
+        return {"loop_lag": round(total, 3), "loop_lag_max": round(worst, 3)}
+
+    def get_status(self) -> Dict[str, float]:
+        recent = self.samples.values()
+        return {
+            "running": self.running,
+            "ticks": self.ticks,
+            "mean_lag": round(sum(recent) / len(recent), 3) if recent else 0.0,
+            "max_lag": round(self.max_lag, 3),
+            "last_lag": round(self.samples.latest() or 0.0, 3)
+        }
@@ -0,0 +1,237 @@
+"""监控指标模块 - Prometheus文本格式的指标导出（计数器、仪表、直方图）"""
+
+import math
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 毫秒级耗时直方图的桶上界
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 150, 200, 300, 500, 1000, 2000, 5000)
+# 一轮完整测试耗时直方图的桶上界（秒）
+SWEEP_BUCKETS_S = (1, 2, 5, 10, 20, 30, 60, 120, 300, 600)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """指标基类：名称、说明、类型与标签名"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> Iterator[Tuple[str, Sequence[str], Sequence[str], float]]:
+        """产出 (名称后缀, 标签名, 标签值, 数值)"""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for suffix, names, values, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(names, values)} {_format_value(value)}")
+        return lines
+
+
+class _ValueMetric(_Metric):
+    """按标签值保存单个数值的指标；给出 source 时在导出时从回调读取当前值"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 source: Optional[Callable[[], Dict[LabelValues, float]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._source = source
+
+    def _key(self, labels: Iterable[str]) -> LabelValues:
+        key = tuple(str(v) for v in labels)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return key
+
+    def get(self, *labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        values = self._source() if self._source else self._values
+        for key, value in sorted(values.items()):
+            yield "", self.labelnames, key, value
+
+
+class Counter(_ValueMetric):
+    """单调递增的计数器"""
+
+    type = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        if amount < 0:
+            raise ValueError("counters can only increase")
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_ValueMetric):
+    """可增可减的当前值"""
+
+    type = "gauge"
+
+    def set(self, *labels: str, value: float) -> None:
+        self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """固定分桶的直方图，observe 只更新对应的桶计数，导出时再累加"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS_MS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 标签值 -> [各桶计数..., 超出最大桶的计数, 总和]
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, *labels: str, value: float) -> None:
+        key = tuple(str(v) for v in labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+                break
+        else:
+            series[len(self.buckets)] += 1
+        series[-1] += value
+
+    def samples(self):
+        bucket_names = self.labelnames + ("le",)
+        for key, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), series):
+                cumulative += n
+                yield "_bucket", bucket_names, key + (_format_value(bound),), cumulative
+            yield "_sum", self.labelnames, key, series[-1]
+            yield "_count", self.labelnames, key, cumulative
+
+
+class MetricsRegistry:
+    """指标集合，更新与导出共用一把锁（测试线程写入，Flask线程抓取）"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        with self.lock:
+            lines = []
+            for metric in self._metrics:
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class TesterMetrics:
+    """网络测试的指标
+
+    区域级直方图与计数器在每个结果到达时增量更新（observe_result），
+    测试器内部的计数（探测次数、错误、队列深度）在抓取时直接读取其当前值。
+    """
+
+    def __init__(self, tester, registry: Optional[MetricsRegistry] = None):
+        self.tester = tester
+        self.registry = registry or MetricsRegistry()
+        r = self.registry.register
+
+        self.rtt = r(Histogram(
+            "oracle_probe_rtt_ms", "Average ICMP round-trip time per endpoint test", ("region",)))
+        self.phase = r(Histogram(
+            "oracle_https_phase_ms", "HTTPS probe phase time per endpoint test", ("region", "phase")))
+        self.packets_sent = r(Counter(
+            "oracle_probe_packets_sent_total", "ICMP echo requests sent", ("region",)))
+        self.packets_lost = r(Counter(
+            "oracle_probe_packets_lost_total", "ICMP echo requests without a reply", ("region",)))
+        self.results = r(Counter(
+            "oracle_endpoint_results_total", "Endpoint test results by status", ("region", "status")))
+        self.score = r(Gauge(
+            "oracle_endpoint_score", "Latest score per endpoint", ("region", "service", "endpoint")))
+        self.suspect = r(Counter(
+            "oracle_endpoint_suspect_results_total",
+            "Results measured while the tester event loop was stalled", ("region",)))
+        self.sweep_duration = r(Histogram(
+            "oracle_tester_sweep_duration_seconds", "Wall time of a full test sweep", (), SWEEP_BUCKETS_S))
+
+        r(Counter("oracle_tester_probes_sent_total", "Probes issued by the tester", ("kind",),
+                  source=lambda: {(k,): v for k, v in tester.probe_counts.items()}))
+        r(Counter("oracle_tester_probe_errors_total", "Probe errors by type", ("type",),
+                  source=lambda: {(k,): v for k, v in tester.probe_errors.items()}))
+        r(Gauge("oracle_tester_executor_queue_depth", "Tasks waiting for the ping fallback thread pool", (),
+                source=lambda: {(): tester.executor_queue_depth}))
+        r(Gauge("oracle_tester_scheduler_queued", "Probes waiting for a scheduler slot", (),
+                source=lambda: {(): tester.scheduler.waiting}))
+        r(Gauge("oracle_tester_scheduler_active", "Probes holding a scheduler slot", (),
+                source=lambda: {(): tester.scheduler.active}))
+        r(Counter("oracle_tester_scheduler_queue_wait_ms_total", "Cumulative scheduler queue wait", (),
+                  source=lambda: {(): round(tester.scheduler.total_queue_wait, 3)}))
+        r(Gauge("oracle_tester_loop_lag_max_ms", "Largest event loop stall seen by the lag monitor", (),
+                source=lambda: {(): round(tester.loop_monitor.max_lag, 3)}))
+        r(Counter("oracle_tester_loop_lag_ms_total", "Cumulative event loop lag", (),
+                  source=lambda: {(): round(tester.loop_monitor.total_lag, 3)}))
+        r(Gauge("oracle_tester_testing", "Whether a sweep is running", (),
+                source=lambda: {(): int(tester.is_testing)}))
+        r(Gauge("oracle_tester_progress", "Endpoints finished in the current sweep", (),
+                source=lambda: {(): tester.test_progress}))
+
+    def observe_result(self, result: Dict) -> None:
+        """记录一个测试结果"""
+        region = result.get("region") or "unknown"
+        with self.registry.lock:
+            self.results.inc(region, result.get("status", "unknown"))
+            sent = result.get("probes_sent", 0) or 0
+            if sent:
+                self.packets_sent.inc(region, amount=sent)
+                self.packets_lost.inc(region, amount=round(sent * (result.get("packet_loss", 0) or 0) / 100))
+            latency = result.get("latency")
+            if latency is not None and latency < 999:
+                self.rtt.observe(region, value=latency)
+            for phase, key in (("dns", "dns_time"), ("tcp", "tcp_time"), ("tls", "tls_time"), ("ttfb", "ttfb")):
+                value = result.get(key)
+                if value is not None and value < 999:
+                    self.phase.observe(region, phase, value=value)
+            if result.get("suspect"):
+                self.suspect.inc(region)
+            if "score" in result:
+                self.score.set(region, result.get("service") or "unknown", result.get("endpoint") or "unknown",
+                               value=result["score"])
+
+    def observe_sweep(self, seconds: float) -> None:
+        """记录一轮测试的耗时"""
+        with self.registry.lock:
+            self.sweep_duration.observe(value=seconds)
+
+    def render(self) -> str:
+        return self.registry.render()
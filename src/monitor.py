@@ -0,0 +1,133 @@
+"""持续监控模块 - 复用同一个测试器按固定间隔循环测试，结果保存在环形缓冲区中"""
+
+import asyncio
+import time
+import logging
+from typing import Dict, Any, Optional, List
+
+from .network_tester import NetworkTester
+from .resultset import ResultRow, ResultSet
+from .stats import RingBuffer
+
+logger = logging.getLogger(__name__)
+
+SERIES_FIELDS = ("timestamp", "latency", "packet_loss", "connection_time", "jitter", "score")
+
+
+class EndpointSeries:
+    """单个端点的时间序列，每个指标一个固定容量的环形缓冲区"""
+
+    __slots__ = ("name", "region", "last_result") + SERIES_FIELDS
+
+    def __init__(self, name: str, region: str, capacity: int):
+        self.name = name
+        self.region = region
+        self.last_result: Optional[ResultRow] = None
+        for field in SERIES_FIELDS:
+            setattr(self, field, RingBuffer(capacity))
+
+    def add(self, result: ResultRow, timestamp: float) -> None:
+        self.last_result = result
+        self.timestamp.append(timestamp)
+        for field in SERIES_FIELDS[1:]:
+            getattr(self, field).append(result.get(field, 999))
+
+    def window_summary(self) -> Dict[str, Any]:
+        """最近窗口内的汇总：样本数、平均延迟、平均丢包率、平均评分"""
+        latencies = [v for v in self.latency.values() if v < 999]
+        losses = self.packet_loss.values()
+        scores = self.score.values()
+        return {
+            "name": self.name,
+            "region": self.region,
+            "rounds": len(self.timestamp),
+            "latency_avg": sum(latencies) / len(latencies) if latencies else 999,
+            "packet_loss_avg": sum(losses) / len(losses) if losses else 100,
+            "score_avg": sum(scores) / len(scores) if scores else 0
+        }
+
+
+class Monitor:
+    """持续监控
+
+    整个监控期间复用同一个 NetworkTester（共享ICMP套接字、HTTPS探测器、DNS缓存和
+    分位数统计）；每轮内各端点的开始时间在间隔内均匀错开，避免所有探测同时打到本地上行链路。
+    """
+
+    def __init__(self, servers: Dict[str, Dict[str, str]], interval: float,
+                 history_size: int = 120, tester: Optional[NetworkTester] = None):
+        self.servers = servers
+        self.interval = interval
+        self.tester = tester or NetworkTester()
+        self.series: Dict[str, EndpointSeries] = {
+            name: EndpointSeries(name, info["region"], history_size)
+            for name, info in servers.items()
+        }
+        # 各端点的最新结果（列式存储，每个端点一行，新结果原地覆盖）
+        self.latest = ResultSet()
+        self.rounds_completed = 0
+        self._stopped = False
+
+    def stop(self) -> None:
+        """当前轮结束后停止"""
+        self._stopped = True
+
+    async def run_round(self, callback: Optional[callable] = None) -> List[Dict[str, Any]]:
+        """执行一轮测试，各端点按错开的时间点开始"""
+        tester = self.tester
+        tester.test_progress = 0
+        tester.total_servers = len(self.servers)
+        tester.is_testing = True
+        # 事件循环延迟采样每轮启动一次
+        tester.loop_monitor.start()
+        spacing = self.interval / max(1, len(self.servers))
+
+        async def probe(index: int, name: str, info: Dict[str, str]) -> Dict[str, Any]:
+            await asyncio.sleep(index * spacing)
+            result = await tester.test_server(name, info)
+            latest = self.latest
+            self.series[name].add(latest[latest.add(result)], time.time())
+            if callback:
+                if asyncio.iscoroutinefunction(callback):
+                    await callback(result)
+                else:
+                    callback(result)
+            return result
+
+        try:
+            return await asyncio.gather(*(
+                probe(i, name, info) for i, (name, info) in enumerate(self.servers.items())
+            ))
+        finally:
+            tester.is_testing = False
+            tester.loop_monitor.stop()
+            self.rounds_completed += 1
+
+    async def run(self, rounds: Optional[int] = None,
+                  callback: Optional[callable] = None,
+                  on_round: Optional[callable] = None) -> None:
+        """按固定节奏循环测试，rounds为None时一直运行直到 stop()
+
+        callback在每个结果完成时调用，on_round在每轮结束时以该轮结果列表调用。
+        某一轮超时运行时跳过错过的节拍，而不是连续补跑。
+        """
+        # 首轮前预先解析所有端点，之后由DNS缓存按TTL刷新
+        await self.tester.resolver.resolve_all(info["endpoint"] for info in self.servers.values())
+        start = time.monotonic()
+        while not self._stopped and (rounds is None or self.rounds_completed < rounds):
+            results = await self.run_round(callback)
+            if on_round:
+                on_round(results)
+            if self._stopped or (rounds is not None and self.rounds_completed >= rounds):
+                break
+            elapsed = time.monotonic() - start
+            next_tick = (int(elapsed // self.interval) + 1) * self.interval
+            await asyncio.sleep(next_tick - elapsed)
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        """所有端点的窗口汇总，按平均评分排序"""
+        return sorted(
+            (s.window_summary() for s in self.series.values()),
+            key=lambda x: x["score_avg"],
+            reverse=True
+        )
@@ -1,250 +1,209 @@
 """网络测试核心模块"""
 
 import asyncio
-import aiohttp
-import subprocess
-import platform
-import re
+import math
 import statistics
+import time
 import logging
-from typing import Dict, List, Tuple, Optional, Any
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Dict, List, Tuple, Optional, Any, AsyncIterator
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor
 
-from .config import TEST_CONFIG, SCORE_WEIGHTS
+from .config import TEST_CONFIG
+from .icmp import build_ping_result
+from .resolver import DNSError
+from .backends import ProbeBackend, LiveBackend
+from .stats import SampleBuffer, EndpointStats, mean_ci_half_width, wilson_interval, latency_converged
+from .scheduler import ProbeScheduler
+from .loopmon import LoopLagMonitor, LagWindow
+from .scoring import ScoringModel
+from .sharding import ShardedSweep, effective_shards
 
 logger = logging.getLogger(__name__)
 
+# 当前正在测量的结果的事件循环延迟窗口，ping与HTTPS探测在其中计时
+_lag_window: ContextVar[Optional[LagWindow]] = ContextVar("lag_window", default=None)
+
 
 class NetworkTester:
     """网络测试核心类"""
     
-    def __init__(self):
+    def __init__(self, backend: Optional[ProbeBackend] = None):
         self.test_results: Dict[str, Any] = {}
         self.test_progress: int = 0
         self.total_servers: int = 0
         self.is_testing: bool = False
         self.executor = ThreadPoolExecutor(max_workers=TEST_CONFIG["max_workers"])
+        # 每个端点的流式分位数统计（按服务器名称索引）
+        self.endpoint_stats: Dict[str, EndpointStats] = {}
+        # 所有网络访问经由探测后端，默认访问真实网络（见 backends.py）
+        self.backend = backend or LiveBackend(self.executor)
+        # 探测调度：限制全局与各类型并发、按目标限速，并统计排队等待时间
+        self.scheduler = ProbeScheduler(
+            TEST_CONFIG["max_concurrency"],
+            {"ping": TEST_CONFIG["max_ping_concurrency"], "https": TEST_CONFIG["max_https_concurrency"]},
+            TEST_CONFIG["per_destination_interval"]
+        )
+        # ping和HTTPS探测共用的DNS缓存，每个主机每轮只解析一次
+        self.resolver = self.backend.resolver
+        # 评分方案（分段规则与权重），可替换为其他方案，如 ScoringModel(weights)
+        self.scoring = ScoringModel()
+        # 累计探测次数（按类型）与探测错误次数（按错误类型），供监控指标导出
+        self.probe_counts: Dict[str, int] = {"ping": 0, "https": 0}
+        self.probe_errors: Dict[str, int] = {}
+        # 上一轮完整测试的耗时（秒）
+        self.last_sweep_duration: Optional[float] = None
+        self._sweep_started: Optional[float] = None
+        # 事件循环延迟采样：测量期间循环被同步代码占用时，结果会被标记为可疑
+        self.loop_monitor = LoopLagMonitor(TEST_CONFIG["loop_lag_interval"])
+        # 当前正在进行的分片测试（多进程模式），None表示单进程
+        self._sharded: Optional[ShardedSweep] = None
         
-    def ping_host(self, host: str, count: int = None, timeout: int = None) -> Dict[str, Any]:
-        """执行ping测试"""
+    @property
+    def executor_queue_depth(self) -> int:
+        """等待线程池执行的ping数（系统ping回退时）"""
+        return self.backend.executor_waiting
+    
+    def _timed(self):
+        """把一次探测计入当前结果的事件循环延迟窗口"""
+        window = _lag_window.get()
+        return nullcontext() if window is None else self.loop_monitor.section(window)
+    
+    async def ping_host_async(self, host: str, count: int = None, timeout: int = None,
+                              address: Optional[str] = None) -> Dict[str, Any]:
+        """通过探测后端执行ping测试"""
         count = count or TEST_CONFIG["ping_count"]
         timeout = timeout or TEST_CONFIG["ping_timeout"]
+        self.probe_counts["ping"] += count
         
-        system = platform.system().lower()
-        
-        if system == "windows":
-            cmd = ["ping", "-n", str(count), "-w", str(timeout * 1000), host]
-        elif system == "darwin":
-            cmd = ["ping", "-c", str(count), "-W", str(timeout * 1000), host]
-        else:
-            cmd = ["ping", "-c", str(count), "-W", str(timeout), host]
+        with self._timed():
+            result = await self.backend.ping(host, count, timeout, address)
+        if not result["success"]:
+            self._count_error("ping_unreachable")
+        return result
+    
+    def _count_error(self, kind: str) -> None:
+        self.probe_errors[kind] = self.probe_errors.get(kind, 0) + 1
+    
+    async def ping_adaptive(self, host: str, address: Optional[str] = None) -> Dict[str, Any]:
+        """自适应次数的ping测试（序贯停止）
+
+        先发 ping_min_count 个包，之后每次追加 adaptive_batch 个，直到平均延迟的置信半宽
+        不超过 max(latency_ci_abs, latency_ci_rel × 均值) 且丢包率足够低，或达到 ping_max_count 为止。
+        没有丢包时丢包率条件直接满足，稳定的端点发 ping_min_count 个包即可结束；
+        出现丢包时要求丢包率的Wilson上界不超过 loss_upper_limit。前几个包全部丢失时立即停止。
+        """
+        z = TEST_CONFIG["confidence_z"]
+        max_count = TEST_CONFIG["ping_max_count"]
+        samples = SampleBuffer()
+        sent = 0
+        error = None
+        executor_wait = 0.0
+        batch = TEST_CONFIG["ping_min_count"]
         
-        try:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=timeout * count + 5
-            )
-            
-            output = result.stdout
+        while batch > 0:
+            r = await self.ping_host_async(host, batch, address=address)
+            samples.extend(r["samples"])
+            sent += batch
+            error = r.get("error", error)
+            executor_wait += r.get("executor_wait", 0.0)
             
-            # 解析ping结果
-            latencies = []
+            if not r["success"] and not samples:
+                break
+            if not r["samples"] and r["success"]:
+                # 回退到只有统计行的系统ping时拿不到逐包样本，无法序贯判断
+                return r
             
-            # macOS/Linux统计行格式
-            stats_pattern = r'round-trip min/avg/max/stddev = ([\d.]+)/([\d.]+)/([\d.]+)/([\d.]+)'
-            stats_match = re.search(stats_pattern, output)
-            
-            if stats_match:
-                min_lat = float(stats_match.group(1))
-                avg_lat = float(stats_match.group(2))
-                max_lat = float(stats_match.group(3))
-                stddev = float(stats_match.group(4))
-                
-                # 生成模拟的延迟列表用于计算
-                latencies = [avg_lat] * count
-                
-                return {
-                    "min": min_lat,
-                    "avg": avg_lat,
-                    "max": max_lat,
-                    "jitter": stddev,
-                    "packet_loss": self._parse_packet_loss(output),
-                    "success": True
-                }
-            
-            # Windows格式或单个响应解析
-            time_pattern = r'(?:time=|时间=)([\d.]+)\s*ms'
-            time_matches = re.findall(time_pattern, output)
-            
-            if time_matches:
-                latencies = [float(t) for t in time_matches]
-                
-                if latencies:
-                    return {
-                        "min": min(latencies),
-                        "avg": statistics.mean(latencies),
-                        "max": max(latencies),
-                        "jitter": statistics.stdev(latencies) if len(latencies) > 1 else 0,
-                        "packet_loss": self._parse_packet_loss(output),
-                        "success": True
-                    }
-            
-            # 如果没有解析到延迟，检查是否全部丢包
-            packet_loss = self._parse_packet_loss(output)
-            if packet_loss == 100:
-                return {
-                    "min": 999,
-                    "avg": 999,
-                    "max": 999,
-                    "jitter": 0,
-                    "packet_loss": 100,
-                    "success": False,
-                    "error": "100% packet loss"
-                }
-            
-            return {
-                "min": 999,
-                "avg": 999,
-                "max": 999,
-                "jitter": 0,
-                "packet_loss": 100,
-                "success": False,
-                "error": "Failed to parse ping output"
-            }
-            
-        except subprocess.TimeoutExpired:
-            return {
-                "min": 999,
-                "avg": 999,
-                "max": 999,
-                "jitter": 0,
-                "packet_loss": 100,
-                "success": False,
-                "error": "Ping timeout"
-            }
-        except Exception as e:
-            logger.error(f"Ping error for {host}: {str(e)}")
-            return {
-                "min": 999,
-                "avg": 999,
-                "max": 999,
-                "jitter": 0,
-                "packet_loss": 100,
-                "success": False,
-                "error": str(e)
-            }
-    
-    def _parse_packet_loss(self, output: str) -> float:
-        """解析丢包率"""
-        loss_patterns = [
-            r'(\d+(?:\.\d+)?)\s*%\s*(?:packet\s*)?loss',
-            r'(\d+(?:\.\d+)?)\s*%\s*丢失',
-            r'丢包率\s*=\s*(\d+(?:\.\d+)?)\s*%'
-        ]
+            lost = sent - len(samples)
+            loss_ok = lost == 0 or wilson_interval(lost, sent, z)[1] <= TEST_CONFIG["loss_upper_limit"]
+            if loss_ok and latency_converged(
+                    samples, z, TEST_CONFIG["latency_ci_abs"], TEST_CONFIG["latency_ci_rel"]):
+                break
+            batch = min(TEST_CONFIG["adaptive_batch"], max_count - sent)
         
-        for pattern in loss_patterns:
-            match = re.search(pattern, output, re.IGNORECASE)
-            if match:
-                return float(match.group(1))
+        result = build_ping_result(list(samples), sent, error)
+        result["executor_wait"] = executor_wait
+        return result
         
-        return 0.0
-    
-    async def test_connection_time(self, endpoint: str) -> Dict[str, Any]:
-        """测试HTTPS连接时间"""
-        url = f"https://{endpoint}"
-        times = []
+    async def test_connection_time(self, endpoint: str, address: Optional[str] = None,
+                                   port: int = 443) -> Dict[str, Any]:
+        """测试HTTPS连接时间，分别统计TCP握手、TLS握手和首字节时间
+
+        启用自适应采样时，测试次数在 connection_min_tests 和 connection_max_tests 之间，
+        连接时间均值的置信半宽达标即停止。
+        """
+        samples = []
+        times = SampleBuffer()
+        queue_wait = 0.0
         
-        async with aiohttp.ClientSession(
-            connector=aiohttp.TCPConnector(ssl=False),
-            timeout=aiohttp.ClientTimeout(total=TEST_CONFIG["connection_timeout"])
-        ) as session:
-            for _ in range(TEST_CONFIG["connection_tests"]):
-                try:
-                    start_time = asyncio.get_event_loop().time()
-                    async with session.head(url) as response:
-                        end_time = asyncio.get_event_loop().time()
-                        connection_time = (end_time - start_time) * 1000
-                        times.append(connection_time)
-                except Exception as e:
-                    logger.debug(f"Connection test failed for {endpoint}: {str(e)}")
-                    times.append(999)
-                
-                await asyncio.sleep(0.1)
+        if TEST_CONFIG["adaptive_sampling"]:
+            min_tests = TEST_CONFIG["connection_min_tests"]
+            max_tests = TEST_CONFIG["connection_max_tests"]
+        else:
+            min_tests = max_tests = TEST_CONFIG["connection_tests"]
         
-        if times:
-            valid_times = [t for t in times if t < 999]
-            if valid_times:
-                return {
-                    "avg": statistics.mean(valid_times),
-                    "min": min(valid_times),
-                    "max": max(valid_times),
-                    "success": True
-                }
+        for i in range(max_tests):
+            if i >= min_tests:
+                # 前几次全部失败，或连接时间已收敛时停止
+                if not samples or latency_converged(
+                        times, TEST_CONFIG["confidence_z"],
+                        TEST_CONFIG["latency_ci_abs"], TEST_CONFIG["latency_ci_rel"]):
+                    break
+            if i:
+                await self.backend.sleep(0.1)
+            async with self.scheduler.slot("https", address or endpoint) as slot:
+                queue_wait += slot.queue_wait
+                with self._timed():
+                    sample = await self.backend.connect(endpoint, port, address)
+            self.probe_counts["https"] += 1
+            if sample["success"]:
+                samples.append(sample)
+                # 连接时间不含DNS，DNS由解析缓存单独统计
+                times.append(sample["tcp"] + sample["tls"] + sample["ttfb"])
+            else:
+                self._count_error("https_timeout" if sample["error"] == "timeout" else "https_error")
+                logger.debug(f"Connection test failed for {endpoint}: {sample['error']}")
+        
+        if samples:
+            return {
+                "avg": times.mean(),
+                "min": min(times),
+                "max": max(times),
+                "samples": times,
+                "queue_wait": queue_wait,
+                "tcp": statistics.mean(s["tcp"] for s in samples),
+                "tls": statistics.mean(s["tls"] for s in samples),
+                "ttfb": statistics.mean(s["ttfb"] for s in samples),
+                "success": True
+            }
         
         return {
             "avg": 999,
             "min": 999,
             "max": 999,
+            "tcp": 999,
+            "tls": 999,
+            "ttfb": 999,
+            "samples": SampleBuffer(),
+            "queue_wait": queue_wait,
             "success": False
         }
     
     def calculate_score(self, result: Dict[str, Any]) -> float:
-        """计算综合评分"""
-        # 延迟评分
-        latency = result.get("latency", 999)
-        if latency < 50:
-            latency_score = 100
-        elif latency < 100:
-            latency_score = 90
-        elif latency < 200:
-            latency_score = 70
-        elif latency < 300:
-            latency_score = 50
-        else:
-            latency_score = max(0, 30 - (latency - 300) / 10)
-        
-        # 丢包率评分
-        packet_loss = result.get("packet_loss", 100)
-        packet_loss_score = max(0, 100 - packet_loss * 2)
-        
-        # 连接时间评分
-        connection_time = result.get("connection_time", 999)
-        if connection_time < 100:
-            connection_score = 100
-        elif connection_time < 200:
-            connection_score = 80
-        elif connection_time < 500:
-            connection_score = 60
-        else:
-            connection_score = max(0, 40 - (connection_time - 500) / 20)
-        
-        # 抖动评分
-        jitter = result.get("jitter", 999)
-        if jitter < 5:
-            jitter_score = 100
-        elif jitter < 10:
-            jitter_score = 80
-        elif jitter < 20:
-            jitter_score = 60
-        else:
-            jitter_score = max(0, 40 - jitter)
-        
-        # 加权计算总分
-        total_score = (
-            latency_score * SCORE_WEIGHTS["latency"] +
-            packet_loss_score * SCORE_WEIGHTS["packet_loss"] +
-            connection_score * SCORE_WEIGHTS["connection"] +
-            jitter_score * SCORE_WEIGHTS["jitter"]
-        )
-        
-        return round(total_score, 2)
+        """计算综合评分（规则与权重见 self.scoring）"""
+        return self.scoring.score(result)
     
     async def test_server(self, name: str, server_info: Dict[str, str], 
-                         callback: Optional[callable] = None) -> Dict[str, Any]:
-        """测试单个服务器"""
+                         callback: Optional[callable] = None,
+                         ping_result: Optional[Dict[str, Any]] = None,
+                         lag_window: Optional[LagWindow] = None) -> Dict[str, Any]:
+        """测试单个服务器
+
+        传入 ping_result 时（如top-K模式已完成ping）跳过ping，只做HTTPS测试，
+        lag_window 为测量这些ping时的事件循环延迟窗口。
+        """
         endpoint = server_info["endpoint"]
         region = server_info["region"]
         location = server_info["location"]
@@ -254,14 +213,29 @@ class NetworkTester:
             "endpoint": endpoint,
             "region": region,
             "location": location,
+            "service": server_info.get("service", "iaas"),
             "status": "testing"
         }
+        if lag_window is None:
+            lag_window = self.loop_monitor.begin()
+        token = _lag_window.set(lag_window)
+        executor_wait = 0.0
         
         try:
+            # DNS解析（test_all_servers已预先并行解析，这里通常命中缓存）
+            resolved = await self.resolver.resolve(endpoint)
+            result["dns_time"] = resolved.resolve_time
+            
             # Ping测试
-            ping_result = await asyncio.get_event_loop().run_in_executor(
-                self.executor, self.ping_host, endpoint
-            )
+            ping_queue_wait = 0.0
+            if ping_result is None:
+                async with self.scheduler.slot("ping", resolved.address) as slot:
+                    ping_queue_wait = slot.queue_wait
+                    if TEST_CONFIG["adaptive_sampling"]:
+                        ping_result = await self.ping_adaptive(endpoint, address=resolved.address)
+                    else:
+                        ping_result = await self.ping_host_async(endpoint, address=resolved.address)
+            executor_wait = ping_result.get("executor_wait", 0.0)
             
             result.update({
                 "latency": ping_result["avg"],
@@ -272,8 +246,28 @@ class NetworkTester:
             })
             
             # 连接时间测试
-            connection_result = await self.test_connection_time(endpoint)
-            result["connection_time"] = connection_result["avg"]
+            connection_result = await self.test_connection_time(
+                endpoint, resolved.address, int(server_info.get("port", 443)))
+            result.update({
+                "connection_time": connection_result["avg"],
+                "tcp_time": connection_result["tcp"],
+                "tls_time": connection_result["tls"],
+                "ttfb": connection_result["ttfb"],
+                # 调度排队时间单独报告，不计入任何延迟指标
+                "queue_wait": round(ping_queue_wait + connection_result["queue_wait"], 3)
+            })
+            
+            # 更新端点的流式分位数统计
+            stats = self.endpoint_stats.get(name)
+            if stats is None:
+                stats = self.endpoint_stats[name] = EndpointStats()
+            stats.latency.update(ping_result["samples"])
+            stats.connection.update(connection_result["samples"])
+            sent = ping_result.get("sent", TEST_CONFIG["ping_count"])
+            stats.probes_sent += sent
+            stats.probes_lost += round(sent * ping_result["packet_loss"] / 100)
+            result["probes_sent"] = sent
+            result.update(stats.summary())
             
             # 计算评分
             result["score"] = self.calculate_score(result)
@@ -281,59 +275,326 @@ class NetworkTester:
             
         except Exception as e:
             logger.error(f"Error testing {name}: {str(e)}")
-            result.update({
-                "latency": 999,
-                "min_latency": 999,
-                "max_latency": 999,
-                "jitter": 0,
-                "packet_loss": 100,
-                "connection_time": 999,
-                "score": 0,
-                "status": "error",
-                "error": str(e)
-            })
+            self._count_error("dns" if isinstance(e, DNSError) else "internal")
+            result.update(self._failure_fields(str(e)))
+        finally:
+            _lag_window.reset(token)
         
-        # 更新进度
+        # 测量开销：事件循环停顿与线程池排队，停顿过长说明测试机自身是瓶颈
+        result.update(self.loop_monitor.end(lag_window))
+        result["executor_wait"] = round(executor_wait, 3)
+        result["suspect"] = result["loop_lag_max"] > TEST_CONFIG["loop_lag_threshold"]
+        
+        await self._report(result, callback)
+        return result
+    
+    @staticmethod
+    def _failure_fields(error: str) -> Dict[str, Any]:
+        """测试失败时各指标的取值"""
+        return {
+            "latency": 999,
+            "min_latency": 999,
+            "max_latency": 999,
+            "jitter": 0,
+            "packet_loss": 100,
+            "connection_time": 999,
+            "dns_time": 999,
+            "tcp_time": 999,
+            "tls_time": 999,
+            "ttfb": 999,
+            "score": 0,
+            "status": "error",
+            "error": error
+        }
+    
+    def _error_result(self, name: str, server_info: Dict[str, str], error: str) -> Dict[str, Any]:
+        """构造未能完成测试的服务器的错误结果"""
+        result = {
+            "name": name,
+            "endpoint": server_info["endpoint"],
+            "region": server_info["region"],
+            "location": server_info["location"],
+            "service": server_info.get("service", "iaas")
+        }
+        result.update(self._failure_fields(error))
+        return result
+    
+    async def _report(self, result: Dict[str, Any], callback: Optional[callable]) -> None:
+        """更新进度并调用回调函数"""
         self.test_progress += 1
         
-        # 调用回调函数
         if callback:
             if asyncio.iscoroutinefunction(callback):
                 await callback(result)
             else:
                 callback(result)
-        
-        return result
     
-    async def test_all_servers(self, servers: Dict[str, Dict[str, str]], 
-                              callback: Optional[callable] = None) -> List[Dict[str, Any]]:
-        """并发测试所有服务器"""
+    async def iter_results(self, servers: Dict[str, Dict[str, str]],
+                           callback: Optional[callable] = None,
+                           reset_stats: bool = True,
+                           top_k: Optional[int] = None,
+                           shards: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """按完成顺序逐个产出测试结果
+
+        用法: async for result in tester.iter_results(servers): ...
+        调用方提前break或取消时，尚未完成的测试会被取消。
+        reset_stats为False时保留之前各轮的分位数统计（持续监控时使用）。
+        指定top_k时只需找出最快的K个服务器，见 _iter_top_k。
+        shards大于1时把服务器分给多个工作进程测试（见 sharding.py），默认取配置 shards。
+        """
+        if reset_stats:
+            self.endpoint_stats = {}
         self.test_progress = 0
         self.total_servers = len(servers)
         self.is_testing = True
+        self._sweep_started = time.monotonic()
+        # 在任何探测开始前完成后端初始化，避免初始化时阻塞正在进行的测量
+        self.backend.prepare()
+        # 事件循环延迟采样每轮启动一次，_finish_sweep 时停止
+        self.loop_monitor.start()
         
-        tasks = []
-        for name, info in servers.items():
-            task = self.test_server(name, info, callback)
-            tasks.append(task)
+        if top_k:
+            sweep = self._iter_top_k(servers, top_k, callback)
+            try:
+                async for result in sweep:
+                    yield result
+            finally:
+                # 调用方提前退出时立即关闭内层生成器（取消入围者的测试），而不是等到被垃圾回收
+                await sweep.aclose()
+                self._finish_sweep()
+            return
         
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        shards = effective_shards(
+            TEST_CONFIG["shards"] if shards is None else shards, len(servers), TEST_CONFIG["shard_min_servers"]
+        )
+        if shards > 1:
+            # 各分片的分位数统计留在工作进程中，结果里已带有汇总值
+            self._sharded = ShardedSweep(self, shards)
+            sweep = self._sharded.iter_results(servers, callback)
+            try:
+                async for result in sweep:
+                    yield result
+            finally:
+                # 调用方提前退出时立即终止工作进程
+                await sweep.aclose()
+                self._finish_sweep()
+            return
         
-        # 过滤掉异常结果
-        valid_results = []
-        for r in results:
-            if isinstance(r, dict):
-                valid_results.append(r)
-            else:
-                logger.error(f"Task exception: {r}")
+        # 有界队列 + 固定数量的worker：同时测试的服务器数不超过上限，
+        # 队列满时生产者等待（背压），避免一次性创建所有任务
+        queue: asyncio.Queue = asyncio.Queue(maxsize=TEST_CONFIG["max_concurrent_servers"])
+        done: asyncio.Queue = asyncio.Queue()
+        worker_count = max(1, min(TEST_CONFIG["max_concurrent_servers"], len(servers)))
         
+        async def produce():
+            cancelled = False
+            try:
+                # 每个主机只解析一次，并行完成
+                await self.resolver.resolve_all(info["endpoint"] for info in servers.values())
+                for item in servers.items():
+                    await queue.put(item)
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+            finally:
+                # 解析失败等异常时也要让worker退出，否则消费方会一直等待；
+                # 被取消时worker同时被取消，不再放入（队列满时会一直阻塞）
+                if not cancelled:
+                    for _ in range(worker_count):
+                        await queue.put(None)
+        
+        async def work():
+            try:
+                while True:
+                    item = await queue.get()
+                    if item is None:
+                        return
+                    try:
+                        await done.put(await self.test_server(item[0], item[1], callback))
+                    except Exception as e:
+                        logger.error(f"Task exception: {e}")
+            finally:
+                await done.put(None)
+        
+        tasks = [asyncio.ensure_future(produce())]
+        tasks.extend(asyncio.ensure_future(work()) for _ in range(worker_count))
+        
+        try:
+            running = worker_count
+            while running:
+                result = await done.get()
+                if result is None:
+                    running -= 1
+                else:
+                    yield result
+            # 生产者出错时在这里把异常抛给调用方
+            await tasks[0]
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._finish_sweep()
+    
+    def _finish_sweep(self) -> None:
         self.is_testing = False
-        return valid_results
+        self.loop_monitor.stop()
+        if self._sweep_started is not None:
+            self.last_sweep_duration = time.monotonic() - self._sweep_started
+            self._sweep_started = None
+    
+    async def _iter_top_k(self, servers: Dict[str, Dict[str, str]], k: int,
+                          callback: Optional[callable]) -> AsyncIterator[Dict[str, Any]]:
+        """逐轮淘汰（successive halving）找出延迟最低的K个服务器
+
+        每轮对仍在竞争的服务器各发 top_k_round_pings 个ping，按平均延迟的置信区间淘汰：
+        区间下界已高于第K名区间上界的服务器直接出局，其余超过 max(K, 半数) 的按均值淘汰。
+        总ping预算与完整测试相同，淘汰省下的预算用于继续测量剩下的接近者。
+        出局的服务器立即以 status="pruned" 产出（只有ping数据，不评分，score为0，
+        pruned_round 为出局的轮次），最终入围者再做HTTPS测试。
+        """
+        round_pings = TEST_CONFIG["top_k_round_pings"]
+        max_pings = TEST_CONFIG["top_k_max_pings"]
+        z = TEST_CONFIG["confidence_z"]
+        
+        resolved = await self.resolver.resolve_all(info["endpoint"] for info in servers.values())
+        contenders = {}
+        for name, info in servers.items():
+            if info["endpoint"] in resolved:
+                contenders[name] = {"samples": SampleBuffer(), "sent": 0,
+                                    "lag": self.loop_monitor.begin()}
+            else:
+                # 无法解析的服务器交给test_server按错误处理
+                yield await self.test_server(name, info, callback)
+        
+        budget = len(servers) * TEST_CONFIG["ping_count"]
+        rounds = 0
+        
+        def bounds(state):
+            samples = state["samples"]
+            if len(samples) < 2:
+                return 0.0, math.inf
+            mean = samples.mean()
+            half_width = mean_ci_half_width(samples, z)
+            return mean - half_width, mean + half_width
+        
+        def aggregated(state):
+            return build_ping_result(list(state["samples"]), state["sent"])
+        
+        async def ping_round(name):
+            info = servers[name]
+            address = resolved[info["endpoint"]].address
+            state = contenders[name]
+            # 各轮ping都计入该服务器自己的延迟窗口（gather中每个任务有独立的上下文）
+            _lag_window.set(state["lag"])
+            async with self.scheduler.slot("ping", address):
+                r = await self.ping_host_async(info["endpoint"], round_pings, address=address)
+            state["samples"].extend(r["samples"])
+            state["sent"] += round_pings
+        
+        while contenders:
+            active = [n for n, st in contenders.items() if st["sent"] < max_pings]
+            if not active or budget < len(active) * round_pings:
+                break
+            await asyncio.gather(*(ping_round(n) for n in active))
+            budget -= len(active) * round_pings
+            rounds += 1
+            
+            if len(contenders) <= k:
+                continue
+            
+            # 全部丢包的直接出局，其余按置信区间和均值淘汰
+            pruned = [n for n, st in contenders.items() if not st["samples"]]
+            alive = sorted(
+                (n for n in contenders if contenders[n]["samples"]),
+                key=lambda n: contenders[n]["samples"].mean()
+            )
+            if len(alive) > k:
+                kth_upper = sorted(bounds(contenders[n])[1] for n in alive)[k - 1]
+                keep = [n for n in alive if bounds(contenders[n])[0] <= kth_upper]
+                keep = keep[:max(k, math.ceil(len(alive) / 2))]
+                pruned.extend(n for n in alive if n not in keep)
+            
+            for name in pruned:
+                state = contenders.pop(name)
+                yield await self._pruned_result(name, servers[name], aggregated(state), rounds,
+                                                state["lag"], callback)
+        
+        # 入围者：复用已有的ping数据，只补做HTTPS测试
+        finalists = [
+            asyncio.ensure_future(self.test_server(name, servers[name], callback, ping_result=aggregated(state),
+                                                   lag_window=state["lag"]))
+            for name, state in contenders.items()
+        ]
+        try:
+            for future in asyncio.as_completed(finalists):
+                yield await future
+        finally:
+            for task in finalists:
+                task.cancel()
+    
+    async def _pruned_result(self, name: str, server_info: Dict[str, str], ping_result: Dict[str, Any],
+                             pruned_round: int, lag_window: LagWindow,
+                             callback: Optional[callable]) -> Dict[str, Any]:
+        """构造top-K模式中提前出局服务器的结果
+
+        字段与完整测试的结果相同；没有测量的HTTPS指标与失败结果一样取999，
+        不计算评分（score为0，排在所有完整测量的结果之后）。
+        """
+        resolved = self.resolver.get_cached(server_info["endpoint"])
+        result = {
+            "name": name,
+            "endpoint": server_info["endpoint"],
+            "region": server_info["region"],
+            "location": server_info["location"],
+            "service": server_info.get("service", "iaas"),
+            "dns_time": resolved.resolve_time if resolved else 999,
+            "latency": ping_result["avg"],
+            "min_latency": ping_result["min"],
+            "max_latency": ping_result["max"],
+            "jitter": ping_result["jitter"],
+            "packet_loss": ping_result["packet_loss"],
+            "connection_time": 999,
+            "tcp_time": 999,
+            "tls_time": 999,
+            "ttfb": 999,
+            "probes_sent": ping_result["sent"],
+            "score": 0,
+            "status": "pruned",
+            "pruned_round": pruned_round
+        }
+        # 分位数统计与完整测试相同，只是没有连接时间样本（连接分位数为999）
+        stats = self.endpoint_stats.get(name)
+        if stats is None:
+            stats = self.endpoint_stats[name] = EndpointStats()
+        stats.latency.update(ping_result["samples"])
+        stats.probes_sent += ping_result["sent"]
+        stats.probes_lost += ping_result["sent"] - len(ping_result["samples"])
+        result.update(stats.summary())
+        result["queue_wait"] = 0.0
+        result.update(self.loop_monitor.end(lag_window))
+        result["executor_wait"] = 0.0
+        result["suspect"] = result["loop_lag_max"] > TEST_CONFIG["loop_lag_threshold"]
+        await self._report(result, callback)
+        return result
+    
+    async def test_all_servers(self, servers: Dict[str, Dict[str, str]], 
+                              callback: Optional[callable] = None,
+                              reset_stats: bool = True,
+                              top_k: Optional[int] = None,
+                              shards: Optional[int] = None) -> List[Dict[str, Any]]:
+        """并发测试所有服务器，全部完成后返回结果列表
+
+        指定top_k时进入快速模式，只保证前K名的测量完整。
+        """
+        return [r async for r in self.iter_results(servers, callback, reset_stats, top_k, shards)]
     
     def get_status(self) -> Dict[str, Any]:
         """获取测试状态"""
         return {
             "is_testing": self.is_testing,
             "progress": self.test_progress,
-            "total": self.total_servers
+            "total": self.total_servers,
+            "scheduler": self.scheduler.get_status(),
+            "loop": self.loop_monitor.get_status(),
+            "shards": self._sharded.get_status() if self._sharded else []
         }
\ No newline at end of file
@@ -0,0 +1,274 @@
+"""DNS解析缓存模块 - 异步并行解析，按TTL缓存并支持LRU淘汰"""
+
+import asyncio
+import ipaddress
+import random
+import socket
+import struct
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+DNS_TYPE_A = 1
+DNS_CLASS_IN = 1
+
+
+class DNSError(OSError):
+    """DNS解析失败"""
+
+
+class ResolvedHost:
+    """一次解析的结果"""
+
+    __slots__ = ("host", "addresses", "ttl", "resolve_time", "expires_at")
+
+    def __init__(self, host: str, addresses: List[str], ttl: float, resolve_time: float):
+        self.host = host
+        self.addresses = addresses
+        self.ttl = ttl
+        # 实际解析耗时（毫秒），缓存命中时仍保留首次解析的耗时
+        self.resolve_time = resolve_time
+        self.expires_at = time.monotonic() + ttl
+
+    @property
+    def address(self) -> str:
+        return self.addresses[0]
+
+    def expired(self, now: float) -> bool:
+        return now >= self.expires_at
+
+
+def read_nameservers(path: str = "/etc/resolv.conf") -> List[str]:
+    """读取系统配置的IPv4 DNS服务器"""
+    servers = []
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0] == "nameserver":
+                    try:
+                        if ipaddress.ip_address(parts[1]).version == 4:
+                            servers.append(parts[1])
+                    except ValueError:
+                        continue
+    except OSError:
+        pass
+    return servers
+
+
+def build_query(query_id: int, host: str) -> bytes:
+    """构造A记录查询报文"""
+    header = struct.pack("!HHHHHH", query_id, 0x0100, 1, 0, 0, 0)
+    qname = b"".join(
+        bytes([len(label)]) + label for label in (part.encode("idna") for part in host.rstrip(".").split("."))
+    ) + b"\x00"
+    return header + qname + struct.pack("!HH", DNS_TYPE_A, DNS_CLASS_IN)
+
+
+# 一个名称最多的标签数（253字节的名称至多127个标签），超出视为报文错误
+MAX_LABELS = 128
+
+
+def _skip_name(data: bytes, offset: int) -> int:
+    """跳过一个（可能压缩的）名称，返回其后的偏移
+
+    压缩指针只跳过不跟随，并要求指向更早的位置；越界、非法标签或指针抛出 DNSError。
+    """
+    for _ in range(MAX_LABELS):
+        if offset >= len(data):
+            raise DNSError("truncated DNS name")
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if offset + 2 > len(data):
+                raise DNSError("truncated DNS name pointer")
+            # 指针只能指向报文中更早出现的名称，指向自身或之后的位置必然成环或越界
+            if struct.unpack("!H", data[offset:offset + 2])[0] & 0x3FFF >= offset:
+                raise DNSError("invalid DNS name pointer")
+            return offset + 2
+        if length & 0xC0:
+            raise DNSError(f"invalid DNS label type 0x{length:02x}")
+        if length == 0:
+            return offset + 1
+        offset += length + 1
+    raise DNSError("DNS name has too many labels")
+
+
+def parse_response(data: bytes, query_id: int) -> Tuple[List[str], int]:
+    """解析应答报文，返回 (IPv4地址列表, 最小TTL)
+
+    报文截断或格式错误时抛出 DNSError（由调用方回退到系统解析）。
+    """
+    if len(data) < 12:
+        raise DNSError("truncated DNS response")
+    resp_id, flags, qdcount, ancount, _, _ = struct.unpack("!HHHHHH", data[:12])
+    if resp_id != query_id:
+        raise DNSError("DNS response id mismatch")
+    if flags & 0x0200:
+        raise DNSError("DNS response truncated (TC)")
+    rcode = flags & 0x000F
+    if rcode:
+        raise DNSError(f"DNS rcode {rcode}")
+
+    offset = 12
+    for _ in range(qdcount):
+        offset = _skip_name(data, offset) + 4
+        if offset > len(data):
+            raise DNSError("truncated DNS question")
+
+    addresses = []
+    ttls = []
+    for _ in range(ancount):
+        offset = _skip_name(data, offset)
+        if offset + 10 > len(data):
+            raise DNSError("truncated DNS answer")
+        rtype, rclass, ttl, rdlength = struct.unpack("!HHIH", data[offset:offset + 10])
+        offset += 10
+        if offset + rdlength > len(data):
+            raise DNSError("truncated DNS record data")
+        ttls.append(ttl)
+        if rtype == DNS_TYPE_A and rclass == DNS_CLASS_IN and rdlength == 4:
+            addresses.append(socket.inet_ntoa(data[offset:offset + 4]))
+        offset += rdlength
+
+    if not addresses:
+        raise DNSError("no A records in DNS response")
+    return addresses, min(ttls)
+
+
+class _DNSProtocol(asyncio.DatagramProtocol):
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        if not self.future.done():
+            self.future.set_result(data)
+
+    def error_received(self, exc: Exception) -> None:
+        if not self.future.done():
+            self.future.set_exception(exc)
+
+
+class DNSResolver:
+    """异步DNS解析器
+
+    直接向系统DNS服务器发送UDP查询，不占用线程，并使用应答中的TTL决定缓存时长；
+    没有可用DNS服务器、查询失败或目标只存在于hosts文件时，回退到 loop.getaddrinfo。
+    同一主机的并发解析会合并为一次查询。
+    """
+
+    def __init__(self, timeout: float = 2.0, max_entries: int = 4096,
+                 min_ttl: float = 30, max_ttl: float = 3600, default_ttl: float = 300,
+                 nameservers: Optional[List[str]] = None):
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.default_ttl = default_ttl
+        self.nameservers = nameservers if nameservers is not None else read_nameservers()
+        self._cache: "OrderedDict[str, ResolvedHost]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.hits = 0
+        self.misses = 0
+
+    def get_cached(self, host: str) -> Optional[ResolvedHost]:
+        """返回未过期的缓存结果"""
+        entry = self._cache.get(host)
+        if entry is None:
+            return None
+        if entry.expired(time.monotonic()):
+            del self._cache[host]
+            return None
+        self._cache.move_to_end(host)
+        return entry
+
+    async def resolve(self, host: str) -> ResolvedHost:
+        """解析主机名，命中缓存时直接返回"""
+        entry = self.get_cached(host)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._inflight.clear()
+            self._loop = loop
+
+        future = self._inflight.get(host)
+        if future is None:
+            self.misses += 1
+            future = loop.create_task(self._resolve_uncached(host))
+            self._inflight[host] = future
+            future.add_done_callback(lambda _: self._inflight.pop(host, None))
+        return await asyncio.shield(future)
+
+    async def resolve_all(self, hosts: Iterable[str]) -> Dict[str, ResolvedHost]:
+        """并行解析多个主机，解析失败的主机不出现在返回值中"""
+        hosts = list(dict.fromkeys(hosts))
+        results = await asyncio.gather(*(self.resolve(h) for h in hosts), return_exceptions=True)
+        resolved = {}
+        for host, r in zip(hosts, results):
+            if isinstance(r, ResolvedHost):
+                resolved[host] = r
+            else:
+                logger.debug(f"DNS resolution failed for {host}: {r}")
+        return resolved
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    async def _resolve_uncached(self, host: str) -> ResolvedHost:
+        start = time.perf_counter_ns()
+        try:
+            ipaddress.ip_address(host)
+            addresses, ttl = [host], self.max_ttl
+        except ValueError:
+            addresses, ttl = await self._query(host)
+        resolve_time = (time.perf_counter_ns() - start) / 1_000_000
+        return self._store(host, addresses, ttl, resolve_time)
+
+    def _store(self, host: str, addresses: List[str], ttl: float, resolve_time: float) -> ResolvedHost:
+        entry = ResolvedHost(host, addresses, min(max(ttl, self.min_ttl), self.max_ttl), resolve_time)
+        self._cache[host] = entry
+        self._cache.move_to_end(host)
+        self._evict()
+        return entry
+
+    async def _query(self, host: str) -> Tuple[List[str], float]:
+        for server in self.nameservers:
+            try:
+                return await self._query_server(server, host)
+            except (DNSError, OSError, asyncio.TimeoutError) as e:
+                logger.debug(f"DNS query to {server} for {host} failed: {e}")
+
+        loop = asyncio.get_running_loop()
+        try:
+            infos = await loop.getaddrinfo(host, None, family=socket.AF_INET, type=socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise DNSError(f"DNS resolution failed for {host}: {e}")
+        return list(dict.fromkeys(info[4][0] for info in infos)), self.default_ttl
+
+    async def _query_server(self, server: str, host: str) -> Tuple[List[str], int]:
+        loop = asyncio.get_running_loop()
+        query_id = random.getrandbits(16)
+        future = loop.create_future()
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: _DNSProtocol(future), remote_addr=(server, 53)
+        )
+        try:
+            transport.sendto(build_query(query_id, host))
+            data = await asyncio.wait_for(future, self.timeout)
+        finally:
+            transport.close()
+        return parse_response(data, query_id)
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        expired = [h for h, e in self._cache.items() if e.expired(now)] if len(self._cache) > self.max_entries else []
+        for host in expired:
+            del self._cache[host]
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
@@ -0,0 +1,79 @@
+"""结果存储模块 - 带版本号的测试结果，支持增量查询与排序结果缓存"""
+
+import gzip
+import json
+import threading
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from .resultset import ResultSet, ResultView
+
+
+class ResultStore:
+    """线程安全的版本化结果存储
+
+    每次写入都会让全局版本号加一，并记录该条结果的版本号；客户端带上上次拿到的
+    版本号（cursor）即可只取回变化的条目。清空（新一轮测试）也会推进版本号，
+    早于清空时刻的cursor会收到完整结果并带 reset 标记。
+    结果以列式 ResultSet 保存，只在返回给API时转换为字典。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._results = ResultSet()
+        # 行号 -> 该行最后一次写入时的版本号
+        self._versions = array("q")
+        self.version = 0
+        self._reset_version = 0
+        # (版本号, 按评分排序的视图, JSON字节, gzip字节)
+        self._sorted_cache: Optional[Tuple[int, ResultView, bytes, bytes]] = None
+
+    def reset(self) -> None:
+        """清空所有结果（开始新一轮测试）"""
+        with self._lock:
+            # 换新的结果集而不是清空，已缓存的排序视图仍指向旧结果集
+            self._results = ResultSet()
+            self._versions = array("q")
+            self.version += 1
+            self._reset_version = self.version
+
+    def update(self, result: Dict[str, Any]) -> int:
+        """写入一条结果，返回新的版本号"""
+        with self._lock:
+            self.version += 1
+            row = self._results.add(result)
+            if row == len(self._versions):
+                self._versions.append(self.version)
+            else:
+                self._versions[row] = self.version
+            return self.version
+
+    def values(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return self._results.to_dicts()
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def changes_since(self, cursor: int) -> Tuple[List[Dict[str, Any]], int, bool]:
+        """返回 (cursor之后变化的结果, 当前版本号, 是否为完整重置)"""
+        with self._lock:
+            if cursor < self._reset_version or cursor > self.version:
+                return self._results.to_dicts(), self.version, True
+            changed = [
+                self._results.to_dict(row)
+                for row, version in enumerate(self._versions)
+                if version > cursor
+            ]
+            return changed, self.version, False
+
+    def sorted_results(self) -> Tuple[int, ResultView, bytes, bytes]:
+        """按评分排序的结果及其预先序列化/压缩的JSON，版本不变时直接复用缓存"""
+        with self._lock:
+            cache = self._sorted_cache
+            if cache is not None and cache[0] == self.version:
+                return cache
+            view = self._results.sort_by("score", reverse=True, default=0)
+            body = json.dumps(view.to_dicts(), ensure_ascii=False).encode("utf-8")
+            self._sorted_cache = (self.version, view, body, gzip.compress(body, compresslevel=6))
+            return self._sorted_cache
@@ -0,0 +1,302 @@
+"""结果集模块 - 列式（struct-of-arrays）存储测试结果
+
+每个字段一列：数值字段存在 array 中（每个值8字节，而不是一个float对象加一个字典槽位），
+字符串字段存为驻留（intern）后的字符串列表，同一区域、位置、状态只保存一份。
+不在固定字段中的少见字段（如 error、pruned_round）按行存入稀疏字典。
+
+ResultView 只保存行号，排序、取前N名、筛选都不复制结果；ResultRow 按行号读取，
+支持 row["latency"] / row.get() 等字典式访问。只有在API边界调用 to_dict()/to_dicts()
+时才构造与原来相同的结果字典。
+"""
+
+import math
+import sys
+from array import array
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
+
+STRING_FIELDS = ("name", "endpoint", "region", "location", "service", "status")
+
+FLOAT_FIELDS = (
+    "dns_time", "latency", "min_latency", "max_latency", "jitter", "packet_loss",
+    "connection_time", "tcp_time", "tls_time", "ttfb", "queue_wait",
+    "latency_p50", "latency_p90", "latency_p99",
+    "connection_p50", "connection_p90", "connection_p99", "tail_jitter",
+    "score", "loop_lag", "loop_lag_max", "executor_wait"
+)
+
+INT_FIELDS = ("probes_sent",)
+
+BOOL_FIELDS = ("suspect",)
+
+FIELDS = STRING_FIELDS + FLOAT_FIELDS + INT_FIELDS + BOOL_FIELDS
+
+# 缺失值：浮点列用NaN，整数列用最小值，布尔列用-1
+MISSING_INT = -(2 ** 63)
+MISSING_BOOL = -1
+
+# 字段不存在的标记（区别于值为None）
+_ABSENT = object()
+
+_KIND = {field: kind for kind, fields in (
+    ("str", STRING_FIELDS), ("float", FLOAT_FIELDS), ("int", INT_FIELDS), ("bool", BOOL_FIELDS)
+) for field in fields}
+
+
+def _store(kind: str, value: Any):
+    """把字段值转换为列中的存储形式，无法按列存储时返回None"""
+    if kind == "float":
+        if value is None:
+            return math.nan
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return float(value)
+    elif kind == "str":
+        if value is None or isinstance(value, str):
+            return None if value is None else sys.intern(value)
+    elif kind == "int":
+        if value is None:
+            return MISSING_INT
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+    elif isinstance(value, bool) or value is None:
+        return MISSING_BOOL if value is None else int(value)
+    return None
+
+
+class ResultSet:
+    """列式结果集，按服务器名称去重（同名结果覆盖原来的行）"""
+
+    def __init__(self, results: Iterable[Mapping[str, Any]] = ()):
+        self._columns: Dict[str, Any] = {}
+        for field in STRING_FIELDS:
+            self._columns[field] = []
+        for field in FLOAT_FIELDS:
+            self._columns[field] = array("d")
+        for field in INT_FIELDS:
+            self._columns[field] = array("q")
+        for field in BOOL_FIELDS:
+            self._columns[field] = array("b")
+        # 行号 -> 该行的其他字段（以及无法按列类型存储的值）
+        self._extras: Dict[int, Dict[str, Any]] = {}
+        self._rows: Dict[str, int] = {}
+        self._size = 0
+        for result in results:
+            self.add(result)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    def __iter__(self) -> Iterator["ResultRow"]:
+        return (ResultRow(self, i) for i in range(self._size))
+
+    def __getitem__(self, i: int) -> "ResultRow":
+        if not -self._size <= i < self._size:
+            raise IndexError("result index out of range")
+        return ResultRow(self, i % self._size)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._rows
+
+    def add(self, result: Mapping[str, Any]) -> int:
+        """写入一条结果（字典或ResultRow），返回其行号"""
+        if isinstance(result, ResultRow):
+            result = result.to_dict()
+        name = result.get("name")
+        row = self._rows.get(name)
+        append = row is None
+        if append:
+            row = self._size
+            if name is not None:
+                self._rows[name] = row
+            self._size += 1
+        else:
+            self._extras.pop(row, None)
+        extras = {}
+        for field, column in self._columns.items():
+            kind = _KIND[field]
+            value = result.get(field)
+            stored = _store(kind, value)
+            if stored is None and kind != "str":
+                # 类型不符的值放入稀疏字典，列中记为缺失
+                extras[field] = value
+                stored = math.nan if kind == "float" else (MISSING_INT if kind == "int" else MISSING_BOOL)
+            elif stored is None and value is not None:
+                extras[field] = value
+            elif value is None and field in result:
+                # 显式的None保留键，转换回字典时原样输出
+                extras[field] = None
+            if append:
+                column.append(stored)
+            else:
+                column[row] = stored
+        for key, value in result.items():
+            if key not in _KIND:
+                extras[key] = value
+        if extras:
+            self._extras[row] = extras
+        return row
+
+    def extend(self, results: Iterable[Mapping[str, Any]]) -> None:
+        for result in results:
+            self.add(result)
+
+    def clear(self) -> None:
+        for column in self._columns.values():
+            del column[:]
+        self._extras.clear()
+        self._rows.clear()
+        self._size = 0
+
+    def row_of(self, name: str) -> Optional[int]:
+        """某服务器所在的行号"""
+        return self._rows.get(name)
+
+    def column(self, field: str) -> Sequence[Any]:
+        """某字段的整列（直接返回底层存储，不复制；缺失值为NaN/最小整数/-1/None）"""
+        return self._columns[field]
+
+    def value(self, field: str, row: int, default: Any = None) -> Any:
+        """读取一个字段值，缺失时返回default"""
+        column = self._columns.get(field)
+        if column is None:
+            return self._extras.get(row, {}).get(field, default)
+        value = column[row]
+        kind = _KIND[field]
+        if kind == "str":
+            if value is None:
+                return self._extras.get(row, {}).get(field, default)
+            return value
+        if kind == "float":
+            missing = value != value
+        elif kind == "int":
+            missing = value == MISSING_INT
+        else:
+            missing = value == MISSING_BOOL
+            value = bool(value)
+        if missing:
+            return self._extras.get(row, {}).get(field, default)
+        return value
+
+    def to_dict(self, row: int) -> Dict[str, Any]:
+        """转换为原来的结果字典（只含该行存在的字段）"""
+        result = {}
+        for field in FIELDS:
+            value = self.value(field, row, _ABSENT)
+            if value is not _ABSENT:
+                result[field] = value
+        extras = self._extras.get(row)
+        if extras:
+            for key, value in extras.items():
+                result.setdefault(key, value)
+        return result
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return [self.to_dict(i) for i in range(self._size)]
+
+    def view(self) -> "ResultView":
+        """包含所有行的视图"""
+        return ResultView(self, array("l", range(self._size)))
+
+    def sort_by(self, field: str, reverse: bool = False, default: Any = 0) -> "ResultView":
+        return self.view().sort_by(field, reverse, default)
+
+    def fields(self) -> List[str]:
+        """至少一行中存在的字段（按固定字段顺序，其次为其他字段的出现顺序）"""
+        present = [f for f in FIELDS if any(self.value(f, i, _ABSENT) is not _ABSENT for i in range(self._size))]
+        for extras in self._extras.values():
+            for key in extras:
+                if key not in present:
+                    present.append(key)
+        return present
+
+
+class ResultRow:
+    """结果集中的一行，按行号读取各列，支持字典式只读访问"""
+
+    __slots__ = ("_set", "_row")
+
+    def __init__(self, result_set: ResultSet, row: int):
+        self._set = result_set
+        self._row = row
+
+    @property
+    def index(self) -> int:
+        return self._row
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._set.value(key, self._row, _ABSENT)
+        if value is _ABSENT:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._set.value(key, self._row, default)
+
+    def __contains__(self, key: str) -> bool:
+        return self._set.value(key, self._row, _ABSENT) is not _ABSENT
+
+    def keys(self) -> List[str]:
+        return list(self.to_dict())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._set.to_dict(self._row)
+
+    def __repr__(self) -> str:
+        return f"ResultRow({self.to_dict()!r})"
+
+
+class ResultView:
+    """结果集的行号视图：排序、取前N名、筛选只操作行号数组"""
+
+    __slots__ = ("_set", "_rows")
+
+    def __init__(self, result_set: ResultSet, rows: array):
+        self._set = result_set
+        self._rows = rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __bool__(self) -> bool:
+        return len(self._rows) > 0
+
+    def __iter__(self) -> Iterator[ResultRow]:
+        result_set = self._set
+        return (ResultRow(result_set, i) for i in self._rows)
+
+    def __getitem__(self, i: int) -> ResultRow:
+        return ResultRow(self._set, self._rows[i])
+
+    def sort_by(self, field: str, reverse: bool = False, default: Any = 0) -> "ResultView":
+        """按某字段排序（缺失值按default参与排序），排序稳定"""
+        column = self._set.column(field)
+        kind = _KIND.get(field)
+        if kind == "float":
+            def key(i):
+                value = column[i]
+                return default if value != value else value
+        else:
+            value = self._set.value
+
+            def key(i):
+                return value(field, i, default)
+        return ResultView(self._set, array("l", sorted(self._rows, key=key, reverse=reverse)))
+
+    def top(self, n: int) -> "ResultView":
+        return ResultView(self._set, self._rows[:n])
+
+    def where(self, field: str, values: Iterable[Any]) -> "ResultView":
+        """只保留某字段取值在values中的行"""
+        wanted = set(values)
+        value = self._set.value
+        return ResultView(self._set, array("l", (i for i in self._rows if value(field, i) in wanted)))
+
+    def filter(self, predicate: Callable[[ResultRow], bool]) -> "ResultView":
+        result_set = self._set
+        return ResultView(result_set, array("l", (i for i in self._rows if predicate(ResultRow(result_set, i)))))
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        to_dict = self._set.to_dict
+        return [to_dict(i) for i in self._rows]
@@ -0,0 +1,238 @@
+"""时间序列汇总模块 - 按1分钟/1小时/1天增量维护各区域、各服务、各指标的聚合值"""
+
+import json
+import math
+import threading
+import time
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+from .history import DEFAULT_SERVICE
+from .stats import QuantileSketch
+
+logger = logging.getLogger(__name__)
+
+# 分辨率名称 -> (桶宽度秒数, 保留的桶数)
+RESOLUTIONS: Dict[str, Tuple[int, int]] = {
+    "1m": (60, 24 * 60),          # 保留1天
+    "1h": (3600, 90 * 24),        # 保留90天
+    "1d": (86400, 5 * 365),       # 保留5年
+}
+
+ROLLUP_METRICS = ("latency", "jitter", "connection_time", "ttfb", "score")
+
+
+class Aggregate:
+    """一个时间桶内某指标的聚合：计数、最值、均值、分位数sketch与丢包总数"""
+
+    __slots__ = ("count", "min", "max", "total", "sketch", "probes_sent", "probes_lost", "failures")
+
+    def __init__(self):
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.total = 0.0
+        self.sketch = QuantileSketch()
+        self.probes_sent = 0
+        self.probes_lost = 0
+        # 该指标为超时/失败（999）的结果数
+        self.failures = 0
+
+    def add(self, value: Optional[float], probes_sent: int, probes_lost: int) -> None:
+        self.probes_sent += probes_sent
+        self.probes_lost += probes_lost
+        if value is None or value >= 999:
+            self.failures += 1
+            return
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.sketch.add(value)
+
+    def merge(self, other: "Aggregate") -> None:
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+        self.probes_sent += other.probes_sent
+        self.probes_lost += other.probes_lost
+        self.failures += other.failures
+
+    def to_point(self, bucket: float) -> Dict[str, Any]:
+        """转换为图表使用的数据点"""
+        def q(p):
+            value = self.sketch.quantile(p)
+            return round(value, 3) if value is not None else None
+        return {
+            "ts": bucket,
+            "count": self.count,
+            "failures": self.failures,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "mean": round(self.total / self.count, 3) if self.count else None,
+            "p50": q(0.5),
+            "p95": q(0.95),
+            "p99": q(0.99),
+            "packet_loss": round(self.probes_lost / self.probes_sent * 100, 2) if self.probes_sent else None
+        }
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "count": self.count,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "total": self.total,
+            "sketch": self.sketch.to_dict(),
+            "probes_sent": self.probes_sent,
+            "probes_lost": self.probes_lost,
+            "failures": self.failures
+        }, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, data: str) -> "Aggregate":
+        d = json.loads(data)
+        agg = cls()
+        agg.count = d["count"]
+        if agg.count:
+            agg.min = d["min"]
+            agg.max = d["max"]
+        agg.total = d["total"]
+        agg.sketch = QuantileSketch.from_dict(d["sketch"])
+        agg.probes_sent = d["probes_sent"]
+        agg.probes_lost = d["probes_lost"]
+        agg.failures = d["failures"]
+        return agg
+
+
+class RollupEngine:
+    """增量汇总引擎
+
+    每个结果到达时更新所有分辨率下对应时间桶的聚合，超出保留期的桶被淘汰；
+    区间查询自动选择使返回点数不超过 max_points 的最细分辨率，
+    因此查询成本只与点数有关，与历史长度无关。
+    同一区域的不同服务（如对象存储、计算）各自是一个序列，查询时不指定服务则合并。
+    """
+
+    def __init__(self, max_points: int = 500):
+        self.max_points = max_points
+        self._lock = threading.Lock()
+        # (分辨率, 区域, 服务, 指标) -> {桶起始时间: Aggregate}，按时间顺序插入
+        self._series: Dict[Tuple[str, str, str, str], Dict[float, Aggregate]] = {}
+        # 自上次持久化以来有变化的桶
+        self._dirty: set = set()
+
+    def add(self, result: Dict[str, Any], timestamp: Optional[float] = None) -> None:
+        """加入一个测试结果"""
+        timestamp = timestamp or time.time()
+        region = result.get("region")
+        if not region:
+            return
+        service = result.get("service") or DEFAULT_SERVICE
+        sent = result.get("probes_sent", 0) or 0
+        lost = round(sent * (result.get("packet_loss", 0) or 0) / 100)
+
+        with self._lock:
+            for resolution, (width, retention) in RESOLUTIONS.items():
+                bucket = timestamp - timestamp % width
+                for metric in ROLLUP_METRICS:
+                    key = (resolution, region, service, metric)
+                    buckets = self._series.setdefault(key, {})
+                    agg = buckets.get(bucket)
+                    if agg is None:
+                        agg = buckets[bucket] = Aggregate()
+                        self._evict(key, buckets, bucket - width * retention)
+                    agg.add(result.get(metric), sent, lost)
+                    self._dirty.add((key, bucket))
+
+    def _evict(self, key, buckets: Dict[float, Aggregate], cutoff: float) -> None:
+        while buckets:
+            oldest = next(iter(buckets))
+            if oldest >= cutoff:
+                break
+            del buckets[oldest]
+            self._dirty.discard((key, oldest))
+
+    def choose_resolution(self, start: float, end: float) -> str:
+        """选择使点数不超过 max_points 的最细分辨率"""
+        for resolution, (width, _) in RESOLUTIONS.items():
+            if (end - start) / width <= self.max_points:
+                return resolution
+        return list(RESOLUTIONS)[-1]
+
+    def services(self, region: str) -> List[str]:
+        """某区域有数据的服务"""
+        with self._lock:
+            return sorted({key[2] for key in self._series if key[1] == region})
+
+    def query(self, region: str, metric: str, start: float, end: float,
+              resolution: Optional[str] = None, service: Optional[str] = None) -> Dict[str, Any]:
+        """返回区间内的聚合数据点
+
+        service为None时合并该区域所有服务的序列。
+        指定的分辨率在该区间内超过 max_points 个桶时，只返回最新的 max_points 个桶
+        （truncated 为true），最新的数据总是包含在内。
+        """
+        if metric not in ROLLUP_METRICS:
+            raise ValueError(f"unknown metric: {metric}")
+        if resolution is None or resolution == "auto":
+            resolution = self.choose_resolution(start, end)
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"unknown resolution: {resolution}")
+        width = RESOLUTIONS[resolution][0]
+        truncated = end - start > self.max_points * width
+        if truncated:
+            start = end - self.max_points * width
+
+        points = []
+        with self._lock:
+            if service is None:
+                series = [
+                    buckets for (res, reg, _, met), buckets in self._series.items()
+                    if res == resolution and reg == region and met == metric
+                ]
+            else:
+                series = [self._series.get((resolution, region, service, metric), {})]
+            bucket = start - start % width
+            # 最多遍历 max_points+1 个桶（区间两端可能各落在半个桶内），与已有历史长度无关
+            for _ in range(self.max_points + 1):
+                if bucket > end:
+                    break
+                aggs = [buckets[bucket] for buckets in series if bucket in buckets]
+                if len(aggs) == 1:
+                    points.append(aggs[0].to_point(bucket))
+                elif aggs:
+                    merged = Aggregate()
+                    for agg in aggs:
+                        merged.merge(agg)
+                    points.append(merged.to_point(bucket))
+                bucket += width
+        return {"region": region, "service": service, "metric": metric, "resolution": resolution,
+                "truncated": truncated, "points": points}
+
+    def persist(self, history) -> int:
+        """把有变化的桶写入历史库（由历史库后台线程批量写入），返回写入的桶数"""
+        with self._lock:
+            rows = [
+                key + (bucket, self._series[key][bucket].to_json())
+                for key, bucket in self._dirty
+                if bucket in self._series.get(key, {})
+            ]
+            self._dirty.clear()
+        if rows:
+            history.save_rollups(rows)
+        return len(rows)
+
+    def load(self, history) -> int:
+        """启动时从历史库加载保留期内的汇总数据"""
+        now = time.time()
+        loaded = 0
+        with self._lock:
+            for resolution, (width, retention) in RESOLUTIONS.items():
+                for _, region, service, metric, bucket, data in history.load_rollups(
+                        resolution, now - width * retention):
+                    key = (resolution, region, service, metric)
+                    self._series.setdefault(key, {})[bucket] = Aggregate.from_json(data)
+                    loaded += 1
+        return loaded
@@ -0,0 +1,106 @@
+"""探测调度模块 - 全局/分类型并发限制、按目标限速与排队等待统计"""
+
+import asyncio
+import time
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+
+class ProbeSlot:
+    """一次获得的探测名额，记录排队等待时间"""
+
+    __slots__ = ("kind", "destination", "queue_wait")
+
+    def __init__(self, kind: str, destination: str, queue_wait: float):
+        self.kind = kind
+        self.destination = destination
+        # 从申请到真正开始探测的时间（毫秒），不应计入网络延迟
+        self.queue_wait = queue_wait
+
+
+class ProbeScheduler:
+    """有界探测调度器
+
+    - max_concurrency: 全局同时进行的探测数上限
+    - limits: 每种探测类型（如 "ping"、"https"）的并发上限
+    - per_destination_interval: 同一目标两次探测开始之间的最小间隔（秒），0表示不限速
+    """
+
+    def __init__(self, max_concurrency: int, limits: Optional[Dict[str, int]] = None,
+                 per_destination_interval: float = 0.0):
+        self.max_concurrency = max_concurrency
+        self.limits = dict(limits or {})
+        self.per_destination_interval = per_destination_interval
+        self._global: Optional[asyncio.Semaphore] = None
+        self._kinds: Dict[str, asyncio.Semaphore] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._next_start: Dict[str, float] = {}
+        self.waiting = 0
+        self.active = 0
+        self.total_queue_wait = 0.0
+
+    def _bind_loop(self) -> None:
+        # 信号量与事件循环绑定，换循环（如Flask每次测试新建循环）时重新创建
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._global = asyncio.Semaphore(self.max_concurrency)
+            self._kinds = {kind: asyncio.Semaphore(n) for kind, n in self.limits.items()}
+            self._next_start.clear()
+            self.waiting = 0
+            self.active = 0
+
+    async def _wait_destination(self, destination: str) -> None:
+        if not self.per_destination_interval:
+            return
+        now = time.monotonic()
+        start_at = max(now, self._next_start.get(destination, 0.0))
+        self._next_start[destination] = start_at + self.per_destination_interval
+        if len(self._next_start) > 4096:
+            self._next_start = {d: t for d, t in self._next_start.items() if t > now}
+        if start_at > now:
+            await asyncio.sleep(start_at - now)
+
+    @asynccontextmanager
+    async def slot(self, kind: str, destination: str) -> AsyncIterator[ProbeSlot]:
+        """获取一个探测名额，等待时间记录在 ProbeSlot.queue_wait 中"""
+        self._bind_loop()
+        kind_sem = self._kinds.get(kind)
+        start = time.perf_counter_ns()
+        self.waiting += 1
+        acquired_kind = acquired_global = False
+        try:
+            await self._wait_destination(destination)
+            if kind_sem is not None:
+                await kind_sem.acquire()
+                acquired_kind = True
+            await self._global.acquire()
+            acquired_global = True
+        except BaseException:
+            if acquired_kind:
+                kind_sem.release()
+            raise
+        finally:
+            self.waiting -= 1
+
+        queue_wait = (time.perf_counter_ns() - start) / 1_000_000
+        self.total_queue_wait += queue_wait
+        self.active += 1
+        try:
+            yield ProbeSlot(kind, destination, queue_wait)
+        finally:
+            self.active -= 1
+            if acquired_global:
+                self._global.release()
+            if acquired_kind:
+                kind_sem.release()
+
+    def get_status(self) -> Dict[str, float]:
+        return {
+            "queued": self.waiting,
+            "active": self.active,
+            "total_queue_wait": round(self.total_queue_wait, 3)
+        }
@@ -0,0 +1,228 @@
+"""评分模块 - 分段评分规则与批量（列式）评分
+
+每个指标按一组分段规则打分：低于第一个上限得第一档分数，依此类推；超过最后一个
+上限后按 max(0, base - (x - start) / divisor) 线性递减。综合评分是各指标分数的加权和。
+
+score() 给单个结果打分；score_columns()/score_results() 对整列数据一次算出所有评分，
+安装了numpy时完全向量化，否则用 array 和 bisect 逐个计算（结果相同）。
+rescore_history() 按新的权重或规则分块读取历史库并重新评分，用于比较不同的评分方案。
+"""
+
+from array import array
+from bisect import bisect_right
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
+
+from .config import SCORE_WEIGHTS
+
+try:
+    import numpy as np
+except ImportError:  # numpy为可选依赖
+    np = None
+
+# 指标 -> (分段: ((上限, 分数), ...), 尾段: (base, start, divisor))
+DEFAULT_RULES: Dict[str, Tuple[Tuple[Tuple[float, float], ...], Tuple[float, float, float]]] = {
+    "latency": (((50, 100), (100, 90), (200, 70), (300, 50)), (30, 300, 10)),
+    "packet_loss": ((), (100, 0, 0.5)),
+    "connection": (((100, 100), (200, 80), (500, 60)), (40, 500, 20)),
+    "ttfb": (((100, 100), (200, 80), (500, 60)), (40, 500, 20)),
+    "jitter": (((5, 100), (10, 80), (20, 60)), (40, 0, 1)),
+}
+
+SCORE_FIELDS = tuple(DEFAULT_RULES)
+
+# 结果中缺少某指标时的取值（与测试失败时的取值一致）
+MISSING_VALUES = {"latency": 999, "packet_loss": 100, "connection_time": 999, "jitter": 999}
+
+# 参与评分的状态，其余状态（error，以及top-K模式中没有HTTPS数据的pruned）评分为0
+SCORED_STATUSES = ("completed",)
+
+# 批量评分读取的结果列
+RESULT_COLUMNS = ("status", "latency", "packet_loss", "connection_time", "tcp_time", "tls_time", "ttfb", "jitter")
+
+
+def handshake_time(result: Mapping[str, Any]) -> float:
+    """连接评分使用的时间：有分阶段数据时只计TCP+TLS握手，即网络部分"""
+    tcp_time, tls_time = result.get("tcp_time"), result.get("tls_time")
+    if tcp_time is not None and tls_time is not None:
+        return tcp_time + tls_time
+    return _value(result, "connection_time")
+
+
+def _value(result: Mapping[str, Any], key: str) -> float:
+    value = result.get(key)
+    return MISSING_VALUES[key] if value is None else value
+
+
+class ScoringModel:
+    """评分方案：各指标的分段规则与权重"""
+
+    def __init__(self, weights: Optional[Mapping[str, float]] = None,
+                 rules: Optional[Mapping[str, Any]] = None):
+        self.weights = dict(SCORE_WEIGHTS if weights is None else weights)
+        self.rules = dict(DEFAULT_RULES)
+        if rules:
+            self.rules.update(rules)
+        unknown = (set(self.weights) | set(self.rules)) - set(SCORE_FIELDS)
+        if unknown:
+            raise ValueError(f"unknown score fields: {', '.join(sorted(unknown))}")
+        missing = set(SCORE_FIELDS) - set(self.weights)
+        if missing:
+            raise ValueError(f"missing score weights: {', '.join(sorted(missing))}")
+        # 预先拆成有序的上限与分数，单个评分用bisect查找分段
+        self._bounds = {field: [b for b, _ in self.rules[field][0]] for field in SCORE_FIELDS}
+        self._levels = {field: [s for _, s in self.rules[field][0]] for field in SCORE_FIELDS}
+
+    def with_weights(self, **weights: float) -> "ScoringModel":
+        """返回只替换部分权重的新方案"""
+        return ScoringModel(dict(self.weights, **weights), self.rules)
+
+    def _field_score(self, field: str, x: float) -> float:
+        i = bisect_right(self._bounds[field], x)
+        if i < len(self._bounds[field]):
+            return self._levels[field][i]
+        base, start, divisor = self.rules[field][1]
+        return max(0, base - (x - start) / divisor)
+
+    def score(self, result: Mapping[str, Any]) -> float:
+        """计算单个结果的综合评分"""
+        connection_time = _value(result, "connection_time")
+        ttfb = result.get("ttfb")
+        values = {
+            "latency": _value(result, "latency"),
+            "packet_loss": _value(result, "packet_loss"),
+            "connection": handshake_time(result),
+            # 首字节时间（服务端响应速度），无分阶段数据时沿用连接时间
+            "ttfb": connection_time if ttfb is None else ttfb,
+            "jitter": _value(result, "jitter"),
+        }
+        total = sum(self._field_score(field, values[field]) * self.weights[field] for field in SCORE_FIELDS)
+        return round(total, 2)
+
+    def score_columns(self, latency: Sequence[float], packet_loss: Sequence[float],
+                      connection: Sequence[float], ttfb: Sequence[float], jitter: Sequence[float]):
+        """对等长的列批量评分，返回评分列（有numpy时为ndarray，否则为array('d')）
+
+        connection 为握手时间（见 handshake_time），各列不能含None。
+        """
+        columns = {"latency": latency, "packet_loss": packet_loss, "connection": connection,
+                   "ttfb": ttfb, "jitter": jitter}
+        if np is not None:
+            total = None
+            for field in SCORE_FIELDS:
+                x = np.asarray(columns[field], dtype=np.float64)
+                (steps, (base, start, divisor)) = self.rules[field]
+                scores = np.maximum(0.0, base - (x - start) / divisor)
+                if steps:
+                    bounds = np.array([b for b, _ in steps], dtype=np.float64)
+                    levels = np.array([s for _, s in steps] + [0.0], dtype=np.float64)
+                    index = np.searchsorted(bounds, x, side="right")
+                    scores = np.where(index < len(steps), levels[index], scores)
+                weighted = scores * self.weights[field]
+                total = weighted if total is None else total + weighted
+            rounded = np.round(total, 2)
+            # np.round 先乘100再取整，恰在 .xx5 附近时与 round() 结果可能差0.01，这些少数值逐个修正
+            scaled = total * 100
+            for i in np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6):
+                rounded[i] = round(float(total[i]), 2)
+            return rounded
+        total = [0.0] * len(latency)
+        for field in SCORE_FIELDS:
+            bounds, levels, weight = self._bounds[field], self._levels[field], self.weights[field]
+            base, start, divisor = self.rules[field][1]
+            steps = len(bounds)
+            for i, x in enumerate(columns[field]):
+                j = bisect_right(bounds, x) if steps else 0
+                if j < steps:
+                    total[i] += levels[j] * weight
+                else:
+                    total[i] += max(0, base - (x - start) / divisor) * weight
+        return array("d", (round(value, 2) for value in total))
+
+    def score_results(self, columns: Mapping[str, Sequence[Any]]):
+        """对结果列（与结果字典同名的字段，可含None）批量评分
+
+        columns 需包含 latency、packet_loss、connection_time、jitter 与 status，
+        可选 tcp_time、tls_time、ttfb；状态不是 completed 的结果评分为0。
+        """
+        inputs = prepare_columns(columns)
+        scores = self.score_columns(**inputs)
+        status = columns["status"]
+        if np is not None:
+            return np.where(np.isin(np.asarray(status, dtype=object), SCORED_STATUSES), scores, 0.0)
+        for i, value in enumerate(status):
+            if value not in SCORED_STATUSES:
+                scores[i] = 0
+        return scores
+
+
+def prepare_columns(columns: Mapping[str, Sequence[Any]]) -> Dict[str, Any]:
+    """把结果列转换为 score_columns 的五个输入列（补缺省值、计算握手时间）"""
+    n = len(columns["status"])
+    none = [None] * n
+    tcp, tls, ttfb = (columns.get(key, none) for key in ("tcp_time", "tls_time", "ttfb"))
+    if np is not None:
+        def column(key):
+            x = np.asarray(columns[key], dtype=np.float64)
+            return np.where(np.isnan(x), MISSING_VALUES[key], x)
+        connection_time = column("connection_time")
+        tcp = np.asarray(tcp, dtype=np.float64)
+        tls = np.asarray(tls, dtype=np.float64)
+        ttfb = np.asarray(ttfb, dtype=np.float64)
+        handshake = tcp + tls
+        return {
+            "latency": column("latency"),
+            "packet_loss": column("packet_loss"),
+            "connection": np.where(np.isnan(handshake), connection_time, handshake),
+            "ttfb": np.where(np.isnan(ttfb), connection_time, ttfb),
+            "jitter": column("jitter"),
+        }
+
+    def column(key):
+        default = MISSING_VALUES[key]
+        return array("d", (default if x is None else x for x in columns[key]))
+    connection_time = column("connection_time")
+    return {
+        "latency": column("latency"),
+        "packet_loss": column("packet_loss"),
+        "connection": array("d", (
+            c if t is None or s is None else t + s for t, s, c in zip(tcp, tls, connection_time)
+        )),
+        "ttfb": array("d", (c if f is None else f for f, c in zip(ttfb, connection_time))),
+        "jitter": column("jitter"),
+    }
+
+
+def rescore_history(history, model: ScoringModel, region: Optional[str] = None,
+                    since: Optional[float] = None, until: Optional[float] = None,
+                    chunk_size: int = 50000) -> Dict[str, Dict[str, Any]]:
+    """按新的评分方案重新计算历史结果的评分
+
+    历史结果按列分块读取并批量评分，不逐条构造字典。
+    返回 {区域: {"count", "old_score", "new_score"}}，分别为结果数、原评分均值与新评分均值。
+    """
+    totals: Dict[str, Dict[str, Any]] = {}
+    for chunk in history.iter_columns(("region", "score") + RESULT_COLUMNS, region=region,
+                                      since=since, until=until, chunk_size=chunk_size):
+        scores = model.score_results(chunk)
+        if np is not None:
+            # 按区域分组求和（区域编码用字典完成，比对字符串数组排序快）
+            codes: Dict[str, int] = {}
+            inverse = np.fromiter((codes.setdefault(r, len(codes)) for r in chunk["region"]),
+                                  dtype=np.intp, count=len(chunk["region"]))
+            regions = list(codes)
+            old_scores = np.nan_to_num(np.asarray(chunk["score"], dtype=np.float64))
+            sums = zip(regions, np.bincount(inverse), np.bincount(inverse, old_scores),
+                       np.bincount(inverse, scores))
+        else:
+            sums = ((r, 1, old or 0, new) for r, old, new in zip(chunk["region"], chunk["score"], scores))
+        for row_region, count, old_score, new_score in sums:
+            entry = totals.get(row_region)
+            if entry is None:
+                entry = totals[row_region] = {"count": 0, "old_score": 0.0, "new_score": 0.0}
+            entry["count"] += int(count)
+            entry["old_score"] += float(old_score)
+            entry["new_score"] += float(new_score)
+    for entry in totals.values():
+        entry["old_score"] = round(entry["old_score"] / entry["count"], 2)
+        entry["new_score"] = round(entry["new_score"] / entry["count"], 2)
+    return totals
@@ -0,0 +1,239 @@
+"""分片测试模块 - 把服务器列表分给多个工作进程，各自运行事件循环与探测引擎
+
+每个工作进程独立完成 DNS、ping、HTTPS 探测与评分，结果按批次经管道送回父进程；
+父进程只负责合并结果、更新进度与回调，因此一轮测试的吞吐量随CPU核数增长。
+工作进程结束时把各端点的分位数统计随 done 消息发回，合并到父进程的 endpoint_stats。
+结果批次按字段组合分组，每组只发送一次字段名，之后每个结果是一个值元组。
+"""
+
+import asyncio
+import math
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import get_context
+from multiprocessing.connection import Connection
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 工作进程攒批发送结果：满 RESULT_BATCH 条或距上次发送超过 FLUSH_INTERVAL 秒
+RESULT_BATCH = 64
+FLUSH_INTERVAL = 0.05
+# 工作进程上报状态的间隔（秒）
+STATUS_INTERVAL = 0.5
+
+
+def split_servers(servers: Dict[str, Dict[str, Any]], shards: int) -> List[Dict[str, Dict[str, Any]]]:
+    """按轮转方式把服务器均匀分到 shards 个分片（保持各分片的区域分布相近）"""
+    parts: List[Dict[str, Dict[str, Any]]] = [{} for _ in range(shards)]
+    for i, (name, info) in enumerate(servers.items()):
+        parts[i % shards][name] = info
+    return [p for p in parts if p]
+
+
+def effective_shards(requested: int, server_count: int, min_servers: int) -> int:
+    """分片数不超过 服务器数 / 每分片最少服务器数，避免进程开销超过收益"""
+    if requested <= 1 or server_count == 0:
+        return 1
+    return max(1, min(requested, math.ceil(server_count / max(1, min_servers))))
+
+
+def pack_results(results: List[Dict[str, Any]]) -> List[Tuple[Tuple[str, ...], List[Tuple[Any, ...]]]]:
+    """把一批结果转为 [(字段名元组, [值元组, ...]), ...]，字段相同的结果共用一个字段名元组"""
+    groups: Dict[Tuple[str, ...], List[Tuple[Any, ...]]] = {}
+    for result in results:
+        fields = tuple(result)
+        groups.setdefault(fields, []).append(tuple(result.values()))
+    return list(groups.items())
+
+
+def unpack_results(batch: List[Tuple[Tuple[str, ...], List[Tuple[Any, ...]]]]) -> List[Dict[str, Any]]:
+    """pack_results 的逆操作"""
+    return [dict(zip(fields, row)) for fields, rows in batch for row in rows]
+
+
+def _worker_status(tester) -> Dict[str, Any]:
+    return {
+        "progress": tester.test_progress,
+        "total": tester.total_servers,
+        "probe_counts": dict(tester.probe_counts),
+        "probe_errors": dict(tester.probe_errors),
+        "scheduler": tester.scheduler.get_status()
+    }
+
+
+async def _run_worker(servers, conn: Connection, backend_spec, config: Dict[str, Any], scoring) -> None:
+    from .config import TEST_CONFIG
+    from .network_tester import NetworkTester
+
+    TEST_CONFIG.update(config)
+    # 工作进程自己不再分片（父进程的 shards 配置只用于拆分）
+    TEST_CONFIG["shards"] = 1
+    backend = None
+    if backend_spec is not None:
+        backend_cls, kwargs = backend_spec
+        backend = backend_cls(servers, **kwargs)
+    tester = NetworkTester(backend)
+    tester.scoring = scoring
+
+    batch: List[Dict[str, Any]] = []
+    last_flush = last_status = time.monotonic()
+
+    def flush(now: float) -> None:
+        nonlocal last_flush, last_status
+        if batch:
+            conn.send(("results", pack_results(batch)))
+            batch.clear()
+        if now - last_status >= STATUS_INTERVAL:
+            conn.send(("status", _worker_status(tester)))
+            last_status = now
+        last_flush = now
+
+    async def ticker():
+        # 结果稀疏时也按时发送，保证父进程的进度及时更新
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            flush(time.monotonic())
+
+    tick = asyncio.ensure_future(ticker())
+    try:
+        async for result in tester.iter_results(servers):
+            batch.append(result)
+            now = time.monotonic()
+            if len(batch) >= RESULT_BATCH or now - last_flush >= FLUSH_INTERVAL:
+                flush(now)
+    finally:
+        tick.cancel()
+    flush(time.monotonic())
+    conn.send(("done", dict(_worker_status(tester), endpoint_stats=tester.endpoint_stats)))
+
+
+def _worker_main(servers, conn: Connection, backend_spec, config: Dict[str, Any], scoring) -> None:
+    """工作进程入口"""
+    try:
+        asyncio.run(_run_worker(servers, conn, backend_spec, config, scoring))
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        logger.error(f"Shard worker failed: {e}")
+        try:
+            conn.send(("error", str(e)))
+        except OSError:
+            pass
+    finally:
+        conn.close()
+
+
+class ShardedSweep:
+    """在多个工作进程中运行一轮测试，并把结果与状态合并回父进程的 NetworkTester"""
+
+    def __init__(self, tester, shards: int):
+        self.tester = tester
+        self.shards = shards
+        # 分片序号 -> 该工作进程最近上报的状态
+        self.status: Dict[int, Dict[str, Any]] = {}
+
+    def _merge_counters(self, index: int, status: Dict[str, Any]) -> None:
+        # 工作进程上报的是累计值，按与上次上报的差值累加到父进程的计数器
+        previous = self.status.get(index, {})
+        for key in ("probe_counts", "probe_errors"):
+            target = getattr(self.tester, key)
+            before = previous.get(key, {})
+            for kind, value in status[key].items():
+                target[kind] = target.get(kind, 0) + value - before.get(kind, 0)
+        self.status[index] = status
+
+    def _merge_stats(self, endpoint_stats: Dict[str, Any]) -> None:
+        target = self.tester.endpoint_stats
+        for name, stats in endpoint_stats.items():
+            if name in target:
+                target[name].merge(stats)
+            else:
+                target[name] = stats
+
+    def get_status(self) -> List[Dict[str, Any]]:
+        return [
+            {"shard": i, "progress": s["progress"], "total": s["total"], "scheduler": s["scheduler"]}
+            for i, s in sorted(self.status.items())
+        ]
+
+    async def iter_results(self, servers: Dict[str, Dict[str, Any]],
+                           callback: Optional[callable] = None) -> AsyncIterator[Dict[str, Any]]:
+        from .config import TEST_CONFIG
+
+        tester = self.tester
+        parts = split_servers(servers, self.shards)
+        backend_spec = tester.backend.worker_spec()
+        config = dict(TEST_CONFIG)
+        context = get_context("spawn")
+        loop = asyncio.get_running_loop()
+        # 每个分片一个线程阻塞读取管道（Windows上管道不能注册到事件循环）
+        readers = ThreadPoolExecutor(max_workers=len(parts), thread_name_prefix="shard-reader")
+        pending: asyncio.Queue = asyncio.Queue()
+        processes: List[Tuple[Any, Connection]] = []
+        reader_tasks: List[asyncio.Future] = []
+        reported = set()
+        finished = False
+
+        async def read(index: int, conn: Connection) -> None:
+            while True:
+                try:
+                    message = await loop.run_in_executor(readers, conn.recv)
+                except (EOFError, OSError):
+                    message = ("error", "shard worker exited unexpectedly")
+                await pending.put((index, message))
+                if message[0] in ("done", "error"):
+                    return
+
+        try:
+            for index, part in enumerate(parts):
+                parent_conn, child_conn = context.Pipe(duplex=False)
+                process = context.Process(
+                    target=_worker_main, args=(part, child_conn, backend_spec, config, tester.scoring),
+                    name=f"sweep-shard-{index}", daemon=True
+                )
+                process.start()
+                child_conn.close()
+                processes.append((process, parent_conn))
+            reader_tasks.extend(asyncio.ensure_future(read(i, conn)) for i, (_, conn) in enumerate(processes))
+
+            running = len(parts)
+            while running:
+                index, (kind, payload) = await pending.get()
+                if kind == "results":
+                    for result in unpack_results(payload):
+                        reported.add(result["name"])
+                        await tester._report(result, callback)
+                        yield result
+                elif kind in ("status", "done"):
+                    endpoint_stats = payload.pop("endpoint_stats", None)
+                    if endpoint_stats:
+                        self._merge_stats(endpoint_stats)
+                    self._merge_counters(index, payload)
+                    running -= kind == "done"
+                elif kind == "error":
+                    running -= 1
+                    logger.error(f"Shard {index} failed: {payload}")
+                    # 该分片未上报的服务器按错误结果补齐，保证每个服务器都有结果
+                    for name, info in parts[index].items():
+                        if name not in reported:
+                            result = tester._error_result(name, info, f"shard worker failed: {payload}")
+                            await tester._report(result, callback)
+                            yield result
+            finished = True
+        finally:
+            # 正常结束时工作进程已发送done并自行退出；提前退出（break/取消）时直接终止
+            for process, _ in processes:
+                if not finished and process.is_alive():
+                    process.terminate()
+            # join会阻塞，放到线程池中进行，避免在事件循环线程上等待工作进程退出
+            await asyncio.gather(
+                *(loop.run_in_executor(None, process.join, 5) for process, _ in processes),
+                return_exceptions=True
+            )
+            for _, conn in processes:
+                conn.close()
+            for task in reader_tasks:
+                task.cancel()
+            readers.shutdown(wait=False)
@@ -0,0 +1,230 @@
+"""统计模块 - 原始样本存储与流式分位数估计"""
+
+import math
+import statistics
+from array import array
+from typing import Dict, Iterable, Optional, Iterator, Tuple
+
+
+class SampleBuffer:
+    """基于 array('d') 的紧凑样本存储（每个样本8字节）"""
+
+    __slots__ = ("_data",)
+
+    def __init__(self, values: Iterable[float] = ()):
+        self._data = array("d", values)
+
+    def append(self, value: float) -> None:
+        self._data.append(value)
+
+    def extend(self, values: Iterable[float]) -> None:
+        self._data.extend(values)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self) -> Iterator[float]:
+        return iter(self._data)
+
+    def __getitem__(self, index):
+        return self._data[index]
+
+    def __repr__(self) -> str:
+        return f"SampleBuffer({self._data.tolist()!r})"
+
+    def tolist(self) -> list:
+        return self._data.tolist()
+
+    def mean(self) -> float:
+        return statistics.fmean(self._data)
+
+    def stdev(self) -> float:
+        return statistics.stdev(self._data) if len(self._data) > 1 else 0.0
+
+
+class RingBuffer:
+    """固定容量的环形缓冲区（array('d')），写满后覆盖最旧的值"""
+
+    __slots__ = ("capacity", "_data", "_next", "_count")
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._data = array("d", bytes(8 * capacity))
+        self._next = 0
+        self._count = 0
+
+    def append(self, value: float) -> None:
+        self._data[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def __len__(self) -> int:
+        return self._count
+
+    def values(self) -> array:
+        """按时间顺序（旧到新）返回当前内容的副本"""
+        if self._count < self.capacity:
+            return self._data[:self._count]
+        return self._data[self._next:] + self._data[:self._next]
+
+    def latest(self) -> Optional[float]:
+        if not self._count:
+            return None
+        return self._data[self._next - 1]
+
+
+def mean_ci_half_width(samples: SampleBuffer, z: float = 1.96) -> float:
+    """样本均值置信区间的半宽（正态近似），样本少于2个时返回无穷大"""
+    n = len(samples)
+    if n < 2:
+        return math.inf
+    return z * samples.stdev() / math.sqrt(n)
+
+
+def wilson_interval(successes: int, n: int, z: float = 1.96) -> Tuple[float, float]:
+    """比例的Wilson置信区间，n为0时返回 (0, 1)"""
+    if n <= 0:
+        return 0.0, 1.0
+    p = successes / n
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def latency_converged(samples: SampleBuffer, z: float, abs_width: float, rel_width: float) -> bool:
+    """延迟均值的置信半宽是否已达到 max(abs_width, rel_width * 均值)"""
+    if len(samples) < 2:
+        return False
+    return mean_ci_half_width(samples, z) <= max(abs_width, rel_width * samples.mean())
+
+
+class QuantileSketch:
+    """可合并的流式分位数估计器（对数分桶，DDSketch思路）
+
+    每个值落入 gamma^i 的对数桶，分位数的相对误差不超过 relative_accuracy，
+    内存只与数值的动态范围有关，与样本数量无关；两个sketch可以直接合并。
+    """
+
+    __slots__ = ("relative_accuracy", "_gamma", "_log_gamma", "_min_value",
+                 "buckets", "zero_count", "count", "total", "min", "max")
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-3):
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._min_value = min_value
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, weight: int = 1) -> None:
+        """加入一个样本"""
+        if value <= self._min_value:
+            self.zero_count += weight
+        else:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.buckets[key] = self.buckets.get(key, 0) + weight
+        self.count += weight
+        self.total += value * weight
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def update(self, values: Iterable[float]) -> None:
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """合并另一个相同精度的sketch"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("cannot merge sketches with different relative accuracy")
+        for key, n in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + n
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """返回q分位数（0 <= q <= 1），无样本时返回None"""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return max(self.min, 0.0)
+        seen = self.zero_count
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                value = 2 * self._gamma ** key / (self._gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def to_dict(self) -> Dict:
+        """序列化为可JSON化的字典"""
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "buckets": {str(k): v for k, v in self.buckets.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "QuantileSketch":
+        sketch = cls(data["relative_accuracy"])
+        sketch.buckets = {int(k): v for k, v in data["buckets"].items()}
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.total = data["total"]
+        if sketch.count:
+            sketch.min = data["min"]
+            sketch.max = data["max"]
+        return sketch
+
+
+class EndpointStats:
+    """单个端点的流式统计：延迟与连接时间各一个分位数sketch"""
+
+    __slots__ = ("latency", "connection", "probes_sent", "probes_lost")
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.latency = QuantileSketch(relative_accuracy)
+        self.connection = QuantileSketch(relative_accuracy)
+        self.probes_sent = 0
+        self.probes_lost = 0
+
+    def merge(self, other: "EndpointStats") -> None:
+        """合并另一个端点统计（如分片工作进程中的统计）"""
+        self.latency.merge(other.latency)
+        self.connection.merge(other.connection)
+        self.probes_sent += other.probes_sent
+        self.probes_lost += other.probes_lost
+
+    def summary(self) -> Dict[str, float]:
+        """返回 p50/p90/p99 与尾部抖动（p99 - p50）"""
+        summary = {}
+        for prefix, sketch in (("latency", self.latency), ("connection", self.connection)):
+            for q in (50, 90, 99):
+                value = sketch.quantile(q / 100)
+                summary[f"{prefix}_p{q}"] = round(value, 3) if value is not None else 999
+        if self.latency.count:
+            summary["tail_jitter"] = round(summary["latency_p99"] - summary["latency_p50"], 3)
+        else:
+            summary["tail_jitter"] = 0
+        return summary
@@ -1,133 +1,309 @@
 """工具函数模块"""
 
-import requests
+import asyncio
+import functools
+import ipaddress
+import json
 import logging
-from typing import Optional, Dict, Any
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+import aiohttp
+
+from .config import PUBLIC_IP_CONFIG
 
 logger = logging.getLogger(__name__)
 
+# 专门的IPv4和IPv6检测API
+IPV4_APIS = (
+    "https://api.ipify.org?format=json",
+    "https://ipv4.icanhazip.com",
+    "https://ipv4.jsonip.com"
+)
 
-def get_public_ip() -> Dict[str, Any]:
-    """获取公网IP地址和位置信息"""
-    
-    # 专门的IPv4和IPv6检测API
-    ipv4_apis = [
-        "https://api.ipify.org?format=json",
-        "https://ipv4.icanhazip.com",
-        "https://ipv4.jsonip.com"
-    ]
-    
-    ipv6_apis = [
-        "https://api6.ipify.org?format=json", 
-        "https://ipv6.icanhazip.com",
-        "https://ipv6.jsonip.com"
-    ]
-    
-    # 详细信息API
-    detail_apis = [
-        {
-            "url": "http://ip-api.com/json/",
-            "parser": lambda r: {
-                "country": r.get("country", "Unknown"),
-                "city": r.get("city", "Unknown"),
-                "region": r.get("regionName", "Unknown"),
-                "isp": r.get("isp", "Unknown"),
-                "location": f"{r.get('city', 'Unknown')}, {r.get('country', 'Unknown')}"
-            }
-        },
-        {
-            "url": "https://ipapi.co/json/",
-            "parser": lambda r: {
-                "country": r.get("country_name", "Unknown"),
-                "city": r.get("city", "Unknown"),
-                "region": r.get("region", "Unknown"),
-                "isp": r.get("org", "Unknown"),
-                "location": f"{r.get('city', 'Unknown')}, {r.get('country_name', 'Unknown')}"
-            }
-        },
-        {
-            "url": "https://ipinfo.io/json",
-            "parser": lambda r: {
-                "country": r.get("country", "Unknown"),
-                "city": r.get("city", "Unknown"),
-                "region": r.get("region", "Unknown"),
-                "isp": r.get("org", "Unknown"),
-                "location": f"{r.get('city', 'Unknown')}, {r.get('country', 'Unknown')}"
-            }
+IPV6_APIS = (
+    "https://api6.ipify.org?format=json",
+    "https://ipv6.icanhazip.com",
+    "https://ipv6.jsonip.com"
+)
+
+# 详细信息API（按请求方的出口IP返回位置与运营商）
+DETAIL_APIS = (
+    {
+        "url": "http://ip-api.com/json/",
+        "parser": lambda r: {
+            "country": r.get("country", "Unknown"),
+            "city": r.get("city", "Unknown"),
+            "region": r.get("regionName", "Unknown"),
+            "isp": r.get("isp", "Unknown"),
+            "location": f"{r.get('city', 'Unknown')}, {r.get('country', 'Unknown')}"
+        }
+    },
+    {
+        "url": "https://ipapi.co/json/",
+        "parser": lambda r: {
+            "country": r.get("country_name", "Unknown"),
+            "city": r.get("city", "Unknown"),
+            "region": r.get("region", "Unknown"),
+            "isp": r.get("org", "Unknown"),
+            "location": f"{r.get('city', 'Unknown')}, {r.get('country_name', 'Unknown')}"
+        }
+    },
+    {
+        "url": "https://ipinfo.io/json",
+        "parser": lambda r: {
+            "country": r.get("country", "Unknown"),
+            "city": r.get("city", "Unknown"),
+            "region": r.get("region", "Unknown"),
+            "isp": r.get("org", "Unknown"),
+            "location": f"{r.get('city', 'Unknown')}, {r.get('country', 'Unknown')}"
         }
-    ]
-    
-    result = {
-        "ipv4": "Unknown",
-        "ipv6": "Unknown", 
-        "country": "Unknown",
-        "city": "Unknown",
-        "region": "Unknown",
-        "isp": "Unknown",
-        "location": "Unknown, Unknown"
     }
-    
-    # 获取IPv4地址
-    for api_url in ipv4_apis:
-        try:
-            response = requests.get(api_url, timeout=3)
-            if response.status_code == 200:
-                if api_url.endswith('json'):
-                    data = response.json()
-                    result["ipv4"] = data.get("ip", "Unknown")
-                else:
-                    result["ipv4"] = response.text.strip()
-                if result["ipv4"] != "Unknown":
-                    break
-        except Exception as e:
-            logger.debug(f"Failed to get IPv4 from {api_url}: {e}")
-            continue
-    
-    # 获取IPv6地址
-    for api_url in ipv6_apis:
-        try:
-            response = requests.get(api_url, timeout=3)
-            if response.status_code == 200:
-                if api_url.endswith('json'):
-                    data = response.json()
-                    result["ipv6"] = data.get("ip", "Unknown")
-                else:
-                    result["ipv6"] = response.text.strip()
-                if result["ipv6"] != "Unknown":
-                    break
-        except Exception as e:
-            logger.debug(f"Failed to get IPv6 from {api_url}: {e}")
-            continue
-    
-    # 获取详细信息（使用主要IP地址）
-    primary_ip = result["ipv4"] if result["ipv4"] != "Unknown" else result["ipv6"]
-    for api in detail_apis:
+)
+
+UNKNOWN_IP_INFO = {
+    "ipv4": "Unknown",
+    "ipv6": "Unknown",
+    "country": "Unknown",
+    "city": "Unknown",
+    "region": "Unknown",
+    "isp": "Unknown",
+    "location": "Unknown, Unknown"
+}
+
+
+async def _fetch_address(session: aiohttp.ClientSession, url: str, version: int) -> Optional[str]:
+    """从一个检测API获取本机地址，返回值不是指定版本的合法IP时视为无效"""
+    async with session.get(url) as response:
+        if response.status != 200:
+            return None
+        text = (await response.text()).strip()
+    if text.startswith("{"):
+        text = json.loads(text).get("ip", "")
+    try:
+        address = ipaddress.ip_address(text)
+    except ValueError:
+        return None
+    return str(address) if address.version == version else None
+
+
+async def _fetch_detail(session: aiohttp.ClientSession, api: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    """从一个详细信息API获取位置信息，全部字段未知时视为无效"""
+    async with session.get(api["url"]) as response:
+        if response.status != 200:
+            return None
+        data = await response.json(content_type=None)
+    if not data or not isinstance(data, dict):
+        logger.debug(f"API {api['url']} returned invalid data: {data}")
+        return None
+    detail = api["parser"](data)
+    if all(v == "Unknown" for v in detail.values()):
+        logger.debug(f"API {api['url']} returned all Unknown values")
+        return None
+    return detail
+
+
+async def _race(attempts: Iterable[Callable[[], Awaitable[Any]]], hedge_delay: float) -> Any:
+    """对冲请求：先请求第一个API，hedge_delay秒内没有结果或请求失败时加发下一个，
+    返回最先得到的有效结果（没有有效结果时返回None），其余请求随即取消"""
+    attempts = iter(attempts)
+    pending = set()
+
+    def launch() -> None:
+        attempt = next(attempts, None)
+        if attempt is not None:
+            pending.add(asyncio.ensure_future(attempt()))
+
+    launch()
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                launch()
+                continue
+            for task in done:
+                pending.discard(task)
+                error = task.exception()
+                if error is None and task.result() is not None:
+                    return task.result()
+                if error is not None:
+                    logger.debug(f"Public IP lookup failed: {type(error).__name__}: {error}")
+                launch()
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def fetch_public_ip(timeout: float = 5, hedge_delay: float = 0.5) -> Dict[str, Any]:
+    """并行获取公网IP地址和位置信息
+
+    IPv4、IPv6、详细信息三组同时查询，组内按 _race 对冲请求各API，
+    整体最多耗时约timeout秒；查询失败的字段为 "Unknown"。
+    """
+    async def first_valid(attempts):
         try:
-            response = requests.get(api["url"], timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                # 检查API是否返回了有效数据
-                if data and isinstance(data, dict):
-                    detail = api["parser"](data)
-                    # 确保至少有一些有用的信息
-                    if any(v != "Unknown" for v in detail.values()):
-                        result.update(detail)
-                        logger.debug(f"Successfully got details from {api['url']}")
-                        break
-                    else:
-                        logger.debug(f"API {api['url']} returned all Unknown values")
-                else:
-                    logger.debug(f"API {api['url']} returned invalid data: {data}")
-        except Exception as e:
-            logger.debug(f"Failed to get details from {api['url']}: {e}")
-            continue
-    
+            return await asyncio.wait_for(_race(attempts, hedge_delay), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    result = dict(UNKNOWN_IP_INFO)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    async with aiohttp.ClientSession(timeout=client_timeout) as session:
+        ipv4, ipv6, detail = await asyncio.gather(
+            first_valid(functools.partial(_fetch_address, session, url, 4) for url in IPV4_APIS),
+            first_valid(functools.partial(_fetch_address, session, url, 6) for url in IPV6_APIS),
+            first_valid(functools.partial(_fetch_detail, session, api) for api in DETAIL_APIS)
+        )
+    result["ipv4"] = ipv4 or "Unknown"
+    result["ipv6"] = ipv6 or "Unknown"
+    if detail:
+        result.update(detail)
     # 保持向后兼容性
-    result["ip"] = primary_ip
-    
+    result["ip"] = result["ipv4"] if ipv4 else result["ipv6"]
     return result
 
 
+class PublicIPCache:
+    """公网IP信息缓存
+
+    get() 只读内存；refresh() 重新查询，查不到任何IP时保留原有结果（过期结果好于没有结果）。
+    start() 启动后台线程，每 refresh_interval 秒刷新一次，使读取方始终不必等待网络请求。
+    指定 path 时查询结果同时写入该文件，fetch() 在内存中没有结果时先读文件，
+    使短时间内重复运行的CLI进程不必再次查询。
+    """
+
+    def __init__(self, ttl: float = 600, refresh_interval: float = 300,
+                 timeout: float = 5, hedge_delay: float = 0.5, path: Optional[str] = None):
+        self.path = path
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.timeout = timeout
+        self.hedge_delay = hedge_delay
+        self._lock = threading.Lock()
+        self._info: Optional[Dict[str, Any]] = None
+        self._updated = 0.0
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def get(self, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """缓存的结果（副本）；指定max_age时超过该时间（秒）的结果视为没有"""
+        with self._lock:
+            if self._info is None:
+                return None
+            if max_age is not None and time.monotonic() - self._updated > max_age:
+                return None
+            return dict(self._info)
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """等待第一次查询完成后返回缓存的结果"""
+        self._ready.wait(timeout)
+        return self.get()
+
+    async def refresh(self) -> Dict[str, Any]:
+        """重新查询并更新缓存，返回最新的缓存结果"""
+        info = await fetch_public_ip(self.timeout, self.hedge_delay)
+        with self._lock:
+            updated = info["ip"] != "Unknown" or self._info is None
+            if updated:
+                self._info = info
+                self._updated = time.monotonic()
+            self._ready.set()
+            result = dict(self._info)
+        if updated and info["ip"] != "Unknown":
+            self._save(info)
+        return result
+
+    async def fetch(self) -> Dict[str, Any]:
+        """未过期（ttl内）时返回缓存（内存或文件），否则重新查询"""
+        cached = self.get(max_age=self.ttl)
+        if cached is None and self._load():
+            cached = self.get(max_age=self.ttl)
+        if cached is not None:
+            return cached
+        return await self.refresh()
+
+    def _load(self) -> bool:
+        """从缓存文件读取上次的查询结果（内存中已有结果时不读）"""
+        if not self.path or self._info is not None:
+            return False
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            info, saved_at = data["info"], float(data["saved_at"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        with self._lock:
+            if self._info is None:
+                self._info = info
+                # 文件中记录的是墙钟时间，换算为单调时钟上的更新时间
+                self._updated = time.monotonic() - max(0.0, time.time() - saved_at)
+        return True
+
+    def _save(self, info: Dict[str, Any]) -> None:
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"info": info, "saved_at": time.time()}, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.debug(f"Cannot write public IP cache {self.path}: {e}")
+
+    def start(self) -> None:
+        """启动后台刷新线程（重复调用无效，可在多个线程中调用）"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._refresh_loop, name="public-ip-refresh", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout + 1)
+            self._thread = None
+
+    def _refresh_loop(self) -> None:
+        loop = asyncio.new_event_loop()
+        try:
+            while not self._stop.is_set():
+                try:
+                    loop.run_until_complete(self.refresh())
+                except Exception as e:
+                    logger.warning(f"Public IP refresh failed: {e}")
+                    self._ready.set()
+                self._stop.wait(self.refresh_interval)
+        finally:
+            loop.close()
+
+
+public_ip_cache = PublicIPCache(
+    ttl=PUBLIC_IP_CONFIG["ttl"],
+    refresh_interval=PUBLIC_IP_CONFIG["refresh_interval"],
+    timeout=PUBLIC_IP_CONFIG["timeout"],
+    hedge_delay=PUBLIC_IP_CONFIG["hedge_delay"],
+    path=PUBLIC_IP_CONFIG["cache_path"] or None
+)
+
+
+def get_public_ip() -> Dict[str, Any]:
+    """获取公网IP地址和位置信息（同步接口，缓存未过期时不发请求）
+
+    不能在运行中的事件循环里调用，异步代码请使用 await public_ip_cache.fetch()。
+    """
+    cached = public_ip_cache.get(max_age=public_ip_cache.ttl)
+    if cached is not None:
+        return cached
+    return asyncio.run(public_ip_cache.refresh())
+
+
 def format_latency(latency: float) -> str:
     """格式化延迟显示"""
     if latency >= 999:
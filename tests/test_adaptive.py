@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from src.backends import ProbeBackend
+from src.config import TEST_CONFIG
+from src.icmp import build_ping_result
+from src.network_tester import NetworkTester
+from src.resolver import DNSResolver
+from src.stats import wilson_interval
+
+
+class FixedBackend(ProbeBackend):
+    """每个包的RTT固定，按 lost_every 规律丢包，lost_at 中的包序号（从1开始）也丢失"""
+
+    name = "fixed"
+
+    def __init__(self, rtt=20.0, lost_every=0, lost_at=()):
+        self.resolver = DNSResolver(nameservers=[])
+        self.rtt = rtt
+        self.lost_every = lost_every
+        self.lost_at = set(lost_at)
+        self.sent = 0
+
+    async def ping(self, host, count, timeout, address=None):
+        rtts = []
+        for _ in range(count):
+            self.sent += 1
+            if self.sent not in self.lost_at and not (self.lost_every and self.sent % self.lost_every == 0):
+                rtts.append(self.rtt)
+        return build_ping_result(rtts, count)
+
+
+def run_adaptive(backend):
+    return asyncio.run(NetworkTester(backend).ping_adaptive("example.com", address="192.0.2.1"))
+
+
+def test_clean_endpoint_stops_at_min_count():
+    result = run_adaptive(FixedBackend())
+    assert result["sent"] == TEST_CONFIG["ping_min_count"]
+    assert result["packet_loss"] == 0
+
+
+def test_single_loss_extends_until_loss_bound_is_low():
+    result = run_adaptive(FixedBackend(lost_at=(2,)))
+    sent = result["sent"]
+    assert TEST_CONFIG["ping_min_count"] < sent < TEST_CONFIG["ping_max_count"]
+    z = TEST_CONFIG["confidence_z"]
+    assert wilson_interval(1, sent, z)[1] <= TEST_CONFIG["loss_upper_limit"]
+    assert wilson_interval(1, sent - TEST_CONFIG["adaptive_batch"], z)[1] > TEST_CONFIG["loss_upper_limit"]
+
+
+def test_lossy_endpoint_stops_at_max_count():
+    # 第3个包起每3个丢1个：前 ping_min_count 个包里就有丢包，丢包率上界始终高于目标
+    result = run_adaptive(FixedBackend(lost_every=3))
+    assert result["sent"] == TEST_CONFIG["ping_max_count"]
+    assert result["packet_loss"] == pytest.approx(30.0)
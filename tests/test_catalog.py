@@ -0,0 +1,81 @@
+import itertools
+
+import pytest
+
+from src.catalog import CatalogError, EndpointCatalog
+
+ENTRIES = [
+    ("tokyo", {"endpoint": "iaas.ap-tokyo-1.example.com", "region": "ap-tokyo-1", "location": "日本东京",
+               "tags": ["asia-pacific", "primary"]}),
+    ("tokyo-os", {"endpoint": "os.ap-tokyo-1.example.com", "region": "ap-tokyo-1", "location": "日本东京",
+                  "service": "objectstorage", "tags": "asia-pacific"}),
+    ("osaka", {"endpoint": "iaas.ap-osaka-1.example.com", "region": "ap-osaka-1", "location": "日本大阪",
+               "tags": ["asia-pacific"]}),
+    ("sydney-os", {"endpoint": "os.ap-sydney-1.example.com", "region": "ap-sydney-1",
+                   "location": "澳大利亚悉尼", "service": "objectstorage", "tags": ["asia-pacific"]}),
+    ("frankfurt", {"endpoint": "iaas.eu-frankfurt-1.example.com", "region": "eu-frankfurt-1",
+                   "location": "德国法兰克福", "tags": ["europe", "primary"], "port": "8443"}),
+    ("ashburn-os", {"endpoint": "os.us-ashburn-1.example.com", "region": "us-ashburn-1",
+                    "location": "美国阿什本", "service": "objectstorage", "tags": ["americas"]}),
+]
+
+
+@pytest.fixture
+def catalog():
+    return EndpointCatalog(entries=ENTRIES)
+
+
+def brute_force(catalog, regions=None, countries=None, services=None, tags=None):
+    """不用索引，逐条检查的参考实现"""
+    names = [name for name, _ in ENTRIES]
+    selected = []
+    for name in names:
+        entry = catalog.get(name)
+        if regions and not (name in regions or any(
+                entry["region"] == r or (r.endswith("*") and entry["region"].startswith(r[:-1]))
+                for r in regions)):
+            continue
+        if countries and entry["country"] not in countries:
+            continue
+        if services and entry["service"] not in services:
+            continue
+        if tags and not set(tags) & set(entry["tags"]):
+            continue
+        selected.append(name)
+    return selected
+
+
+def test_entries_are_normalized(catalog):
+    assert catalog.get("tokyo")["service"] == "iaas"
+    assert catalog.get("tokyo")["country"] == "日本"
+    assert catalog.get("tokyo-os")["tags"] == ["asia-pacific"]
+    assert catalog.get("frankfurt")["port"] == 8443
+    assert catalog.values("service") == ["iaas", "objectstorage"]
+
+
+def test_combined_filters(catalog):
+    assert list(catalog.select(regions=["ap-*"], services=["objectstorage"])) == ["tokyo-os", "sydney-os"]
+    assert list(catalog.select(countries=["日本"], tags=["primary"])) == ["tokyo"]
+    assert list(catalog.select(services=["iaas"], tags=["primary", "europe"])) == ["tokyo", "frankfurt"]
+    # 名称与区域取并集，再与其他条件取交集
+    assert list(catalog.select(regions=["frankfurt", "ap-osaka-1"], services=["iaas"])) == ["osaka", "frankfurt"]
+    assert catalog.select(regions=["ap-*"], countries=["德国"]) == {}
+    assert list(catalog.select()) == [name for name, _ in ENTRIES]
+
+
+@pytest.mark.parametrize("regions,countries,services,tags", list(itertools.product(
+    (None, ["ap-*"], ["ap-tokyo-1", "us-ashburn-1"], ["frankfurt"]),
+    (None, ["日本"], ["日本", "美国"]),
+    (None, ["objectstorage"], ["iaas", "objectstorage"]),
+    (None, ["asia-pacific"], ["primary", "americas"]),
+)))
+def test_select_matches_brute_force(catalog, regions, countries, services, tags):
+    selected = catalog.select(regions, countries, services, tags)
+    assert list(selected) == brute_force(catalog, regions, countries, services, tags)
+
+
+def test_invalid_entries():
+    with pytest.raises(CatalogError):
+        len(EndpointCatalog(entries=[("a", {"endpoint": "a.example.com"})]))
+    with pytest.raises(CatalogError):
+        len(EndpointCatalog(entries=ENTRIES[:1] * 2))
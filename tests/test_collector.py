@@ -0,0 +1,38 @@
+import time
+
+from src.collector import Collector, decode_frame, encode_frame
+
+
+def ingest(collector, results):
+    return collector.ingest(decode_frame(encode_frame("site-a", results)))
+
+
+def test_invalid_timestamps_use_receive_time():
+    collector = Collector()
+    before = time.time()
+    results = [
+        {"name": f"s{i}", "region": "r1", "status": "completed", "latency": 10.0, "ts": ts}
+        for i, ts in enumerate(["yesterday", None, True, float("nan"), -5, [1]])
+    ]
+    assert ingest(collector, results) == len(results)
+    cell = collector.matrix()["cells"]["site-a"]["r1"]
+    assert cell["count"] == len(results)
+    assert before <= cell["updated_at"] <= time.time()
+
+
+def test_future_timestamp_is_clamped():
+    collector = Collector()
+    ingest(collector, [{"name": "s", "region": "r1", "status": "completed", "latency": 10.0,
+                        "ts": time.time() + 86400 * 365}])
+    ingest(collector, [{"name": "s", "region": "r1", "status": "completed", "latency": 20.0,
+                        "ts": time.time()}])
+    # 超前的时间戳不会让之后的结果无法成为最新值
+    cell = collector.matrix()["cells"]["site-a"]["r1"]
+    assert cell["value"] == 20.0
+    assert cell["updated_at"] <= time.time()
+
+
+def test_non_string_region_is_skipped():
+    collector = Collector()
+    ingest(collector, [{"name": "s", "region": ["r1"], "status": "completed", "ts": time.time()}])
+    assert collector.matrix()["regions"] == []
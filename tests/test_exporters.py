@@ -0,0 +1,115 @@
+import csv
+import json
+
+import pytest
+
+from src import exporters
+from src.exporters import EXPORT_FIELDS, ExportError, open_exporter
+
+COMPLETED = {
+    "name": "东京", "endpoint": "iaas.ap-tokyo-1.oraclecloud.com", "region": "ap-tokyo-1",
+    "location": "日本东京", "service": "iaas", "status": "completed", "latency": 42.5,
+    "packet_loss": 0.0, "connection_time": 120.0, "probes_sent": 3, "score": 91.25, "suspect": False
+}
+
+FAILED = {
+    "name": "悉尼", "endpoint": "iaas.ap-sydney-1.oraclecloud.com", "region": "ap-sydney-1",
+    "location": "澳大利亚悉尼", "status": "error", "latency": 999, "packet_loss": 100, "score": 0,
+    "error": "timeout"
+}
+
+requires_pyarrow = pytest.mark.skipif(exporters.pa is None, reason="pyarrow is not installed")
+
+
+def read_ndjson(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def read_arrow(path):
+    import pyarrow as pa
+    with pa.OSFile(str(path), "rb") as source:
+        return pa.ipc.open_stream(source).read_all()
+
+
+def test_ndjson_columns(tmp_path):
+    path = tmp_path / "results.ndjson"
+    with open_exporter("ndjson", str(path)) as exporter:
+        exporter.write(COMPLETED)
+        exporter.write(FAILED)
+    rows = read_ndjson(path)
+    assert [list(row) for row in rows] == [list(EXPORT_FIELDS)] * 2
+    assert rows[0]["latency"] == 42.5 and rows[0]["error"] is None and rows[0]["ts"]
+    assert rows[1]["error"] == "timeout" and rows[1]["connection_time"] is None
+
+
+def test_csv_columns(tmp_path):
+    path = tmp_path / "results.csv"
+    with open_exporter("csv", str(path)) as exporter:
+        exporter.write(COMPLETED)
+        exporter.write(FAILED)
+    header, completed, failed = read_csv(path)
+    assert header == list(EXPORT_FIELDS)
+    assert len(completed) == len(failed) == len(EXPORT_FIELDS)
+    row = dict(zip(header, failed))
+    assert row["error"] == "timeout" and row["connection_time"] == "" and row["latency"] == "999"
+
+
+@requires_pyarrow
+@pytest.mark.parametrize("format", ["arrow", "parquet"])
+def test_arrow_columns(tmp_path, format):
+    path = tmp_path / f"results.{format}"
+    with open_exporter(format, str(path)) as exporter:
+        exporter.write(COMPLETED)
+        exporter.write(FAILED)
+    if format == "arrow":
+        table = read_arrow(path)
+    else:
+        import pyarrow.parquet as pq
+        table = pq.read_table(str(path))
+    assert table.column_names == list(EXPORT_FIELDS)
+    assert str(table.schema.field("latency").type) == "double"
+    assert str(table.schema.field("probes_sent").type) == "int64"
+    assert str(table.schema.field("suspect").type) == "bool"
+    assert table.column("error").to_pylist() == [None, "timeout"]
+    assert table.column("probes_sent").to_pylist() == [3, None]
+
+
+@pytest.mark.parametrize("format,read", [
+    ("ndjson", read_ndjson),
+    ("csv", lambda path: read_csv(path)[1:]),
+    pytest.param("arrow", lambda path: read_arrow(path).to_pylist(), marks=requires_pyarrow),
+])
+def test_flushed_rows_are_readable_before_close(tmp_path, format, read):
+    path = tmp_path / f"results.{format}"
+    exporter = open_exporter(format, str(path), buffer_size=2, flush_interval=3600)
+    try:
+        exporter.write(COMPLETED)
+        exporter.write(FAILED)
+        exporter.write(COMPLETED)
+        # 满 buffer_size 条已写出，第3条仍在缓冲区
+        assert len(read(path)) == 2
+        exporter.flush()
+        assert len(read(path)) == 3
+    finally:
+        exporter.close()
+
+
+def test_write_after_close_raises(tmp_path):
+    exporter = open_exporter("ndjson", str(tmp_path / "results.ndjson"))
+    exporter.close()
+    exporter.close()
+    with pytest.raises(ExportError):
+        exporter.write(COMPLETED)
+
+
+def test_unknown_format_and_unwritable_path(tmp_path):
+    with pytest.raises(ExportError):
+        open_exporter("xml", str(tmp_path / "results.xml"))
+    with pytest.raises(ExportError):
+        open_exporter("csv", str(tmp_path / "missing" / "results.csv"))
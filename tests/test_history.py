@@ -0,0 +1,77 @@
+import sqlite3
+import time
+
+from src.history import HistoryStore
+from src.rollup import RollupEngine
+
+
+def result(service, latency, region="ap-tokyo-1"):
+    return {"name": f"tokyo-{service}", "region": region, "service": service, "endpoint": "x",
+            "status": "completed", "latency": latency, "probes_sent": 3, "packet_loss": 0}
+
+
+def test_history_keys_on_service(tmp_path):
+    history = HistoryStore(str(tmp_path / "history.db"), flush_interval=0.01)
+    now = time.time()
+    history.add(result("iaas", 10.0), now)
+    history.add(result("objectstorage", 30.0), now)
+    history.add({"name": "old", "region": "ap-tokyo-1", "status": "completed", "latency": 20.0}, now)
+    history.flush()
+    try:
+        assert history.services("ap-tokyo-1") == ["iaas", "objectstorage"]
+        assert history.summary("ap-tokyo-1", service="objectstorage")["avg"] == 30.0
+        assert history.summary("ap-tokyo-1", service="iaas")["count"] == 2
+        assert history.summary("ap-tokyo-1")["count"] == 3
+        assert [r["service"] for r in history.query("ap-tokyo-1", service="objectstorage")] == ["objectstorage"]
+    finally:
+        history.close()
+
+
+def test_rollups_key_on_service_and_persist(tmp_path):
+    history = HistoryStore(str(tmp_path / "history.db"), flush_interval=0.01)
+    rollups = RollupEngine()
+    now = time.time()
+    rollups.add(result("iaas", 10.0), now)
+    rollups.add(result("objectstorage", 30.0), now)
+
+    def means(engine, service=None):
+        return [p["mean"] for p in engine.query("ap-tokyo-1", "latency", now - 60, now, "1m", service)["points"]]
+
+    try:
+        assert means(rollups, "iaas") == [10.0]
+        assert means(rollups, "objectstorage") == [30.0]
+        assert means(rollups) == [20.0]
+        assert rollups.services("ap-tokyo-1") == ["iaas", "objectstorage"]
+
+        rollups.persist(history)
+        history.flush()
+        loaded = RollupEngine()
+        loaded.load(history)
+        assert means(loaded, "objectstorage") == [30.0]
+        assert means(loaded) == [20.0]
+    finally:
+        history.close()
+
+
+def test_old_database_is_migrated(tmp_path):
+    path = str(tmp_path / "history.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE results (id INTEGER PRIMARY KEY, ts REAL NOT NULL, name TEXT NOT NULL,
+            region TEXT NOT NULL, endpoint TEXT, status TEXT, latency REAL, min_latency REAL,
+            max_latency REAL, jitter REAL, packet_loss REAL, connection_time REAL, dns_time REAL,
+            tcp_time REAL, tls_time REAL, ttfb REAL, score REAL);
+        CREATE TABLE rollups (resolution TEXT NOT NULL, region TEXT NOT NULL, metric TEXT NOT NULL,
+            bucket REAL NOT NULL, data TEXT NOT NULL, PRIMARY KEY (resolution, region, metric, bucket))
+            WITHOUT ROWID;
+        INSERT INTO results (ts, name, region, latency) VALUES (1.0, 'tokyo', 'ap-tokyo-1', 12.0);
+        INSERT INTO rollups VALUES ('1m', 'ap-tokyo-1', 'latency', 0.0, '{}');
+    """)
+    conn.close()
+
+    history = HistoryStore(path)
+    try:
+        assert history.query("ap-tokyo-1")[0]["service"] == "iaas"
+        assert history.load_rollups("1m", 0) == [("1m", "ap-tokyo-1", "iaas", "latency", 0.0, "{}")]
+    finally:
+        history.close()
@@ -0,0 +1,118 @@
+import asyncio
+import struct
+import time
+
+from src.icmp import (
+    ICMP_ECHO_REPLY, ICMP_ECHO_REQUEST, PingEngine, _HostProbe, build_echo_request, checksum,
+    parse_echo_reply
+)
+
+
+def echo_reply(ident, seq, payload=b"abcd"):
+    header = struct.pack("!BBHHH", ICMP_ECHO_REPLY, 0, 0, ident, seq)
+    csum = checksum(header + payload)
+    return struct.pack("!BBHHH", ICMP_ECHO_REPLY, 0, csum, ident, seq) + payload
+
+
+def ipv4_header(ihl=5):
+    return bytes([0x40 | ihl]) + bytes(ihl * 4 - 1)
+
+
+def test_echo_request_layout_and_checksum():
+    packet = build_echo_request(0x1234, 7, payload_size=11)
+    assert len(packet) == 8 + 11
+    icmp_type, code, _, ident, seq = struct.unpack("!BBHHH", packet[:8])
+    assert (icmp_type, code, ident, seq) == (ICMP_ECHO_REQUEST, 0, 0x1234, 7)
+    # 含校验和的完整报文（奇数长度时补零）再次求和为0
+    assert checksum(packet) == 0
+
+
+def test_checksum_known_value():
+    # RFC 1071 示例数据
+    assert checksum(bytes([0x00, 0x01, 0xF2, 0x03, 0xF4, 0xF5, 0xF6, 0xF7])) == 0x220D
+
+
+def test_parse_reply_with_and_without_ip_header():
+    assert parse_echo_reply(echo_reply(0xBEEF, 3)) == (0xBEEF, 3)
+    assert parse_echo_reply(ipv4_header() + echo_reply(0xBEEF, 4)) == (0xBEEF, 4)
+    assert parse_echo_reply(ipv4_header(6) + echo_reply(1, 65535)) == (1, 65535)
+
+
+def test_parse_rejects_requests_and_truncated_packets():
+    assert parse_echo_reply(build_echo_request(1, 1)) is None
+    assert parse_echo_reply(echo_reply(1, 1)[:7]) is None
+    assert parse_echo_reply(ipv4_header() + echo_reply(1, 1)[:5]) is None
+    assert parse_echo_reply(b"") is None
+
+
+class FakeSocket:
+    def __init__(self, packets):
+        self.packets = list(packets)
+
+    def recvfrom(self, size):
+        if not self.packets:
+            raise BlockingIOError
+        return self.packets.pop(0)
+
+
+def demux(packets, is_dgram=False):
+    """把两个目标的seq登记为等待回复，送入packets后返回各目标收到的RTT数与剩余的seq"""
+    async def main():
+        engine = PingEngine()
+        engine.loop = asyncio.get_running_loop()
+        engine._ident = 0x1111
+        engine._is_dgram = is_dgram
+        now = time.monotonic_ns()
+        probes = []
+        for seq, address in ((1, "192.0.2.1"), (2, "192.0.2.2")):
+            probe = _HostProbe(address, address, 1, 1.0, 0.2, engine.loop.create_future())
+            probe.sent = 1
+            probe.seqs.append(seq)
+            engine._pending[seq] = (probe, now)
+            probes.append(probe)
+        engine._sock = FakeSocket(packets)
+        engine._on_readable()
+        engine._sock = None
+        return [len(p.rtts) for p in probes], sorted(engine._pending), [p.future.done() for p in probes]
+    return asyncio.run(main())
+
+
+def test_replies_are_matched_by_ident_seq_and_address():
+    rtts, pending, done = demux([
+        (echo_reply(0x1111, 1), ("192.0.2.1", 0)),
+        (ipv4_header() + echo_reply(0x1111, 2), ("192.0.2.2", 0)),
+    ])
+    assert rtts == [1, 1] and pending == [] and done == [True, True]
+
+
+def test_foreign_and_malformed_replies_are_ignored():
+    rtts, pending, done = demux([
+        (echo_reply(0x2222, 1), ("192.0.2.1", 0)),     # 其他进程的identifier
+        (echo_reply(0x1111, 2), ("192.0.2.99", 0)),    # seq对得上但来源地址不对
+        (echo_reply(0x1111, 3), ("192.0.2.1", 0)),     # 没有登记的seq
+        (echo_reply(0x1111, 1)[:6], ("192.0.2.1", 0)),  # 截断
+        (build_echo_request(0x1111, 1), ("192.0.2.1", 0)),  # 回环收到的自己发出的请求
+    ])
+    assert rtts == [0, 0] and pending == [1, 2] and done == [False, False]
+
+
+def test_dgram_socket_ignores_rewritten_ident():
+    # DGRAM套接字的identifier由内核改写，不参与匹配
+    rtts, pending, _ = demux([(echo_reply(0x2222, 1), ("192.0.2.1", 0))], is_dgram=True)
+    assert rtts == [1, 0] and pending == [2]
+
+
+def test_cancelled_probe_releases_its_seqs():
+    async def main():
+        engine = PingEngine()
+        engine.loop = asyncio.get_running_loop()
+        probe = _HostProbe("h", "192.0.2.1", 2, 1.0, 0.2, engine.loop.create_future())
+        probe.future.add_done_callback(lambda _: engine._release(probe))
+        other = _HostProbe("o", "192.0.2.2", 1, 1.0, 0.2, engine.loop.create_future())
+        for seq, owner in ((5, probe), (6, probe), (7, other)):
+            owner.seqs.append(seq)
+            engine._pending[seq] = (owner, 0)
+        probe.future.cancel()
+        await asyncio.sleep(0)
+        return sorted(engine._pending)
+    assert asyncio.run(main()) == [7]
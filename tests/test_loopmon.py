@@ -0,0 +1,36 @@
+import asyncio
+import time
+
+from src.loopmon import LoopLagMonitor
+
+
+def test_only_stalls_inside_sections_count():
+    monitor = LoopLagMonitor()
+    window = monitor.begin()
+    window.sections.append((10.0, 10.1, 0.0))
+    window.sections.append((11.0, 11.1, 0.0))
+    # 区间之前、两个区间之间的停顿不计入；与第二个区间重叠20ms
+    monitor._stalls.extend([(9.0, 9.5, 500.0), (10.5, 10.9, 400.0), (11.08, 11.12, 40.0)])
+    lag = monitor.end(window)
+    assert lag["loop_lag"] == 20.0
+    assert lag["loop_lag_max"] == 20.0
+
+
+def test_blocking_outside_section_is_not_attributed():
+    async def main():
+        monitor = LoopLagMonitor(interval=0.01)
+        monitor.start()
+        window = monitor.begin()
+        with monitor.section(window):
+            await asyncio.sleep(0.05)
+        time.sleep(0.1)  # 测量结束后阻塞事件循环
+        await asyncio.sleep(0.05)
+        with monitor.section(window):
+            time.sleep(0.08)  # 测量期间阻塞
+        await asyncio.sleep(0.05)
+        monitor.stop()
+        return monitor, monitor.end(window)
+
+    monitor, lag = asyncio.run(main())
+    assert monitor.max_lag >= 90
+    assert 60 <= lag["loop_lag_max"] < 90
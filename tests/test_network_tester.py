@@ -0,0 +1,29 @@
+import asyncio
+
+import pytest
+
+from src.backends import SimulatedBackend
+from src.network_tester import NetworkTester
+
+
+SERVERS = {
+    f"sim-{i}": {"endpoint": f"sim-{i}.example.com", "region": "region-0", "location": "simulated"}
+    for i in range(8)
+}
+
+
+def test_producer_error_is_raised_instead_of_hanging():
+    backend = SimulatedBackend(SERVERS, seed=1)
+
+    async def broken_resolve_all(hosts):
+        raise RuntimeError("resolver down")
+
+    backend.resolver.resolve_all = broken_resolve_all
+    tester = NetworkTester(backend)
+
+    async def main():
+        await asyncio.wait_for(tester.test_all_servers(SERVERS, shards=1), timeout=5)
+
+    with pytest.raises(RuntimeError, match="resolver down"):
+        asyncio.run(main())
+    assert not tester.is_testing
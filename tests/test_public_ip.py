@@ -0,0 +1,39 @@
+import asyncio
+import json
+import time
+
+from src import utils
+from src.utils import PublicIPCache
+
+INFO = {"ip": "203.0.113.7", "ipv4": "203.0.113.7", "city": "Tokyo", "country": "Japan"}
+
+
+def fake_fetch(calls, info=INFO):
+    async def fetch_public_ip(timeout, hedge_delay):
+        calls.append(time.monotonic())
+        return dict(info)
+    return fetch_public_ip
+
+
+def test_cache_file_is_reused_by_a_new_process(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(utils, "fetch_public_ip", fake_fetch(calls))
+    path = str(tmp_path / "cache" / "public_ip.json")
+
+    assert asyncio.run(PublicIPCache(ttl=600, path=path).fetch()) == INFO
+    # 新的缓存对象（相当于再次运行CLI）直接读取文件
+    assert asyncio.run(PublicIPCache(ttl=600, path=path).fetch()) == INFO
+    assert len(calls) == 1
+
+
+def test_expired_or_failed_results_are_not_reused(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(utils, "fetch_public_ip", fake_fetch(calls, dict(INFO, ip="Unknown")))
+    path = tmp_path / "public_ip.json"
+    path.write_text(json.dumps({"info": INFO, "saved_at": time.time() - 3600}), encoding="utf-8")
+
+    cache = PublicIPCache(ttl=600, path=str(path))
+    # 文件中的结果已过期，查询失败时仍保留旧结果，也不用失败结果覆盖文件
+    assert asyncio.run(cache.fetch()) == INFO
+    assert len(calls) == 1
+    assert json.loads(path.read_text(encoding="utf-8"))["info"] == INFO
@@ -0,0 +1,54 @@
+import asyncio
+import struct
+
+import pytest
+
+from src.resolver import DNSError, DNSResolver, build_query, parse_response
+
+QUERY_ID = 0x1234
+
+
+def answer(rdata=b"\x0a\x00\x00\x01", ttl=60, name=b"\xc0\x0c"):
+    return name + struct.pack("!HHIH", 1, 1, ttl, len(rdata)) + rdata
+
+
+def response(*answers, query_id=QUERY_ID, host="example.com"):
+    query = build_query(query_id, host)
+    header = struct.pack("!HHHHHH", query_id, 0x8180, 1, len(answers), 0, 0)
+    return header + query[12:] + b"".join(answers)
+
+
+def test_parse_valid_response():
+    assert parse_response(response(answer(), answer(b"\x0a\x00\x00\x02", ttl=30)), QUERY_ID) == (
+        ["10.0.0.1", "10.0.0.2"], 30
+    )
+
+
+@pytest.mark.parametrize("data", [
+    # 每个截断位置都只能得到 DNSError，不能是 IndexError/struct.error
+    *(response(answer())[:n] for n in range(12, len(response(answer())))),
+    # 标签长度越界
+    response(answer(name=b"\x3fabc")),
+    # 保留的标签类型 0x40/0x80
+    response(answer(name=b"\x80\x0c")),
+    # 压缩指针指向自身
+    response(answer(name=b"\xc0\x1d")),
+    # 超长的标签链
+    response(answer(name=b"\x01a" * 200 + b"\x00")),
+    # rdlength 超出报文
+    response(answer(rdata=b"\x0a\x00")[:-2] + b"\x00\x10\x0a\x00"),
+])
+def test_malformed_response_raises_dns_error(data):
+    with pytest.raises(DNSError):
+        parse_response(data, QUERY_ID)
+
+
+def test_malformed_response_falls_back_to_getaddrinfo(monkeypatch):
+    resolver = DNSResolver(nameservers=["192.0.2.1"])
+
+    async def bad_server(server, host):
+        return parse_response(response(answer())[:-3], QUERY_ID)
+
+    monkeypatch.setattr(resolver, "_query_server", bad_server)
+    entry = asyncio.run(resolver.resolve("localhost"))
+    assert entry.addresses == ["127.0.0.1"]
@@ -0,0 +1,80 @@
+import math
+
+from src.resultset import ResultSet
+
+COMPLETED = {
+    "name": "东京", "endpoint": "iaas.ap-tokyo-1.oraclecloud.com", "region": "ap-tokyo-1",
+    "location": "日本东京", "service": "iaas", "status": "completed",
+    "dns_time": 3.2, "latency": 42.5, "min_latency": 40.1, "max_latency": 45.0, "jitter": 1.5,
+    "packet_loss": 0.0, "connection_time": 120.0, "tcp_time": 40.0, "tls_time": 50.0, "ttfb": 30.0,
+    "queue_wait": 0.0, "probes_sent": 3, "score": 91.25, "loop_lag": 0.0, "loop_lag_max": 0.0,
+    "executor_wait": 0.0, "suspect": False
+}
+
+FAILED = {
+    "name": "悉尼", "endpoint": "iaas.ap-sydney-1.oraclecloud.com", "region": "ap-sydney-1",
+    "location": "澳大利亚悉尼", "status": "error", "latency": 999, "packet_loss": 100, "score": 0,
+    "error": "timeout", "suspect": True
+}
+
+PRUNED = {
+    "name": "大阪", "endpoint": "iaas.ap-osaka-1.oraclecloud.com", "region": "ap-osaka-1",
+    "location": "日本大阪", "status": "pruned", "latency": 55.0, "probes_sent": 4, "pruned_round": 2,
+    "tcp_time": None
+}
+
+
+def test_round_trip():
+    results = ResultSet([COMPLETED, FAILED, PRUNED])
+    assert len(results) == 3
+    assert results.to_dicts() == [COMPLETED, FAILED, PRUNED]
+    for row, source in zip(results, (COMPLETED, FAILED, PRUNED)):
+        assert row.to_dict() == source
+        assert set(row.keys()) == set(source)
+        for key, value in source.items():
+            assert row[key] == value
+
+
+def test_missing_optional_fields():
+    row = ResultSet([FAILED])[0]
+    assert "connection_time" not in row
+    assert "probes_sent" not in row
+    assert row.get("connection_time") is None
+    assert row.get("probes_sent", 0) == 0
+    # 显式的None保留键
+    pruned = ResultSet([PRUNED])[0]
+    assert "tcp_time" in pruned and pruned["tcp_time"] is None
+    assert pruned["pruned_round"] == 2
+
+
+def test_column_types():
+    results = ResultSet([COMPLETED, FAILED, PRUNED])
+    row = results[0]
+    assert type(row["latency"]) is float
+    assert type(row["probes_sent"]) is int
+    assert type(row["suspect"]) is bool
+    assert type(results[1]["latency"]) is float and results[1]["latency"] == 999
+    assert results[1]["suspect"] is True
+    assert math.isnan(results.column("connection_time")[1])
+
+
+def test_values_of_unexpected_type_are_kept():
+    odd = dict(COMPLETED, name="odd", latency="n/a", probes_sent=2.5, suspect="maybe", status=None)
+    assert ResultSet([odd])[0].to_dict() == odd
+
+
+def test_same_name_replaces_row():
+    results = ResultSet([COMPLETED, FAILED])
+    updated = dict(FAILED, status="completed", latency=80.0, score=60.0)
+    del updated["error"]
+    assert results.add(updated) == 1
+    assert len(results) == 2
+    assert results[1].to_dict() == updated
+
+
+def test_views_do_not_copy_rows():
+    results = ResultSet([COMPLETED, FAILED, PRUNED])
+    ranked = results.sort_by("score", reverse=True)
+    assert [r["name"] for r in ranked] == ["东京", "悉尼", "大阪"]
+    assert [r["name"] for r in results.view().where("status", ("completed", "pruned"))] == ["东京", "大阪"]
+    assert ranked.to_dicts()[0] == COMPLETED
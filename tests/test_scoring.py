@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from src import scoring
+from src.scoring import RESULT_COLUMNS, ScoringModel
+
+
+def make_rows(n=500, seed=3):
+    rng = random.Random(seed)
+    edges = (0, 5, 10, 20, 50, 100, 200, 300, 500, 999)
+
+    def value(high):
+        roll = rng.random()
+        if roll < 0.1:
+            return 999
+        if roll < 0.2:
+            return float(rng.choice(edges))
+        return round(rng.uniform(0, high), 3)
+
+    rows = []
+    for i in range(n):
+        status = rng.choice(("completed", "completed", "completed", "error", "pruned"))
+        row = {
+            "status": status,
+            "latency": value(400),
+            "packet_loss": rng.choice((0, 0, 5.0, 33.3, 100)),
+            "connection_time": value(800),
+            "tcp_time": value(200),
+            "tls_time": value(300),
+            "ttfb": value(600),
+            "jitter": value(40),
+        }
+        if i % 7 == 0:
+            # 没有分阶段数据的旧结果
+            row["tcp_time"] = row["tls_time"] = row["ttfb"] = None
+        if i % 11 == 0:
+            row["jitter"] = None
+        if status == "error":
+            row.update(latency=999, packet_loss=100, connection_time=999, tcp_time=999, tls_time=999, ttfb=999)
+        rows.append(row)
+    return rows
+
+
+def scalar_scores(model, rows):
+    return [model.score(row) if row["status"] in scoring.SCORED_STATUSES else 0 for row in rows]
+
+
+@pytest.fixture(params=["numpy", "pure"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        if scoring.np is None:
+            pytest.skip("numpy is not installed")
+    else:
+        monkeypatch.setattr(scoring, "np", None)
+    return request.param
+
+
+@pytest.mark.parametrize("weights", [None, {"latency": 0.7, "packet_loss": 0.1, "connection": 0.1,
+                                            "ttfb": 0.05, "jitter": 0.05}])
+def test_batch_scores_match_scalar_scores(backend, weights):
+    model = ScoringModel(weights)
+    rows = make_rows()
+    columns = {key: [row[key] for row in rows] for key in RESULT_COLUMNS}
+    batch = [float(x) for x in model.score_results(columns)]
+    expected = scalar_scores(model, rows)
+
+    assert batch == expected
+    order = sorted(range(len(rows)), key=lambda i: (-expected[i], i))
+    assert sorted(range(len(rows)), key=lambda i: (-batch[i], i)) == order
+
+
+def test_failed_rows_score_zero(backend):
+    model = ScoringModel()
+    columns = {key: [999, None] for key in RESULT_COLUMNS}
+    columns["status"] = ["error", "pruned"]
+    columns["packet_loss"] = [100, 0]
+    assert list(model.score_results(columns)) == [0, 0]
@@ -0,0 +1,93 @@
+import asyncio
+import time
+from multiprocessing.process import BaseProcess
+
+import pytest
+
+from src.backends import SimulatedBackend
+from src.config import TEST_CONFIG
+from src.network_tester import NetworkTester
+from src.sharding import pack_results, unpack_results
+
+
+def make_servers(count):
+    return {
+        f"sim-{i:03d}": {
+            "endpoint": f"sim-{i:03d}.example.com",
+            "region": f"region-{i % 4}",
+            "location": "simulated"
+        }
+        for i in range(count)
+    }
+
+
+@pytest.fixture
+def sharded_config(monkeypatch):
+    monkeypatch.setitem(TEST_CONFIG, "shards", 2)
+    monkeypatch.setitem(TEST_CONFIG, "shard_min_servers", 4)
+
+
+def test_pack_roundtrip():
+    results = [{"name": "a", "score": 1.0}, {"name": "b", "status": "error", "error": "x"},
+               {"name": "c", "score": 2.0}]
+    batch = pack_results(results)
+    assert len(batch) == 2
+    assert sorted(unpack_results(batch), key=lambda r: r["name"]) == results
+
+
+def test_shards_larger_than_min_servers(sharded_config):
+    # 每个分片 12 个服务器，超过 shard_min_servers，工作进程不能再次分片
+    servers = make_servers(24)
+    tester = NetworkTester(SimulatedBackend(servers, seed=7))
+    results = asyncio.run(tester.test_all_servers(servers))
+
+    assert sorted(r["name"] for r in results) == sorted(servers)
+    assert all(r["status"] == "completed" for r in results), [r.get("error") for r in results]
+
+    single = NetworkTester(SimulatedBackend(servers, seed=7))
+    expected = {r["name"]: r["score"] for r in asyncio.run(single.test_all_servers(servers, shards=1))}
+    assert {r["name"]: r["score"] for r in results} == expected
+
+
+def test_sharded_sweep_fills_endpoint_stats(sharded_config):
+    servers = make_servers(24)
+    tester = NetworkTester(SimulatedBackend(servers, seed=7))
+    results = asyncio.run(tester.test_all_servers(servers))
+
+    assert set(tester.endpoint_stats) == set(servers)
+    for result in results:
+        stats = tester.endpoint_stats[result["name"]]
+        assert stats.probes_sent == result["probes_sent"]
+        assert stats.summary()["latency_p50"] == result["latency_p50"]
+
+
+def test_closing_sharded_sweep_does_not_block_loop(sharded_config, monkeypatch):
+    servers = make_servers(24)
+    join = BaseProcess.join
+
+    def slow_join(self, timeout=None):
+        # 模拟退出缓慢的工作进程
+        time.sleep(0.2)
+        join(self, timeout)
+
+    monkeypatch.setattr(BaseProcess, "join", slow_join)
+
+    async def main():
+        tester = NetworkTester(SimulatedBackend(servers, seed=7, time_scale=1.0))
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        sweep = tester.iter_results(servers)
+        await sweep.__anext__()
+        ticker = asyncio.ensure_future(tick())
+        await sweep.aclose()
+        ticker.cancel()
+        return ticks
+
+    # 等待工作进程退出期间事件循环仍在运行
+    assert asyncio.run(main()) >= 5